@@ -9,4 +9,7 @@ setup(
     use_scm_version=False,
     packages=find_packages(),
     python_requires=">=3.8",
+    entry_points={
+        "console_scripts": ["vibeutils=vibeutils.cli:main"],
+    },
 )
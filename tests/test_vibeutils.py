@@ -94,13 +94,13 @@ class TestVibecountProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        # Mock responses: security check 1, security check 2, main task, validation
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "3", "VALID"]
+        # Mock responses: security check text (the letter is trusted), main task, validation
+        mock_instance.create_completion.side_effect = ["SAFE", "3", "VALID"]
         
         result = vibecount("strawberry", "r", case_sensitive=True, provider="openai")
         
         assert result == 3
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 3
         mock_openai_provider.assert_called_with("test-openai-key", "gpt-4o-mini")
     
     @patch('vibeutils.core.AnthropicProvider')
@@ -109,13 +109,13 @@ class TestVibecountProviders:
         mock_instance = MagicMock()
         mock_anthropic_provider.return_value = mock_instance
         
-        # Mock responses: security check 1, security check 2, main task, validation
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "3", "VALID"]
+        # Mock responses: security check text (the letter is trusted), main task, validation
+        mock_instance.create_completion.side_effect = ["SAFE", "3", "VALID"]
         
         result = vibecount("strawberry", "r", case_sensitive=True, provider="anthropic")
         
         assert result == 3
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 3
         mock_anthropic_provider.assert_called_with("test-anthropic-key", "claude-sonnet-4-20250514")
     
     @patch('vibeutils.core.OpenAIProvider')
@@ -124,12 +124,12 @@ class TestVibecountProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "4", "VALID"]
+        mock_instance.create_completion.side_effect = ["SAFE", "4", "VALID"]
         
         result = vibecount("Strawberry", "r", case_sensitive=False, provider="openai")
         
         assert result == 4
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 3
     
     @patch('vibeutils.core.AnthropicProvider')
     def test_anthropic_case_insensitive_count(self, mock_anthropic_provider):
@@ -137,12 +137,12 @@ class TestVibecountProviders:
         mock_instance = MagicMock()
         mock_anthropic_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "4", "VALID"]
+        mock_instance.create_completion.side_effect = ["SAFE", "4", "VALID"]
         
         result = vibecount("Strawberry", "r", case_sensitive=False, provider="anthropic")
         
         assert result == 4
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 3
     
     @patch('vibeutils.core.OpenAIProvider')
     def test_prompt_injection_detected(self, mock_openai_provider):
@@ -162,8 +162,8 @@ class TestVibecountProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        # Security checks pass, main task succeeds, but validation fails
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "not a number", "INVALID"]
+        # Security check of the text passes, main task succeeds, but validation fails
+        mock_instance.create_completion.side_effect = ["SAFE", "not a number", "INVALID"]
         
         with pytest.raises(Exception, match="Response validation failed"):
             vibecount("test", "t", provider="openai")
@@ -199,12 +199,12 @@ class TestVibecompareProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "-1", "VALID"]
+        mock_instance.create_completion.side_effect = ["-1", "VALID"]
         
         result = vibecompare(5, 10, provider="openai")
         
         assert result == -1
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 2
     
     @patch('vibeutils.core.AnthropicProvider')
     def test_anthropic_numbers_equal(self, mock_anthropic_provider):
@@ -212,12 +212,12 @@ class TestVibecompareProviders:
         mock_instance = MagicMock()
         mock_anthropic_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "0", "VALID"]
+        mock_instance.create_completion.side_effect = ["0", "VALID"]
         
         result = vibecompare(7, 7, provider="anthropic")
         
         assert result == 0
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 2
     
     @patch('vibeutils.core.OpenAIProvider')
     def test_openai_first_number_larger(self, mock_openai_provider):
@@ -225,12 +225,12 @@ class TestVibecompareProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "1", "VALID"]
+        mock_instance.create_completion.side_effect = ["1", "VALID"]
         
         result = vibecompare(15, 8, provider="openai")
         
         assert result == 1
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 2
     
     @patch('vibeutils.core.AnthropicProvider')
     def test_anthropic_float_numbers(self, mock_anthropic_provider):
@@ -238,12 +238,12 @@ class TestVibecompareProviders:
         mock_instance = MagicMock()
         mock_anthropic_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "-1", "VALID"]
+        mock_instance.create_completion.side_effect = ["-1", "VALID"]
         
         result = vibecompare(3.14, 3.15, provider="anthropic")
         
         assert result == -1
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 2
 
 
 class TestVibeevalProviders:
@@ -276,12 +276,12 @@ class TestVibeevalProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "5", "VALID"]
+        mock_instance.create_completion.side_effect = ["5", "VALID"]
         
         result = vibeeval("2 + 3", provider="openai")
         
         assert result == 5.0
-        assert mock_instance.create_completion.call_count == 3
+        assert mock_instance.create_completion.call_count == 2
     
     @patch('vibeutils.core.AnthropicProvider')
     def test_anthropic_successful_multiplication(self, mock_anthropic_provider):
@@ -289,12 +289,12 @@ class TestVibeevalProviders:
         mock_instance = MagicMock()
         mock_anthropic_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "12", "VALID"]
+        mock_instance.create_completion.side_effect = ["12", "VALID"]
         
         result = vibeeval("3 * 4", provider="anthropic")
         
         assert result == 12.0
-        assert mock_instance.create_completion.call_count == 3
+        assert mock_instance.create_completion.call_count == 2
     
     @patch('vibeutils.core.OpenAIProvider')
     def test_openai_division_result(self, mock_openai_provider):
@@ -302,12 +302,12 @@ class TestVibeevalProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "2.5", "VALID"]
+        mock_instance.create_completion.side_effect = ["2.5", "VALID"]
         
         result = vibeeval("5 / 2", provider="openai")
         
         assert result == 2.5
-        assert mock_instance.create_completion.call_count == 3
+        assert mock_instance.create_completion.call_count == 2
     
     @patch('vibeutils.core.AnthropicProvider')
     def test_anthropic_invalid_expression_error(self, mock_anthropic_provider):
@@ -326,7 +326,7 @@ class TestVibeevalProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "ERROR", "VALID"]
+        mock_instance.create_completion.side_effect = ["ERROR", "VALID"]
         
         with pytest.raises(ValueError, match="Invalid mathematical expression: 1 / 0"):
             vibeeval("1 / 0", provider="openai")
@@ -399,7 +399,7 @@ class TestBackwardCompatibility:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "2", "VALID"]
+        mock_instance.create_completion.side_effect = ["SAFE", "2", "VALID"]
         
         # Call without provider parameter - should default to OpenAI
         result = vibecount("test", "t")
@@ -413,7 +413,7 @@ class TestBackwardCompatibility:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "-1", "VALID"]
+        mock_instance.create_completion.side_effect = ["-1", "VALID"]
         
         # Call without provider parameter - should default to OpenAI
         result = vibecompare(5, 10)
@@ -427,7 +427,7 @@ class TestBackwardCompatibility:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "5", "VALID"]
+        mock_instance.create_completion.side_effect = ["5", "VALID"]
         
         # Call without provider parameter - should default to OpenAI
         result = vibeeval("2 + 3")
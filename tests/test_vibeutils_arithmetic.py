@@ -0,0 +1,111 @@
+"""
+Tests for the local arithmetic evaluator and the vibeeval fast path
+"""
+
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+from vibeutils import vibeeval
+from vibeutils.arithmetic import evaluate_expression, parse_expression
+
+
+class TestEvaluateExpression:
+    """Test cases for exact local evaluation"""
+    
+    @pytest.mark.parametrize("expression,expected", [
+        ("(2 + 3) * 4", 20.0),
+        ("5 / 2", 2.5),
+        ("2 ** 8", 256.0),
+        ("-2 ** 2", -4.0),
+        ("0.1 + 0.2", 0.3),
+        ("  1.5e3 - +2 ", 1498.0),
+        ("4 ** 0.5", 2.0),
+        ("2 ** -2", 0.25),
+        ("10 ** 300", 1e300),
+        ("2 ** 1000", 2.0 ** 1000),
+        ("0.1 ** 300", 1e-300),
+        ("(-10) ** 301", -1e301),
+    ])
+    def test_supported_expressions(self, expression, expected):
+        """Test that grammar expressions evaluate exactly"""
+        assert evaluate_expression(expression) == expected
+    
+    @pytest.mark.parametrize("expression", [
+        "sqrt(16)", "2 // 3", "7 % 2", "x + 1", "True + 1", "1j * 2", "(1, 2)", "2 +", "two plus two",
+        "0x10", "1_0", "0o7 + 1", "1 # comment", "(1\n+ 2)", "1 \\\n+ 2",
+    ])
+    def test_refuses_outside_grammar(self, expression):
+        """Test that anything outside the documented grammar is refused"""
+        assert parse_expression(expression) is None
+        assert evaluate_expression(expression) is None
+    
+    @pytest.mark.parametrize("expression", [
+        "9 ** 9 ** 9", "10 ** 400", "2 ** 100000", "(-8) ** (1 / 3)", "0.001 ** -1000", "10.0 ** 400.5",
+        "1e999", "-1e999 + 1", "1e999 - 1e999",
+    ])
+    def test_refuses_beyond_limits(self, expression):
+        """Test that huge exponents and results are refused instead of computed"""
+        assert evaluate_expression(expression) is None
+    
+    @pytest.mark.parametrize("expression", ["1 / 0", "1 / (2 - 2)", "0 ** -1"])
+    def test_division_by_zero(self, expression):
+        """Test that division by zero is reported as an invalid expression"""
+        with pytest.raises(ValueError, match="Invalid mathematical expression"):
+            evaluate_expression(expression)
+
+
+class TestVibeevalLocal:
+    """Test cases for the opt-in local evaluation mode of vibeeval"""
+    
+    def setup_method(self):
+        """Set up test environment"""
+        os.environ["OPENAI_API_KEY"] = "test-openai-key"
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_local_evaluation_skips_api(self, mock_openai_provider):
+        """Test that plain arithmetic makes no API call in local mode"""
+        assert vibeeval("(2 + 3) * 4", local=True) == 20.0
+        
+        mock_openai_provider.assert_not_called()
+    
+    def test_local_evaluation_needs_no_api_key(self):
+        """Test that local evaluation works without credentials"""
+        del os.environ["OPENAI_API_KEY"]
+        
+        assert vibeeval("2 ** 10", local=True) == 1024.0
+    
+    def test_local_division_by_zero(self):
+        """Test that division by zero raises like the API pipeline"""
+        with pytest.raises(ValueError, match="Invalid mathematical expression"):
+            vibeeval("1 / 0", local=True)
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_falls_back_to_api_when_refused(self, mock_openai_provider):
+        """Test that refused expressions go through the API pipeline"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["SAFE", "4", "VALID"]
+        
+        assert vibeeval("sqrt(16)", local=True) == 4.0
+        assert mock_instance.create_completion.call_count == 3
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_overflowing_literal_falls_back_to_api(self, mock_openai_provider):
+        """Test that literals too big for a float are refused locally and sent to the API"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["ERROR", "VALID"]
+        
+        with pytest.raises(ValueError, match="Invalid mathematical expression"):
+            vibeeval("1e999", local=True)
+        assert mock_instance.create_completion.call_count == 2
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_local_is_opt_in(self, mock_openai_provider):
+        """Test that the API pipeline is used by default"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["5", "VALID"]
+        
+        assert vibeeval("2 + 3") == 5.0
+        assert mock_instance.create_completion.call_count == 2
@@ -0,0 +1,152 @@
+"""
+Tests for vectorized vibe functions over NumPy arrays
+"""
+
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+from vibeutils import vibecompare_array
+
+np = pytest.importorskip("numpy")
+
+
+def _number(text):
+    """Parse a listed number exactly"""
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _batch_responder(calls):
+    """Build a fake completion function that answers batch comparison prompts correctly"""
+    def create_completion(messages, **kwargs):
+        content = messages[0]["content"]
+        calls.append(content)
+        if "security analyzer" in content:
+            return "SAFE"
+        if "response validator" in content:
+            return "VALID"
+        answers = []
+        for line in content.splitlines():
+            if line[:1].isdigit() and " and " in line:
+                num1, num2 = (_number(value) for value in line.split(". ", 1)[1].split(" and "))
+                answers.append(str((num1 > num2) - (num1 < num2)))
+        return "\n".join(answers)
+    return create_completion
+
+
+class TestVibecompareArray:
+    """Test cases for vibecompare_array"""
+    
+    def setup_method(self):
+        """Set up test environment"""
+        os.environ["OPENAI_API_KEY"] = "test-openai-key"
+    
+    def test_non_numeric_arrays_rejected(self):
+        """Test that non-numeric inputs are rejected"""
+        with pytest.raises(ValueError, match="Both arguments must be arrays of real numbers"):
+            vibecompare_array(np.array(["5"]), np.array([10]))
+        with pytest.raises(ValueError, match="Both arguments must be arrays of real numbers"):
+            vibecompare_array(np.array([1 + 2j]), np.array([10]))
+    
+    def test_incompatible_shapes(self):
+        """Test that non-broadcastable shapes are rejected"""
+        with pytest.raises(ValueError):
+            vibecompare_array(np.arange(3), np.arange(4))
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_broadcast_and_dedup(self, mock_openai_provider):
+        """Test that unique pairs are compared once in one batch and scattered back"""
+        calls = []
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = _batch_responder(calls)
+        
+        a = np.array([[1, 5, 5, 9], [5, 1, 9, 5]])
+        result = vibecompare_array(a, 5)
+        
+        assert result.dtype == np.int8
+        assert result.shape == (2, 4)
+        assert result.tolist() == [[-1, 0, 0, 1], [0, -1, 1, 0]]
+        # Numbers skip the injection check: one batched comparison and one validation
+        assert len(calls) == 2
+        assert "3 pairs of numbers" in calls[0]
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_large_ints_not_merged_with_floats(self, mock_openai_provider):
+        """Test that integers beyond float precision keep their exact values when mixed with floats"""
+        calls = []
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = _batch_responder(calls)
+        
+        result = vibecompare_array(np.array([2**53 + 1, 2**53], dtype=np.int64), np.array([2.0**53, 2.0**53]))
+        
+        assert result.tolist() == [1, 0]
+        assert "2 pairs of numbers" in calls[0]
+        assert f"{2**53 + 1} and" in calls[0]
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_nan_pairs_deduplicated(self, mock_openai_provider):
+        """Test that pairs holding NaN are compared once"""
+        calls = []
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = _batch_responder(calls)
+        
+        result = vibecompare_array(np.array([np.nan, np.nan, 1.0, np.nan]), np.array([1.0, 1.0, 1.0, np.nan]))
+        
+        assert result.tolist() == [0, 0, 0, 0]
+        comparison = next(call for call in calls if call.startswith("Compare each"))
+        assert "3 pairs of numbers" in comparison
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_batches_split_by_batch_size(self, mock_openai_provider):
+        """Test that unique pairs are split into batches"""
+        calls = []
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = _batch_responder(calls)
+        
+        a = np.arange(10)
+        b = np.arange(10)[::-1].astype(float)
+        result = vibecompare_array(a, b, batch_size=4)
+        
+        assert result.tolist() == np.sign(a - b).tolist()
+        assert len(calls) == 6
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_empty_arrays(self, mock_openai_provider):
+        """Test that empty inputs make no API calls"""
+        result = vibecompare_array(np.array([]), np.array([]))
+        
+        assert result.shape == (0,)
+        assert result.dtype == np.int8
+        mock_openai_provider.assert_not_called()
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_wrong_number_of_results(self, mock_openai_provider):
+        """Test that responses with the wrong number of values are rejected"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["-1", "VALID"]
+        
+        with pytest.raises(Exception, match="AI API returned invalid comparison results"):
+            vibecompare_array(np.array([1, 2]), np.array([3, 1]))
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_batch_validation_failure(self, mock_openai_provider):
+        """Test that the batch validator can block a response"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["-1\n1", "INVALID"]
+        
+        with pytest.raises(Exception, match="Response validation failed"):
+            vibecompare_array(np.array([1, 2]), np.array([3, 1]))
+    
+    def test_numpy_not_installed(self):
+        """Test that a helpful error is raised without numpy"""
+        with patch.dict('sys.modules', {'numpy': None}):
+            with pytest.raises(ImportError, match="numpy package is not installed"):
+                vibecompare_array([1], [2])
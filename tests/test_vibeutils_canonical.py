@@ -0,0 +1,67 @@
+"""
+Tests for argument canonicalization
+"""
+
+import pytest
+from vibeutils.canonical import (
+    canonical_number, canonical_expression, canonical_vibecount, canonical_vibecount_all, canonical_vibecompare,
+    canonical_vibeeval, canonical_vibelength,
+)
+
+
+class TestCanonicalForms:
+    """Test cases for canonical call forms"""
+    
+    @pytest.mark.parametrize("value,expected", [
+        (2.0, 2), (-0.0, 0), (True, 1), (2.5, 2.5), (7, 7), (float("inf"), float("inf")),
+    ])
+    def test_canonical_number(self, value, expected):
+        """Test that equal numbers get one representation"""
+        assert canonical_number(value) == expected
+        assert type(canonical_number(value)) is type(expected)
+    
+    def test_case_insensitive_vibecount(self):
+        """Test that case-insensitive counts fold case"""
+        assert canonical_vibecount("Hello", "h", False) == canonical_vibecount("hello", "H", False)
+        assert canonical_vibecount("Hello", "h", True) != canonical_vibecount("hello", "H", True)
+        assert canonical_vibecount("hello", "h", True) != canonical_vibecount("hello", "h", False)
+    
+    def test_vibecount_all_character_order(self):
+        """Test that the order, repetition and (when case-insensitive) case of characters are ignored"""
+        assert canonical_vibecount_all("Hello", ["l", "h", "l"], True) == canonical_vibecount_all("Hello", "hl", True)
+        assert canonical_vibecount_all("Hello", "H", False) == canonical_vibecount_all("hello", "h", False)
+        assert canonical_vibecount_all("Hello", "H", True) != canonical_vibecount_all("hello", "h", True)
+        assert canonical_vibecount_all("Hello", None, True).key == ("vibecount_all", "Hello", None, True)
+    
+    def test_vibecompare_numeric_normalization(self):
+        """Test that int and float spellings of a number share a key"""
+        assert canonical_vibecompare(1, 2.0) == canonical_vibecompare(1.0, 2)
+    
+    def test_vibecompare_sign_flip(self):
+        """Test that swapped arguments share a key with a flipped sign"""
+        forward = canonical_vibecompare(3, 10)
+        backward = canonical_vibecompare(10.0, 3)
+        
+        assert forward.key == backward.key
+        assert forward.flip != backward.flip
+        assert backward.from_canonical(forward.to_canonical(-1)) == 1
+        assert canonical_vibecompare(4, 4.0).flip is False
+    
+    @pytest.mark.parametrize("expression", ["(2+3)*4", " ( 2 + 3 ) * 4 ", "(2 +3)\t* 4"])
+    def test_expression_whitespace(self, expression):
+        """Test that whitespace between tokens is ignored"""
+        assert canonical_vibeeval(expression) == canonical_vibeeval("(2 + 3) * 4")
+        assert canonical_expression(expression) == "( 2 + 3 ) * 4"
+    
+    def test_expression_digits_stay_separate(self):
+        """Test that whitespace separating numbers is preserved"""
+        assert canonical_expression("1 2") != canonical_expression("12")
+        assert canonical_expression("2 ** 3") != canonical_expression("2 * * 3")
+    
+    def test_non_grammar_expression(self):
+        """Test that expressions outside the grammar only collapse whitespace"""
+        assert canonical_expression("  sqrt( 16 )  ") == "sqrt( 16 )"
+    
+    def test_vibelength_keeps_text(self):
+        """Test that vibelength keys keep exact text"""
+        assert canonical_vibelength("a b") != canonical_vibelength("a  b")
@@ -0,0 +1,180 @@
+"""
+Tests for constrained-output mode
+"""
+
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+from vibeutils import vibecompare, VibeSession
+from vibeutils.trust import STRICT_TRUST_POLICY
+from vibeutils.core import (
+    ANTHROPIC_AVAILABLE, AIProvider, OpenAIProvider, AnthropicProvider, OutputConstraint,
+    COMPARISON_OUTPUT, INJECTION_CHECK_OUTPUT, VALIDATION_OUTPUT, _complete,
+)
+
+
+def _openai_response(content):
+    """Build a chat completion response holding the given content"""
+    response = MagicMock()
+    response.choices[0].message.content = content
+    return response
+
+
+class _FakeEncoding:
+    """Encoding with one token per listed prefix, standing in for tiktoken"""
+
+    tokens = ["SAFE", "IN", "JECTION", "VALID", "-", "0", "1"]
+
+    def encode(self, text):
+        result = []
+        while text:
+            token = next(token for token in self.tokens if text.startswith(token))
+            result.append(self.tokens.index(token))
+            text = text[len(token):]
+        return result
+
+    def decode(self, tokens):
+        return "".join(self.tokens[token] for token in tokens)
+
+
+class TestConstrainedCompletion:
+    """Test cases for routing pipeline stages through output constraints"""
+
+    def test_unconstrained_provider_uses_create_completion(self):
+        """Test that providers not in constrained-output mode get plain completions"""
+        mock_instance = MagicMock()
+        mock_instance.create_completion.return_value = "SAFE"
+
+        assert _complete(mock_instance, INJECTION_CHECK_OUTPUT, messages=[], max_tokens=50) == "SAFE"
+        mock_instance.create_completion.assert_called_once_with(messages=[], max_tokens=50, temperature=0)
+        mock_instance.create_constrained_completion.assert_not_called()
+
+    def test_default_implementation_tightens_budget(self):
+        """Test that the base class applies the stage token budget"""
+        class StubProvider(AIProvider):
+            constrained_output = True
+
+            def __init__(self):
+                self.budgets = []
+
+            def create_completion(self, messages, max_tokens=10, temperature=0):
+                self.budgets.append(max_tokens)
+                return "SAFE"
+
+        provider = StubProvider()
+        _complete(provider, INJECTION_CHECK_OUTPUT, messages=[], max_tokens=50)
+        _complete(provider, OutputConstraint(20), messages=[], max_tokens=10)
+
+        assert provider.budgets == [INJECTION_CHECK_OUTPUT.max_tokens, 10]
+
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_session_enables_constrained_output(self, mock_openai_provider):
+        """Test that sessions create providers in constrained-output mode and pass stage constraints"""
+        os.environ["OPENAI_API_KEY"] = "test-openai-key"
+        try:
+            mock_instance = MagicMock()
+            mock_instance.constrained_output = True
+            mock_openai_provider.return_value = mock_instance
+            mock_instance.create_constrained_completion.side_effect = ["SAFE", "SAFE", "1", "VALID"]
+
+            with VibeSession(model="gpt-4o-mini", constrained_output=True,
+                             trust_policy=STRICT_TRUST_POLICY) as session:
+                assert vibecompare(5, 3, session=session) == 1
+
+            mock_openai_provider.assert_called_once_with("test-openai-key", "gpt-4o-mini", constrained_output=True)
+            constraints = [call.args[1] for call in mock_instance.create_constrained_completion.call_args_list]
+            assert constraints == [INJECTION_CHECK_OUTPUT, INJECTION_CHECK_OUTPUT, COMPARISON_OUTPUT, VALIDATION_OUTPUT]
+            mock_instance.create_completion.assert_not_called()
+        finally:
+            del os.environ["OPENAI_API_KEY"]
+
+
+class TestOpenAIConstrainedOutput:
+    """Test cases for constrained completions on OpenAI"""
+
+    def _provider(self, model="gpt-4o-mini"):
+        provider = OpenAIProvider("fake-key", model, constrained_output=True)
+        provider.client = MagicMock()
+        return provider
+
+    def test_without_tiktoken_uses_stop_and_budget(self):
+        """Test that a tight budget and newline stop are used when tokens cannot be resolved"""
+        provider = self._provider()
+        provider.client.chat.completions.create.return_value = _openai_response("SAFE")
+
+        with patch.dict("sys.modules", {"tiktoken": None}):
+            assert provider.create_constrained_completion([], INJECTION_CHECK_OUTPUT, max_tokens=50) == "SAFE"
+
+        params = provider.client.chat.completions.create.call_args.kwargs
+        assert params["max_completion_tokens"] == INJECTION_CHECK_OUTPUT.max_tokens
+        assert params["stop"] == ["\n"]
+        assert "logit_bias" not in params
+
+    def test_choices_restricted_to_first_tokens(self):
+        """Test that choices become a single biased token mapped back to the full answer"""
+        provider = self._provider()
+        provider.client.chat.completions.create.return_value = _openai_response("IN")
+        fake_tiktoken = MagicMock()
+        fake_tiktoken.encoding_for_model.return_value = _FakeEncoding()
+
+        with patch.dict("sys.modules", {"tiktoken": fake_tiktoken}):
+            assert provider.create_constrained_completion([], INJECTION_CHECK_OUTPUT, max_tokens=50) == "INJECTION"
+
+        params = provider.client.chat.completions.create.call_args.kwargs
+        assert params["max_completion_tokens"] == 1
+        assert params["logit_bias"] == {"0": 100, "1": 100}
+
+    def test_unexpected_token_returned_as_is(self):
+        """Test that output outside the choices is left for validation to reject"""
+        provider = self._provider()
+        provider.client.chat.completions.create.return_value = _openai_response("-")
+        fake_tiktoken = MagicMock()
+        fake_tiktoken.encoding_for_model.return_value = _FakeEncoding()
+
+        with patch.dict("sys.modules", {"tiktoken": fake_tiktoken}):
+            assert provider.create_constrained_completion([], VALIDATION_OUTPUT) == "-"
+
+    def test_o1_models_not_constrained(self):
+        """Test that reasoning models keep their full completion budget"""
+        provider = self._provider("o1-mini")
+        provider.client.chat.completions.create.return_value = _openai_response("SAFE")
+
+        provider.create_constrained_completion([], INJECTION_CHECK_OUTPUT, max_tokens=50)
+
+        params = provider.client.chat.completions.create.call_args.kwargs
+        assert params["max_completion_tokens"] == 50
+        assert "stop" not in params
+
+
+@pytest.mark.skipif(not ANTHROPIC_AVAILABLE, reason="anthropic is not installed")
+class TestAnthropicConstrainedOutput:
+    """Test cases for constrained completions on Anthropic"""
+
+    def _provider(self):
+        provider = AnthropicProvider("fake-key", constrained_output=True)
+        provider.client = MagicMock()
+        return provider
+
+    def test_choices_used_as_stop_sequences(self):
+        """Test that generation stops at an accepted answer, which is restored from the stop sequence"""
+        provider = self._provider()
+        response = MagicMock()
+        response.content[0].text = "-"
+        response.stop_sequence = "1"
+        provider.client.messages.create.return_value = response
+
+        assert provider.create_constrained_completion([], COMPARISON_OUTPUT) == "-1"
+
+        params = provider.client.messages.create.call_args.kwargs
+        assert params["stop_sequences"] == ["-1", "0", "1"]
+        assert params["max_tokens"] == COMPARISON_OUTPUT.max_tokens
+
+    def test_empty_content_at_stop(self):
+        """Test that a response stopped before any text returns the stop sequence"""
+        provider = self._provider()
+        response = MagicMock()
+        response.content = []
+        response.stop_sequence = "SAFE"
+        provider.client.messages.create.return_value = response
+
+        assert provider.create_constrained_completion([], INJECTION_CHECK_OUTPUT, max_tokens=50) == "SAFE"
@@ -0,0 +1,230 @@
+"""
+Tests for call deadlines split across pipeline stages
+"""
+
+import json
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+from vibeutils import vibelength, vibecompare, vibesort, AIProvider, VibeSession, VibeTimeoutError
+from vibeutils.core import OpenAIProvider
+from vibeutils.limiter import AdaptiveLimiter
+
+
+class SlowProvider(AIProvider):
+    """Provider taking a fixed time per request"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.requests = 0
+
+    def create_completion(self, messages, max_tokens=10, temperature=0):
+        self.requests += 1
+        time.sleep(self.delay)
+        content = messages[0]["content"]
+        if content.startswith("You are a security analyzer"):
+            return "SAFE"
+        if content.startswith("You are a response validator"):
+            return "VALID"
+        if content.startswith("Compare"):
+            return "-1"
+        return "5"
+
+
+def _openai_provider(side_effect):
+    """Build an OpenAI provider whose SDK client answers with the given responses"""
+    provider = OpenAIProvider("fake-key", "gpt-4o-mini")
+    provider.client = MagicMock()
+    responses = []
+    for content in side_effect:
+        if isinstance(content, BaseException):
+            responses.append(content)
+        else:
+            response = MagicMock()
+            response.choices[0].message.content = content
+            responses.append(response)
+    provider.client.chat.completions.create.side_effect = responses
+    provider.client.with_options.return_value = provider.client
+
+    def create_raw(**kwargs):
+        # Requests through a limiter read the response headers
+        raw = MagicMock(headers={})
+        raw.parse.return_value = provider.client.chat.completions.create(**kwargs)
+        return raw
+
+    provider.client.chat.completions.with_raw_response.create.side_effect = create_raw
+    return provider
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Answer OpenAI chat completion requests only after the server's delay"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests += 1
+        time.sleep(self.server.delay)
+        body = json.dumps({
+            "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "SAFE"}, "finish_reason": "stop"}],
+        }).encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def slow_server():
+    """Run a local OpenAI-compatible server answering after 3 seconds"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    server.requests = 0
+    server.delay = 3
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestDeadline:
+    """Test cases for the timeout parameter"""
+
+    @pytest.mark.parametrize("timeout", [0, -1, "5", True])
+    def test_invalid_timeout(self, timeout):
+        """Test that timeouts must be positive numbers"""
+        with pytest.raises(ValueError, match="timeout must be a positive number of seconds"):
+            vibelength("hello", provider=SlowProvider(0), timeout=timeout)
+
+    def test_fast_call_within_timeout(self):
+        """Test that calls finishing in time return normally"""
+        assert vibelength("hello", provider=SlowProvider(0), timeout=5) == 5
+
+    def test_exhausted_budget_stops_pipeline(self):
+        """Test that no further stages are requested once the deadline passes"""
+        provider = SlowProvider(0.05)
+
+        with pytest.raises(VibeTimeoutError, match="did not finish within its 0.08s timeout"):
+            vibelength("hello", provider=provider, timeout=0.08)
+
+        assert provider.requests == 2
+
+    def test_timeout_error_is_distinct(self):
+        """Test that timeouts are not reported as provider failures or security blocks"""
+        assert issubclass(VibeTimeoutError, TimeoutError)
+        assert not issubclass(VibeTimeoutError, ValueError)
+
+    def test_budget_split_across_requests(self):
+        """Test that each SDK request gets its share of the remaining time, keeping unused time"""
+        provider = _openai_provider(["SAFE", "5", "VALID"])
+
+        assert vibelength("hello", provider=provider, timeout=3) == 5
+
+        timeouts = [call.kwargs["timeout"] for call in provider.client.with_options.call_args_list]
+        assert timeouts == pytest.approx([1.0, 1.5, 3.0], abs=0.05)
+        assert all(call.kwargs["max_retries"] == 0 for call in provider.client.with_options.call_args_list)
+
+    def test_no_timeout_passed_by_default(self):
+        """Test that SDK requests keep their own timeouts without a deadline"""
+        provider = _openai_provider(["SAFE", "5", "VALID"])
+
+        vibelength("hello", provider=provider)
+
+        provider.client.with_options.assert_not_called()
+        for call in provider.client.chat.completions.create.call_args_list:
+            assert "timeout" not in call.kwargs
+
+    def test_sdk_timeout_raises_timeout_error(self):
+        """Test that an SDK request timing out raises VibeTimeoutError"""
+        openai = pytest.importorskip("openai")
+        error = openai.APITimeoutError(request=MagicMock())
+        provider = _openai_provider(["SAFE", error])
+
+        with pytest.raises(VibeTimeoutError) as excinfo:
+            vibelength("hello", provider=provider, timeout=3)
+
+        assert excinfo.value.__cause__ is error
+
+    def test_sdk_timeout_without_deadline_unchanged(self):
+        """Test that SDK timeouts outside a deadline are reported as API failures"""
+        openai = pytest.importorskip("openai")
+        provider = _openai_provider(["SAFE", openai.APITimeoutError(request=MagicMock())])
+
+        with pytest.raises(Exception, match="AI API call failed"):
+            vibelength("hello", provider=provider)
+
+    def test_slow_server_not_retried(self, slow_server):
+        """Test that a request timing out against a slow server is not retried past the deadline"""
+        pytest.importorskip("openai")
+        provider = OpenAIProvider("fake-key", "gpt-4o-mini",
+                                  base_url=f"http://127.0.0.1:{slow_server.server_address[1]}/v1")
+
+        started = time.monotonic()
+        with pytest.raises(VibeTimeoutError):
+            vibelength("hello", provider=provider, timeout=1.5)
+
+        assert time.monotonic() - started < 1.5
+        assert slow_server.requests == 1
+        provider.close()
+
+
+class TestDeadlineWaits:
+    """Test cases for deadlines on waits outside provider requests"""
+
+    def test_waiting_on_identical_call(self):
+        """Test that a coalesced call stops waiting when its deadline passes"""
+        provider = SlowProvider(0.1)
+
+        with VibeSession(provider=provider, max_workers=2) as session:
+            leader = session.executor.submit(session.vibelength, "hello")
+            started = time.monotonic()
+            while len(session.inflight) == 0 and time.monotonic() - started < 5:
+                time.sleep(0.001)
+
+            with pytest.raises(VibeTimeoutError):
+                session.vibelength("hello", timeout=0.05)
+            assert leader.result() == 5
+
+    def test_waiting_for_limiter_slot(self):
+        """Test that a request waiting for a limiter slot gives up at its deadline"""
+        limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+        start = limiter.acquire()
+
+        with VibeSession(provider=SlowProvider(0), limiter=limiter) as session:
+            with pytest.raises(VibeTimeoutError):
+                session.vibelength("hello", timeout=0.05)
+        limiter.release(start)
+
+    def test_limiter_wait_counts_against_request(self):
+        """Test that time spent waiting for a limiter slot shortens the SDK request timeout"""
+        limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+        start = limiter.acquire()
+        release = threading.Timer(0.5, limiter.release, args=(start,))
+        provider = _openai_provider(["SAFE", "5", "VALID"])
+
+        with VibeSession(provider=provider, limiter=limiter) as session:
+            release.start()
+            assert session.vibelength("hello", timeout=3) == 5
+
+        timeouts = [call.kwargs["timeout"] for call in provider.client.with_options.call_args_list]
+        assert timeouts[0] == pytest.approx(0.5, abs=0.1)
+
+    def test_sort_deadline(self):
+        """Test that a sort stops comparing once its deadline passes"""
+        provider = SlowProvider(0.02)
+
+        with pytest.raises(VibeTimeoutError):
+            vibesort([5, 3, 8, 1, 9, 2], provider=provider, timeout=0.1)
+
+    def test_compare_under_deadline(self):
+        """Test that vibecompare accepts a timeout"""
+        assert vibecompare(1, 2, provider=SlowProvider(0), timeout=5) == -1
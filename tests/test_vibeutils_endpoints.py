@@ -0,0 +1,186 @@
+"""
+Tests for custom API endpoints, organizations and default headers
+"""
+
+import json
+import os
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch, MagicMock
+from vibeutils import VibeSession, vibelength
+from vibeutils.core import ANTHROPIC_AVAILABLE, OpenAIProvider, AnthropicProvider
+
+pytest.importorskip("openai")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer OpenAI chat completion requests, recording them"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        headers = {name.lower(): value for name, value in self.headers.items()}
+        self.server.requests.append({"path": self.path, "headers": headers, "body": body})
+        content = _answer(body["messages"][0]["content"])
+        response = {
+            "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        }
+        payload = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _answer(prompt):
+    """Answer pipeline prompts like a well-behaved model"""
+    if prompt.startswith("You are a security analyzer"):
+        return "SAFE"
+    if prompt.startswith("You are a response validator"):
+        return "VALID"
+    return str(len(prompt.split('Text: "')[1].rsplit('"', 1)[0]))
+
+
+@pytest.fixture
+def stub_server():
+    """Run a local OpenAI-compatible server for the duration of a test"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server, path=""):
+    """Get the base URL of the stub server"""
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+class TestOpenAIEndpoint:
+    """Test cases for OpenAI-compatible servers"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        os.environ["OPENAI_API_KEY"] = "test-openai-key"
+        for name in ["VIBEUTILS_OPENAI_BASE_URL", "VIBEUTILS_OPENAI_ORGANIZATION", "VIBEUTILS_OPENAI_DEFAULT_HEADERS",
+                     "VIBEUTILS_OPENAI_MODEL"]:
+            os.environ.pop(name, None)
+
+    def teardown_method(self):
+        """Clean up test environment"""
+        for name in ["VIBEUTILS_OPENAI_BASE_URL", "VIBEUTILS_OPENAI_ORGANIZATION", "VIBEUTILS_OPENAI_DEFAULT_HEADERS"]:
+            os.environ.pop(name, None)
+
+    def test_base_url_organization_and_headers(self, stub_server):
+        """Test that requests go to the configured server with the organization and headers"""
+        provider = OpenAIProvider("local-key", "llama-3-8b", base_url=_url(stub_server, "/v1"),
+                                  organization="org-rack", default_headers={"X-Route": "rack-7"})
+
+        assert provider.create_completion([{"role": "user", "content": 'Text: "hello"'}]) == "5"
+
+        request = stub_server.requests[0]
+        assert request["path"] == "/v1/chat/completions"
+        assert request["headers"]["authorization"] == "Bearer local-key"
+        assert request["headers"]["openai-organization"] == "org-rack"
+        assert request["headers"]["x-route"] == "rack-7"
+        assert request["body"]["model"] == "llama-3-8b"
+        assert request["body"]["max_tokens"] == 10
+        provider.close()
+
+    def test_environment_configuration(self, stub_server):
+        """Test that the endpoint is read from environment variables"""
+        os.environ["VIBEUTILS_OPENAI_BASE_URL"] = _url(stub_server, "/v1")
+        os.environ["VIBEUTILS_OPENAI_DEFAULT_HEADERS"] = '{"X-Route": "rack-7"}'
+
+        assert vibelength("strawberry", model="local-model") == 10
+
+        assert len(stub_server.requests) == 3
+        assert all(request["headers"]["x-route"] == "rack-7" for request in stub_server.requests)
+
+    def test_invalid_header_variable(self):
+        """Test that headers must be given as a JSON object"""
+        os.environ["VIBEUTILS_OPENAI_DEFAULT_HEADERS"] = "X-Route: rack-7"
+
+        with pytest.raises(ValueError, match="VIBEUTILS_OPENAI_DEFAULT_HEADERS must be a JSON object"):
+            OpenAIProvider("local-key")
+
+    def test_session_endpoint(self, stub_server):
+        """Test that a session creates its providers for the configured endpoint"""
+        with VibeSession(model="local-model", base_url=_url(stub_server, "/v1"),
+                         default_headers={"X-Route": "rack-7"}) as session:
+            assert session.vibelength("kiwi") == 4
+
+        assert [request["path"] for request in stub_server.requests] == ["/v1/chat/completions"] * 3
+        assert stub_server.requests[0]["headers"]["x-route"] == "rack-7"
+
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_options_only_passed_when_configured(self, mock_openai_provider):
+        """Test that sessions without endpoint configuration create providers as before"""
+        mock_openai_provider.return_value = MagicMock()
+
+        VibeSession(model="gpt-4o-mini").get_provider()
+        VibeSession(model="gpt-4o-mini", organization="org-1").get_provider()
+
+        assert mock_openai_provider.call_args_list[0].args == ("test-openai-key", "gpt-4o-mini")
+        assert mock_openai_provider.call_args_list[0].kwargs == {}
+        assert mock_openai_provider.call_args_list[1].kwargs == {"organization": "org-1"}
+
+    def test_organization_is_openai_only(self):
+        """Test that organizations are rejected for Anthropic sessions"""
+        os.environ["ANTHROPIC_API_KEY"] = "test-anthropic-key"
+        try:
+            with pytest.raises(ValueError, match="organization is only supported by the openai provider"):
+                VibeSession(provider="anthropic", organization="org-1")
+        finally:
+            del os.environ["ANTHROPIC_API_KEY"]
+
+    def test_api_params_overridable(self):
+        """Test that subclasses can adjust the request parameters for their models"""
+        class LocalProvider(OpenAIProvider):
+            MAX_COMPLETION_TOKENS_MODELS = ("local-",)
+            NO_TEMPERATURE_MODELS = ("local-reasoner",)
+
+        assert LocalProvider("key", "local-chat")._get_api_params(10, 0) == {
+            "model": "local-chat", "temperature": 0, "max_completion_tokens": 10,
+        }
+        assert LocalProvider("key", "local-reasoner")._get_api_params(10, 0) == {
+            "model": "local-reasoner", "max_completion_tokens": 10,
+        }
+        assert LocalProvider("key", "gpt-4o")._get_api_params(10, 0)["max_tokens"] == 10
+
+
+@pytest.mark.skipif(not ANTHROPIC_AVAILABLE, reason="anthropic package is not installed")
+class TestAnthropicEndpoint:
+    """Test cases for custom Anthropic endpoints"""
+
+    def teardown_method(self):
+        """Clean up test environment"""
+        for name in ["VIBEUTILS_ANTHROPIC_BASE_URL", "VIBEUTILS_ANTHROPIC_DEFAULT_HEADERS"]:
+            os.environ.pop(name, None)
+
+    def test_base_url_and_headers(self):
+        """Test that the client is configured with the endpoint and headers"""
+        provider = AnthropicProvider("test-anthropic-key", base_url="http://127.0.0.1:8080",
+                                     default_headers={"X-Route": "rack-7"})
+
+        assert str(provider.client.base_url).rstrip("/") == "http://127.0.0.1:8080"
+        assert provider.client.default_headers["X-Route"] == "rack-7"
+        provider.close()
+
+    def test_environment_configuration(self):
+        """Test that the endpoint is read from environment variables"""
+        os.environ["VIBEUTILS_ANTHROPIC_BASE_URL"] = "http://127.0.0.1:8080"
+        os.environ["VIBEUTILS_ANTHROPIC_DEFAULT_HEADERS"] = '{"X-Route": "rack-7"}'
+
+        provider = AnthropicProvider("test-anthropic-key")
+
+        assert provider.base_url == "http://127.0.0.1:8080"
+        assert provider.client.default_headers["X-Route"] == "rack-7"
+        provider.close()
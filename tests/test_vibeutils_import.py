@@ -0,0 +1,60 @@
+"""
+Import-time benchmark for vibeutils
+"""
+
+import json
+import subprocess
+import sys
+
+# Generous ceiling for `import vibeutils` in a fresh interpreter; importing
+# the provider SDKs eagerly takes several times longer than this
+IMPORT_TIME_BUDGET = 0.5
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import vibeutils
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "elapsed": elapsed,
+    "anthropic_available": vibeutils.core.ANTHROPIC_AVAILABLE,
+    "modules": sorted(m for m in ("openai", "anthropic", "httpx", "importlib.metadata") if m in sys.modules),
+}))
+"""
+
+
+def _import_vibeutils() -> dict:
+    """Import vibeutils in a fresh interpreter and report what it loaded"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output)
+
+
+class TestImportTime:
+    """Benchmark guarding the cost of `import vibeutils`"""
+    
+    def test_provider_sdks_not_imported(self):
+        """Test that importing vibeutils does not load the provider SDKs or package metadata"""
+        result = _import_vibeutils()
+        
+        assert result["modules"] == []
+    
+    def test_anthropic_available_without_import(self):
+        """Test that ANTHROPIC_AVAILABLE reflects the installed package without importing it"""
+        result = _import_vibeutils()
+        
+        try:
+            import anthropic  # noqa: F401
+            installed = True
+        except ImportError:
+            installed = False
+        
+        assert result["anthropic_available"] == installed
+    
+    def test_import_time_within_budget(self):
+        """Test that importing vibeutils stays within the startup budget"""
+        best = min(_import_vibeutils()["elapsed"] for _ in range(3))
+        
+        assert best < IMPORT_TIME_BUDGET
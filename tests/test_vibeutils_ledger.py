@@ -0,0 +1,242 @@
+"""
+Tests for the cost ledger and spending budgets
+"""
+
+import json
+import os
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from vibeutils import AIProvider, VibeSession, VibeTimeoutError
+from vibeutils.cache import ResultCache
+from vibeutils.cli import main
+from vibeutils.core import OpenAIProvider
+from vibeutils.ledger import BudgetExceededError, CostLedger, ModelPrice, load_prices
+
+
+def _answer(prompt):
+    """Answer pipeline prompts like a well-behaved model"""
+    if prompt.startswith("You are a security analyzer"):
+        return "SAFE"
+    if prompt.startswith("You are a response validator"):
+        return "VALID"
+    if prompt.startswith("Compare"):
+        return "1"
+    return str(len(prompt.split('Text: "')[1].rsplit('"', 1)[0]))
+
+
+def _openai_provider(prompt_tokens=100, completion_tokens=2):
+    """Build an OpenAI provider whose responses report fixed token usage"""
+    provider = OpenAIProvider("fake-key", "gpt-4o-mini")
+    provider.client = MagicMock()
+
+    def create(**kwargs):
+        content = _answer(kwargs["messages"][0]["content"])
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens),
+        )
+
+    provider.client.chat.completions.create.side_effect = create
+    return provider
+
+
+class SilentProvider(AIProvider):
+    """Provider reporting no token usage"""
+
+    def __init__(self):
+        self.model = "gpt-4o"
+
+    def create_completion(self, messages, max_tokens=10, temperature=0):
+        return _answer(messages[0]["content"])
+
+
+class TestPrices:
+    """Test cases for pricing tokens"""
+
+    def test_longest_prefix_wins(self):
+        """Test that models are priced by their longest matching name prefix"""
+        ledger = CostLedger()
+
+        assert ledger.price("gpt-4o-mini-2024-07-18") == ModelPrice(0.15, 0.60)
+        assert ledger.price("gpt-4o-2024-08-06") == ModelPrice(2.50, 10.00)
+        assert ledger.price("local-llama") is None
+        assert ModelPrice(2.0, 8.0).cost(1_000_000, 500_000) == 6.0
+
+    def test_custom_prices(self):
+        """Test that configured prices override and extend the defaults"""
+        ledger = CostLedger(prices={"gpt-4o-mini": [0.1, 0.2], "local": ModelPrice(0.0, 1.0)})
+
+        assert ledger.price("gpt-4o-mini") == ModelPrice(0.1, 0.2)
+        assert ledger.price("local-llama") == ModelPrice(0.0, 1.0)
+        with pytest.raises(ValueError, match="Invalid price for model bad"):
+            CostLedger(prices={"bad": [1.0]})
+
+    def test_load_prices(self, tmp_path):
+        """Test that price tables are loaded from JSON files"""
+        path = tmp_path / "prices.json"
+        path.write_text(json.dumps({"gpt-4o-mini": [0.1, 0.2], "local": {"input": 0, "output": 1}}))
+
+        assert load_prices(str(path)) == {"gpt-4o-mini": ModelPrice(0.1, 0.2), "local": ModelPrice(0.0, 1.0)}
+        path.write_text("[]")
+        with pytest.raises(ValueError, match="expected a JSON object"):
+            load_prices(str(path))
+
+    def test_invalid_budgets(self):
+        """Test that budgets and the throttle rate are validated"""
+        with pytest.raises(ValueError, match="hard_budget must be a non-negative amount"):
+            CostLedger(hard_budget=-1)
+        with pytest.raises(ValueError, match="throttle_rate must be a positive number"):
+            CostLedger(throttle_rate=0)
+
+
+class TestLedger:
+    """Test cases for recording spending and enforcing budgets"""
+
+    def test_record_and_summaries(self):
+        """Test that completions are summarized per function and stage"""
+        ledger = CostLedger(prices={"model": [1.0, 10.0]})
+        ledger.admit("vibelength")
+        ledger.record("model", "vibelength", "injection_check", 1000, 10)
+        ledger.record("model", "vibelength", "answer", 1000, 10)
+        ledger.record("unknown", "vibecount", "answer", 500, 5, estimated=True)
+
+        assert ledger.spent == pytest.approx(0.0022)
+        stats = ledger.stats()
+        assert (stats["calls"], stats["completions"], stats["input_tokens"], stats["estimated"]) == (1, 3, 2500, 1)
+        assert stats["unpriced"] == ["unknown"]
+        functions = ledger.function_stats()
+        assert functions["vibelength"]["calls"] == 1
+        assert functions["vibelength"]["cost"] == pytest.approx(0.0022)
+        assert functions["vibelength"]["stages"]["answer"]["output_tokens"] == 10
+        assert functions["vibecount"]["calls"] == 0
+        report = ledger.report()
+        assert "vibelength: 1 calls  2000 in  20 out  $0.0022" in report
+        assert "  injection_check: 1 completions" in report
+        assert report.endswith("unpriced models: unknown")
+
+    def test_hard_budget_refuses(self):
+        """Test that new calls are refused once the hard budget has been spent"""
+        ledger = CostLedger(prices={"model": [1.0, 1.0]}, hard_budget=0.001)
+        ledger.admit("vibelength")
+        ledger.record("model", "vibelength", "answer", 1000, 0)
+
+        with pytest.raises(BudgetExceededError, match=r"Hard budget of \$0.001 spent"):
+            ledger.admit("vibelength")
+        assert ledger.stats()["refused"] == 1
+
+    def test_soft_budget_throttles(self):
+        """Test that calls are paced to the throttle rate once the soft budget has been spent"""
+        ledger = CostLedger(soft_budget=0, throttle_rate=20)
+
+        started = time.monotonic()
+        for _ in range(4):
+            ledger.admit("vibelength")
+
+        assert time.monotonic() - started >= 0.14
+        assert ledger.stats()["throttled"] == 4
+
+        slow = CostLedger(soft_budget=0, throttle_rate=0.5)
+        slow.admit("vibelength")
+        with pytest.raises(TimeoutError):
+            slow.admit("vibelength", timeout=0.1)
+
+    def test_parent_budget(self):
+        """Test that parent ledgers record their children's completions and enforce their budgets"""
+        process = CostLedger(prices={"model": [1.0, 1.0]}, hard_budget=0.001)
+        job = CostLedger(prices={"model": [1.0, 1.0]}, parent=process)
+        other_job = CostLedger(parent=process)
+        job.admit("vibelength")
+        job.record("model", "vibelength", "answer", 1000, 0)
+
+        assert process.spent == pytest.approx(0.001)
+        assert other_job.spent == 0
+        with pytest.raises(BudgetExceededError):
+            other_job.admit("vibecompare")
+
+
+class TestMeteredSession:
+    """Test cases for metering the calls of a session"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        os.environ["OPENAI_API_KEY"] = "test-openai-key"
+        os.environ.pop("VIBEUTILS_PROVIDER", None)
+
+    def test_provider_usage_recorded(self):
+        """Test that provider usage data is recorded per stage and priced by model"""
+        ledger = CostLedger()
+
+        with VibeSession(provider=_openai_provider(), ledger=ledger) as session:
+            assert session.vibelength("kiwi") == 4
+            assert session.vibecompare(2, 1) == 1
+
+        functions = ledger.function_stats()
+        assert set(functions["vibelength"]["stages"]) == {"injection_check", "answer", "validation"}
+        assert functions["vibelength"]["input_tokens"] == 300
+        assert set(functions["vibecompare"]["stages"]) == {"answer", "validation"}
+        assert ledger.stats()["estimated"] == 0
+        assert ledger.spent == pytest.approx(5 * (100 * 0.15 + 2 * 0.60) / 1_000_000)
+
+    def test_missing_usage_estimated(self):
+        """Test that tokens are estimated when the provider reports no usage"""
+        ledger = CostLedger()
+
+        with VibeSession(provider=SilentProvider(), ledger=ledger) as session:
+            session.vibelength("kiwi")
+
+        stats = ledger.stats()
+        assert stats["completions"] == stats["estimated"] == 3
+        assert stats["input_tokens"] > 0 and ledger.spent > 0
+
+    def test_budget_refuses_calls(self):
+        """Test that session calls are refused once the hard budget has been spent"""
+        ledger = CostLedger(hard_budget=0.00001)
+
+        with VibeSession(provider=_openai_provider(prompt_tokens=1000), ledger=ledger) as session:
+            session.vibelength("kiwi")
+            with pytest.raises(BudgetExceededError):
+                session.vibelength("fig")
+
+    def test_cache_hits_not_budgeted(self):
+        """Test that calls served from the cache are neither refused nor throttled"""
+        ledger = CostLedger(hard_budget=0.00001, soft_budget=0, throttle_rate=0.5)
+
+        with VibeSession(provider=_openai_provider(prompt_tokens=1000), ledger=ledger,
+                         cache=ResultCache()) as session:
+            session.vibelength("kiwi")
+            started = time.monotonic()
+            assert session.vibelength("kiwi") == 4
+            assert time.monotonic() - started < 1
+            with pytest.raises(BudgetExceededError):
+                session.vibelength("fig")
+
+        stats = ledger.stats()
+        assert (stats["calls"], stats["throttled"], stats["refused"]) == (1, 1, 1)
+
+    def test_throttling_respects_deadline(self):
+        """Test that throttled calls give up once their deadline would pass"""
+        ledger = CostLedger(soft_budget=0, throttle_rate=0.5)
+
+        with VibeSession(provider=_openai_provider(), ledger=ledger) as session:
+            session.vibelength("kiwi")
+            with pytest.raises(VibeTimeoutError):
+                session.vibelength("fig", timeout=0.1)
+
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_cli_budget_report(self, mock_openai_provider, tmp_path, capsys):
+        """Test that the command-line tool meters batches and prints the spend summary"""
+        mock_instance = MagicMock()
+        mock_instance.model = "gpt-4o-mini"
+        mock_instance.create_completion.side_effect = lambda messages, **kwargs: _answer(messages[0]["content"])
+        mock_openai_provider.return_value = mock_instance
+        path = tmp_path / "texts.txt"
+        path.write_text("kiwi\nfig\n")
+
+        assert main(["vibelength", str(path), "--budget", "1", "--no-progress"]) == 0
+
+        err = capsys.readouterr().err
+        assert "vibelength: 2 calls" in err
+        assert "  validation: 2 completions" in err
+        assert "0 refused" in err
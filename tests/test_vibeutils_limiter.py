@@ -0,0 +1,249 @@
+"""
+Tests for the adaptive concurrency limiter
+"""
+
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from vibeutils import AIProvider, VibeSession
+from vibeutils.core import OpenAIProvider
+from vibeutils.limiter import AdaptiveLimiter, _LimitedProvider, _reset_delay
+
+
+class RateLimitError(Exception):
+    """Stand-in for an SDK rate-limit error"""
+
+    status_code = 429
+
+    def __init__(self, headers=None):
+        super().__init__("Error code: 429")
+        self.response = MagicMock()
+        self.response.headers = headers or {}
+
+
+class APITimeoutError(Exception):
+    """Stand-in for an SDK timeout error"""
+
+
+class CountingProvider(AIProvider):
+    """Provider tracking the highest number of concurrent requests"""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def create_completion(self, messages, max_tokens=10, temperature=0):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.01)
+        with self._lock:
+            self.active -= 1
+        content = messages[0]["content"]
+        if content.startswith("You are a security analyzer"):
+            return "SAFE"
+        if content.startswith("You are a response validator"):
+            return "VALID"
+        return "5"
+
+
+class TestAdaptiveLimiter:
+    """Test cases for AIMD limit adjustments"""
+
+    def test_invalid_configuration(self):
+        """Test that inconsistent limits and factors are rejected"""
+        with pytest.raises(ValueError, match="Limits must satisfy"):
+            AdaptiveLimiter(initial_limit=10, max_limit=5)
+        with pytest.raises(ValueError, match="backoff must be between 0 and 1"):
+            AdaptiveLimiter(backoff=1.5)
+        with pytest.raises(ValueError, match="latency_tolerance must be at least 1"):
+            AdaptiveLimiter(latency_tolerance=0.5)
+        with pytest.raises(ValueError, match="max_retries must be a non-negative integer"):
+            AdaptiveLimiter(max_retries=-1)
+
+    def test_additive_increase(self):
+        """Test that healthy requests grow the limit by about one per limit's worth of successes"""
+        limiter = AdaptiveLimiter(initial_limit=4)
+
+        for _ in range(4):
+            limiter.release(limiter.acquire() - 0.1)
+        assert limiter.limit == 4
+
+        limiter.release(limiter.acquire() - 0.1)
+        assert limiter.limit == 5
+
+    def test_increase_capped(self):
+        """Test that the limit never exceeds max_limit"""
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+
+        for _ in range(10):
+            limiter.release(limiter.acquire())
+
+        assert limiter.limit == 2
+
+    def test_slow_requests_hold_limit(self):
+        """Test that latency above the tolerance stops additive increase"""
+        limiter = AdaptiveLimiter(initial_limit=4)
+
+        limiter.release(limiter.acquire() - 0.1)
+        stats = limiter.stats()
+        limiter.release(limiter.acquire() - 1.0)
+
+        assert limiter._limit == pytest.approx(4.25)
+        assert limiter.stats()["limit"] == stats["limit"]
+
+    def test_multiplicative_decrease_on_rate_limit(self):
+        """Test that a 429 halves the limit"""
+        limiter = AdaptiveLimiter(initial_limit=8)
+
+        limiter.release(limiter.acquire(), RateLimitError())
+
+        assert limiter.limit == 4
+        assert limiter.stats()["throttled"] == 1
+
+    def test_decrease_once_per_burst(self):
+        """Test that concurrent failures started before a cut do not cut again"""
+        limiter = AdaptiveLimiter(initial_limit=8)
+        starts = [limiter.acquire() for _ in range(3)]
+
+        for start in starts:
+            limiter.release(start, RateLimitError())
+
+        assert limiter.limit == 4
+        limiter.release(limiter.acquire(), RateLimitError())
+        assert limiter.limit == 2
+
+    def test_timeout_decreases_limit(self):
+        """Test that timeouts back off like rate limiting"""
+        limiter = AdaptiveLimiter(initial_limit=8, min_limit=3)
+
+        limiter.release(limiter.acquire(), APITimeoutError())
+        limiter.release(limiter.acquire(), APITimeoutError())
+
+        assert limiter.limit == 3
+
+    def test_other_errors_ignored(self):
+        """Test that errors unrelated to congestion leave the limit unchanged"""
+        limiter = AdaptiveLimiter(initial_limit=8)
+
+        limiter.release(limiter.acquire(), ValueError("bad request"))
+
+        assert limiter.limit == 8
+        assert limiter.stats()["throttled"] == 0
+
+    def test_retry_after_pauses_requests(self):
+        """Test that Retry-After holds back new requests"""
+        limiter = AdaptiveLimiter(initial_limit=4)
+        limiter.release(limiter.acquire(), RateLimitError({"retry-after-ms": "50"}))
+
+        start = time.monotonic()
+        limiter.release(limiter.acquire())
+
+        assert time.monotonic() - start >= 0.04
+
+    def test_spent_quota_pauses_requests(self):
+        """Test that quota headers of a successful response hold back new requests until the reset"""
+        limiter = AdaptiveLimiter(initial_limit=4)
+        limiter.release(limiter.acquire(), headers={"x-ratelimit-remaining-requests": "0",
+                                                    "x-ratelimit-reset-requests": "50ms"})
+
+        start = time.monotonic()
+        limiter.release(limiter.acquire(), headers={"x-ratelimit-remaining-requests": "10",
+                                                    "x-ratelimit-reset-requests": "5s"})
+        limiter.release(limiter.acquire())
+
+        assert time.monotonic() - start == pytest.approx(0.05, abs=0.04)
+
+    def test_reset_formats(self):
+        """Test that quota resets are read as seconds, durations and RFC 3339 times"""
+        assert _reset_delay("2") == 2
+        assert _reset_delay("6m0s") == 360
+        assert _reset_delay("1h2m3.5s") == pytest.approx(3723.5)
+        assert _reset_delay("20ms") == pytest.approx(0.02)
+        assert _reset_delay("2000-01-01T00:00:00Z") < 0
+        assert _reset_delay("soon") is None
+
+    def test_acquire_blocks_at_limit(self):
+        """Test that requests beyond the limit wait for a free slot"""
+        limiter = AdaptiveLimiter(initial_limit=1)
+        first = limiter.acquire()
+        acquired = threading.Event()
+
+        def second():
+            limiter.release(limiter.acquire())
+            acquired.set()
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        assert not acquired.wait(0.05)
+        assert limiter.stats()["in_flight"] == 1
+        limiter.release(first)
+        assert acquired.wait(5)
+        thread.join()
+
+
+class TestSessionLimiter:
+    """Test cases for limiting session requests"""
+
+    def test_rate_limited_request_retried(self):
+        """Test that rate-limited requests are retried by the limiter after backing off"""
+        provider = MagicMock(spec=AIProvider)
+        provider.model = "gpt-4o-mini"
+        provider.create_completion.side_effect = [RateLimitError({"retry-after-ms": "20"}), "SAFE"]
+        limiter = AdaptiveLimiter(initial_limit=4)
+
+        instance = _LimitedProvider(provider, limiter)
+
+        assert instance.create_completion([{"role": "user", "content": "hi"}]) == "SAFE"
+        assert limiter.stats()["retries"] == 1
+        assert limiter.limit == 2
+
+    def test_sdk_retries_disabled_and_headers_read(self):
+        """Test that SDK requests through a limiter are not retried by the SDK and report their quota headers"""
+        provider = OpenAIProvider("fake-key", "gpt-4o-mini")
+        provider.client = MagicMock()
+        provider.client.with_options.return_value = provider.client
+        raw = provider.client.chat.completions.with_raw_response.create.return_value
+        raw.headers = {"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "50ms"}
+        raw.parse.return_value.choices[0].message.content = "SAFE"
+        limiter = AdaptiveLimiter(initial_limit=4)
+        instance = _LimitedProvider(provider, limiter)
+
+        assert instance.create_completion([{"role": "user", "content": "hi"}]) == "SAFE"
+        start = time.monotonic()
+        instance.create_completion([{"role": "user", "content": "hi"}])
+
+        assert time.monotonic() - start >= 0.04
+        provider.client.with_options.assert_called_with(max_retries=0)
+        provider.client.chat.completions.create.assert_not_called()
+
+    def test_requests_limited(self):
+        """Test that concurrent session calls stay within the limit"""
+        provider = CountingProvider()
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+
+        with VibeSession(provider=provider, max_workers=8, limiter=limiter) as session:
+            session.inflight = None
+            assert session.map(session.vibelength, ["hello"] * 8) == [5] * 8
+
+        assert provider.peak <= 2
+        assert limiter.stats()["requests"] == 24
+        assert limiter.stats()["in_flight"] == 0
+
+    def test_provider_wrapped_transparently(self):
+        """Test that the wrapped provider keeps its cache label and forwards errors"""
+        provider = MagicMock(spec=AIProvider)
+        provider.model = "gpt-4o-mini"
+        provider.create_completion.side_effect = RateLimitError()
+        limiter = AdaptiveLimiter(initial_limit=4, max_retries=0)
+
+        session = VibeSession(provider=provider, limiter=limiter)
+        instance = session.get_provider()
+
+        assert isinstance(instance, _LimitedProvider)
+        assert instance.model == "gpt-4o-mini"
+        with pytest.raises(RateLimitError):
+            instance.create_completion([{"role": "user", "content": "hi"}])
+        assert limiter.limit == 2
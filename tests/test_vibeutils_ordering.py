@@ -0,0 +1,129 @@
+"""
+Tests for transitive inference of vibecompare results
+"""
+
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+from vibeutils import vibecompare, ComparisonKnowledge, VibeSession
+
+
+class TestComparisonKnowledge:
+    """Test cases for the ordering graph"""
+    
+    def test_unknown_pairs(self):
+        """Test that nothing is inferred without recorded answers"""
+        knowledge = ComparisonKnowledge()
+        
+        assert knowledge.infer(1, 2) is None
+        assert knowledge.infer(3, 3) is None
+        assert knowledge.stats()["values"] == 0
+    
+    def test_direct_and_mirrored_answers(self):
+        """Test that a recorded answer is inferred in both orientations"""
+        knowledge = ComparisonKnowledge()
+        knowledge.record(1, 2, -1)
+        
+        assert knowledge.infer(1, 2) == -1
+        assert knowledge.infer(2, 1) == 1
+    
+    def test_transitivity(self):
+        """Test that a < b and b < c infers a < c"""
+        knowledge = ComparisonKnowledge()
+        knowledge.record(1, 2, -1)
+        knowledge.record(3, 2, 1)
+        knowledge.record(3, 4, -1)
+        
+        assert knowledge.infer(1, 4) == -1
+        assert knowledge.infer(4, 1) == 1
+        assert knowledge.infer(2, 4) == -1
+    
+    def test_equality_classes(self):
+        """Test that equal answers merge classes and carry their ordering"""
+        knowledge = ComparisonKnowledge()
+        knowledge.record(5, 5.0, 0)
+        knowledge.record(7, 8, 0)
+        knowledge.record(5.0, 7, -1)
+        knowledge.record(1, 8, 1)
+        
+        assert knowledge.infer(8, 7) == 0
+        assert knowledge.infer(5, 8) == -1
+        assert knowledge.infer(1, 5) == 1
+        assert knowledge.stats()["classes"] == 3
+    
+    def test_incomparable_pairs(self):
+        """Test that unrelated branches are not inferred"""
+        knowledge = ComparisonKnowledge()
+        knowledge.record(1, 3, -1)
+        knowledge.record(2, 3, -1)
+        
+        assert knowledge.infer(1, 2) is None
+    
+    def test_nan_is_ignored(self):
+        """Test that NaN never enters the graph"""
+        knowledge = ComparisonKnowledge()
+        knowledge.record(float("nan"), 1, -1)
+        
+        assert knowledge.infer(float("nan"), 1) is None
+        assert knowledge.stats()["recorded"] == 0
+    
+    def test_calls_avoided_counter(self):
+        """Test that successful inferences are counted"""
+        knowledge = ComparisonKnowledge()
+        knowledge.record(1, 2, -1)
+        knowledge.record(2, 3, -1)
+        knowledge.infer(1, 3)
+        knowledge.infer(3, 1)
+        knowledge.infer(1, 4)
+        
+        assert knowledge.calls_avoided == 2
+        assert knowledge.stats() == {"recorded": 2, "calls_avoided": 2, "values": 3, "classes": 3}
+
+
+class TestVibecompareKnowledge:
+    """Test cases for vibecompare with a knowledge store"""
+    
+    def setup_method(self):
+        """Set up test environment"""
+        os.environ["OPENAI_API_KEY"] = "test-openai-key"
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_inferred_comparison_skips_api(self, mock_openai_provider):
+        """Test that transitively known results make no API calls"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["-1", "VALID"] * 2
+        knowledge = ComparisonKnowledge()
+        
+        assert vibecompare(1, 2, knowledge=knowledge) == -1
+        assert vibecompare(2, 3, knowledge=knowledge) == -1
+        assert vibecompare(3, 1, knowledge=knowledge) == 1
+        
+        assert mock_instance.create_completion.call_count == 4
+        assert knowledge.calls_avoided == 1
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_session_knowledge(self, mock_openai_provider):
+        """Test that a session's store is used by its vibecompare calls"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["0", "VALID"]
+        
+        with VibeSession(knowledge=ComparisonKnowledge()) as session:
+            assert session.vibecompare(4, 4.0) == 0
+            assert session.vibecompare(4.0, 4) == 0
+            assert session.knowledge.calls_avoided == 1
+        
+        assert mock_instance.create_completion.call_count == 2
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_failed_comparisons_not_recorded(self, mock_openai_provider):
+        """Test that only validated answers are recorded"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["2", "VALID"]
+        knowledge = ComparisonKnowledge()
+        
+        with pytest.raises(Exception, match="AI API returned invalid comparison result"):
+            vibecompare(1, 2, knowledge=knowledge)
+        assert knowledge.stats()["recorded"] == 0
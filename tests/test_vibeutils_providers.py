@@ -5,7 +5,8 @@ Tests for vibeutils package with multi-provider support
 import os
 import pytest
 from unittest.mock import patch, MagicMock
-from vibeutils import vibecount, vibecompare, vibeeval, Provider
+from collections import Counter
+from vibeutils import vibecount, vibecount_all, vibecompare, vibeeval, Provider
 
 
 class TestProviderSelection:
@@ -94,13 +95,13 @@ class TestVibecountProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        # Mock responses: security check 1, security check 2, main task, validation
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "3", "VALID"]
+        # Mock responses: security check text (the letter is trusted), main task, validation
+        mock_instance.create_completion.side_effect = ["SAFE", "3", "VALID"]
         
         result = vibecount("strawberry", "r", case_sensitive=True, provider="openai")
         
         assert result == 3
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 3
         mock_openai_provider.assert_called_with("test-openai-key", "gpt-4o-mini")
     
     @patch('vibeutils.core.AnthropicProvider')
@@ -109,13 +110,13 @@ class TestVibecountProviders:
         mock_instance = MagicMock()
         mock_anthropic_provider.return_value = mock_instance
         
-        # Mock responses: security check 1, security check 2, main task, validation
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "3", "VALID"]
+        # Mock responses: security check text (the letter is trusted), main task, validation
+        mock_instance.create_completion.side_effect = ["SAFE", "3", "VALID"]
         
         result = vibecount("strawberry", "r", case_sensitive=True, provider="anthropic")
         
         assert result == 3
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 3
         mock_anthropic_provider.assert_called_with("test-anthropic-key", "claude-sonnet-4-20250514")
     
     @patch('vibeutils.core.OpenAIProvider')
@@ -124,12 +125,12 @@ class TestVibecountProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "4", "VALID"]
+        mock_instance.create_completion.side_effect = ["SAFE", "4", "VALID"]
         
         result = vibecount("Strawberry", "r", case_sensitive=False, provider="openai")
         
         assert result == 4
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 3
     
     @patch('vibeutils.core.AnthropicProvider')
     def test_anthropic_case_insensitive_count(self, mock_anthropic_provider):
@@ -137,12 +138,12 @@ class TestVibecountProviders:
         mock_instance = MagicMock()
         mock_anthropic_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "4", "VALID"]
+        mock_instance.create_completion.side_effect = ["SAFE", "4", "VALID"]
         
         result = vibecount("Strawberry", "r", case_sensitive=False, provider="anthropic")
         
         assert result == 4
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 3
     
     @patch('vibeutils.core.OpenAIProvider')
     def test_prompt_injection_detected(self, mock_openai_provider):
@@ -162,13 +163,110 @@ class TestVibecountProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        # Security checks pass, main task succeeds, but validation fails
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "not a number", "INVALID"]
+        # Security check of the text passes, main task succeeds, but validation fails
+        mock_instance.create_completion.side_effect = ["SAFE", "not a number", "INVALID"]
         
         with pytest.raises(Exception, match="Response validation failed"):
             vibecount("test", "t", provider="openai")
 
 
+class TestVibecountAllProviders:
+    """Test cases for vibecount_all function with different providers"""
+    
+    def setup_method(self):
+        """Set up test environment"""
+        os.environ["OPENAI_API_KEY"] = "test-openai-key"
+        os.environ["ANTHROPIC_API_KEY"] = "test-anthropic-key"
+    
+    def teardown_method(self):
+        """Clean up test environment"""
+        for key in ["OPENAI_API_KEY", "ANTHROPIC_API_KEY"]:
+            if key in os.environ:
+                del os.environ[key]
+    
+    def test_invalid_characters(self):
+        """Test that ValueError is raised for multi-character entries"""
+        with pytest.raises(ValueError, match="characters must be single characters"):
+            vibecount_all("test", ["t", "es"])
+    
+    def test_invalid_text(self):
+        """Test that ValueError is raised for non-string text"""
+        with pytest.raises(ValueError, match="text must be a string"):
+            vibecount_all(123)
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_openai_all_present_characters(self, mock_openai_provider):
+        """Test counting every present character with one completion"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        
+        # Mock responses: security check, main task, validation
+        mock_instance.create_completion.side_effect = ["SAFE", '{"h": 1, "e": 1, "l": 2, "o": 1}', "VALID"]
+        
+        result = vibecount_all("hello", provider="openai")
+        
+        assert result == Counter({"l": 2, "h": 1, "e": 1, "o": 1})
+        assert mock_instance.create_completion.call_count == 3
+    
+    @patch('vibeutils.core.AnthropicProvider')
+    def test_anthropic_requested_characters(self, mock_anthropic_provider):
+        """Test counting requested characters, with omitted ones reported as zero"""
+        mock_instance = MagicMock()
+        mock_anthropic_provider.return_value = mock_instance
+        
+        # Mock responses: security check text (the characters are trusted), main task, validation
+        mock_instance.create_completion.side_effect = ["SAFE", '{"r": 3}', "VALID"]
+        
+        result = vibecount_all("strawberry", "rz", provider="anthropic")
+        
+        assert result == Counter({"r": 3, "z": 0})
+        assert list(result) == ["r", "z"]
+        assert mock_instance.create_completion.call_count == 3
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_case_insensitive_folds_keys(self, mock_openai_provider):
+        """Test that case-insensitive counting folds characters and response keys"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["SAFE", '{"R": 1, "r": 2, "S": 1}', "VALID"]
+        
+        result = vibecount_all("StRawberry", ["R", "r", "s"], case_sensitive=False, provider="openai")
+        
+        assert result == Counter({"r": 3, "s": 1})
+        prompt = mock_instance.create_completion.call_args_list[1].kwargs["messages"][0]["content"]
+        assert '["r", "s"]' in prompt
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_unrequested_character_rejected(self, mock_openai_provider):
+        """Test that counts for characters that were not requested are rejected"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["SAFE", '{"a": 1, "x": 5}', "VALID"]
+        
+        with pytest.raises(Exception, match="AI API returned counts for unrequested character"):
+            vibecount_all("abc", "a", provider="openai")
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_non_json_response(self, mock_openai_provider):
+        """Test that non-JSON responses are rejected"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["SAFE", "h=1", "VALID"]
+        
+        with pytest.raises(Exception, match="AI API returned invalid character counts"):
+            vibecount_all("h", provider="openai")
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_response_validation_failure(self, mock_openai_provider):
+        """Test that the response is validated once"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["SAFE", '{"a": -1}', "INVALID"]
+        
+        with pytest.raises(Exception, match="Response validation failed"):
+            vibecount_all("a", provider="openai")
+
+
 class TestVibecompareProviders:
     """Test cases for vibecompare function with different providers"""
     
@@ -199,12 +297,12 @@ class TestVibecompareProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "-1", "VALID"]
+        mock_instance.create_completion.side_effect = ["-1", "VALID"]
         
         result = vibecompare(5, 10, provider="openai")
         
         assert result == -1
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 2
     
     @patch('vibeutils.core.AnthropicProvider')
     def test_anthropic_numbers_equal(self, mock_anthropic_provider):
@@ -212,12 +310,12 @@ class TestVibecompareProviders:
         mock_instance = MagicMock()
         mock_anthropic_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "0", "VALID"]
+        mock_instance.create_completion.side_effect = ["0", "VALID"]
         
         result = vibecompare(7, 7, provider="anthropic")
         
         assert result == 0
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 2
     
     @patch('vibeutils.core.OpenAIProvider')
     def test_openai_first_number_larger(self, mock_openai_provider):
@@ -225,12 +323,12 @@ class TestVibecompareProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "1", "VALID"]
+        mock_instance.create_completion.side_effect = ["1", "VALID"]
         
         result = vibecompare(15, 8, provider="openai")
         
         assert result == 1
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 2
     
     @patch('vibeutils.core.AnthropicProvider')
     def test_anthropic_float_numbers(self, mock_anthropic_provider):
@@ -238,12 +336,12 @@ class TestVibecompareProviders:
         mock_instance = MagicMock()
         mock_anthropic_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "-1", "VALID"]
+        mock_instance.create_completion.side_effect = ["-1", "VALID"]
         
         result = vibecompare(3.14, 3.15, provider="anthropic")
         
         assert result == -1
-        assert mock_instance.create_completion.call_count == 4
+        assert mock_instance.create_completion.call_count == 2
 
 
 class TestVibeevalProviders:
@@ -276,12 +374,12 @@ class TestVibeevalProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "5", "VALID"]
+        mock_instance.create_completion.side_effect = ["5", "VALID"]
         
         result = vibeeval("2 + 3", provider="openai")
         
         assert result == 5.0
-        assert mock_instance.create_completion.call_count == 3
+        assert mock_instance.create_completion.call_count == 2
     
     @patch('vibeutils.core.AnthropicProvider')
     def test_anthropic_successful_multiplication(self, mock_anthropic_provider):
@@ -289,12 +387,12 @@ class TestVibeevalProviders:
         mock_instance = MagicMock()
         mock_anthropic_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "12", "VALID"]
+        mock_instance.create_completion.side_effect = ["12", "VALID"]
         
         result = vibeeval("3 * 4", provider="anthropic")
         
         assert result == 12.0
-        assert mock_instance.create_completion.call_count == 3
+        assert mock_instance.create_completion.call_count == 2
     
     @patch('vibeutils.core.OpenAIProvider')
     def test_openai_division_result(self, mock_openai_provider):
@@ -302,12 +400,12 @@ class TestVibeevalProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "2.5", "VALID"]
+        mock_instance.create_completion.side_effect = ["2.5", "VALID"]
         
         result = vibeeval("5 / 2", provider="openai")
         
         assert result == 2.5
-        assert mock_instance.create_completion.call_count == 3
+        assert mock_instance.create_completion.call_count == 2
     
     @patch('vibeutils.core.AnthropicProvider')
     def test_anthropic_invalid_expression_error(self, mock_anthropic_provider):
@@ -326,7 +424,7 @@ class TestVibeevalProviders:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "ERROR", "VALID"]
+        mock_instance.create_completion.side_effect = ["ERROR", "VALID"]
         
         with pytest.raises(ValueError, match="Invalid mathematical expression: 1 / 0"):
             vibeeval("1 / 0", provider="openai")
@@ -399,7 +497,7 @@ class TestBackwardCompatibility:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "2", "VALID"]
+        mock_instance.create_completion.side_effect = ["SAFE", "2", "VALID"]
         
         # Call without provider parameter - should default to OpenAI
         result = vibecount("test", "t")
@@ -413,7 +511,7 @@ class TestBackwardCompatibility:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "-1", "VALID"]
+        mock_instance.create_completion.side_effect = ["-1", "VALID"]
         
         # Call without provider parameter - should default to OpenAI
         result = vibecompare(5, 10)
@@ -427,7 +525,7 @@ class TestBackwardCompatibility:
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
         
-        mock_instance.create_completion.side_effect = ["SAFE", "5", "VALID"]
+        mock_instance.create_completion.side_effect = ["5", "VALID"]
         
         # Call without provider parameter - should default to OpenAI
         result = vibeeval("2 + 3")
@@ -478,7 +576,7 @@ class TestModelParameterFunctionality:
         """Test that custom model parameter is passed to OpenAI provider"""
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "3", "VALID"]
+        mock_instance.create_completion.side_effect = ["SAFE", "3", "VALID"]
         
         custom_model = "gpt-4"
         result = vibecount("test", "t", provider="openai", model=custom_model)
@@ -491,7 +589,7 @@ class TestModelParameterFunctionality:
         """Test that custom model parameter is passed to Anthropic provider"""
         mock_instance = MagicMock()
         mock_anthropic_provider.return_value = mock_instance
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "3", "VALID"]
+        mock_instance.create_completion.side_effect = ["SAFE", "3", "VALID"]
         
         custom_model = "claude-3-opus-20240229"
         result = vibecount("test", "t", provider="anthropic", model=custom_model)
@@ -504,7 +602,7 @@ class TestModelParameterFunctionality:
         """Test vibecompare with custom model parameter"""
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "-1", "VALID"]
+        mock_instance.create_completion.side_effect = ["-1", "VALID"]
         
         custom_model = "gpt-4-turbo"
         result = vibecompare(5, 10, provider="openai", model=custom_model)
@@ -517,7 +615,7 @@ class TestModelParameterFunctionality:
         """Test vibeeval with custom model parameter"""
         mock_instance = MagicMock()
         mock_anthropic_provider.return_value = mock_instance
-        mock_instance.create_completion.side_effect = ["SAFE", "5", "VALID"]
+        mock_instance.create_completion.side_effect = ["5", "VALID"]
         
         custom_model = "claude-3-haiku-20240307"
         result = vibeeval("2 + 3", provider="anthropic", model=custom_model)
@@ -549,7 +647,7 @@ class TestModelEnvironmentVariables:
         """Test that OpenAI model is read from environment variable"""
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "3", "VALID"]
+        mock_instance.create_completion.side_effect = ["SAFE", "3", "VALID"]
         
         custom_model = "gpt-4"
         os.environ["VIBEUTILS_OPENAI_MODEL"] = custom_model
@@ -564,7 +662,7 @@ class TestModelEnvironmentVariables:
         """Test that Anthropic model is read from environment variable"""
         mock_instance = MagicMock()
         mock_anthropic_provider.return_value = mock_instance
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "3", "VALID"]
+        mock_instance.create_completion.side_effect = ["SAFE", "3", "VALID"]
         
         custom_model = "claude-3-opus-20240229"
         os.environ["VIBEUTILS_ANTHROPIC_MODEL"] = custom_model
@@ -579,7 +677,7 @@ class TestModelEnvironmentVariables:
         """Test that model parameter takes precedence over environment variable"""
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "3", "VALID"]
+        mock_instance.create_completion.side_effect = ["SAFE", "3", "VALID"]
         
         env_model = "gpt-3.5-turbo"
         param_model = "gpt-4"
@@ -596,7 +694,7 @@ class TestModelEnvironmentVariables:
         """Test that default model is used when no environment variable or parameter is set"""
         mock_instance = MagicMock()
         mock_openai_provider.return_value = mock_instance
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "3", "VALID"]
+        mock_instance.create_completion.side_effect = ["SAFE", "3", "VALID"]
         
         result = vibecount("test", "t", provider="openai")  # No model parameter or env var
         
@@ -609,7 +707,7 @@ class TestModelEnvironmentVariables:
         """Test that default Anthropic model is used when no environment variable or parameter is set"""
         mock_instance = MagicMock()
         mock_anthropic_provider.return_value = mock_instance
-        mock_instance.create_completion.side_effect = ["SAFE", "SAFE", "3", "VALID"]
+        mock_instance.create_completion.side_effect = ["SAFE", "3", "VALID"]
         
         result = vibecount("test", "t", provider="anthropic")  # No model parameter or env var
         
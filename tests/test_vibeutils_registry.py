@@ -0,0 +1,181 @@
+"""
+Tests for the provider registry
+"""
+
+import os
+import pytest
+from importlib.metadata import EntryPoint
+from unittest.mock import patch
+from vibeutils import AIProvider, VibeSession, vibelength
+from vibeutils.registry import (
+    ENTRY_POINT_GROUP, ProviderSpec, available_providers, get_provider_spec, register_provider, unregister_provider,
+)
+
+
+class FastProvider(AIProvider):
+    """Provider answering vibelength prompts locally, recording how it was constructed"""
+
+    API_KEY_ENV = "FAST_API_KEY"
+    DEFAULT_MODEL = "fast-1"
+
+    def __init__(self, api_key, model, **options):
+        self.api_key = api_key
+        self.model = model
+        self.options = options
+
+    def create_completion(self, messages, max_tokens=10, temperature=0):
+        content = messages[0]["content"]
+        if content.startswith("You are a security analyzer"):
+            return "SAFE"
+        if content.startswith("You are a response validator"):
+            return "VALID"
+        return str(len(content.split('Text: "')[1].rsplit('"', 1)[0]))
+
+
+class PlainProvider(FastProvider):
+    """Provider taking only the documented (api_key, model) arguments"""
+
+    def __init__(self, api_key, model):
+        super().__init__(api_key, model)
+
+
+# Registration an installed package could point its entry point at
+FAST_SPEC = ProviderSpec("ignored", FastProvider, default_model="fast-2")
+
+
+def _entry_point(name, value):
+    """Build an entry point of the provider group"""
+    return EntryPoint(name=name, value=value, group=ENTRY_POINT_GROUP)
+
+
+class TestProviderRegistry:
+    """Test cases for registering providers"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        os.environ["OPENAI_API_KEY"] = "test-openai-key"
+        for name in ["VIBEUTILS_PROVIDER", "VIBEUTILS_FAST_MODEL", "FAST_API_KEY"]:
+            os.environ.pop(name, None)
+
+    def teardown_method(self):
+        """Remove providers registered by the test"""
+        for name in ["fast", "fast-plugin", "fast-spec"]:
+            try:
+                unregister_provider(name)
+            except ValueError:
+                pass
+        for name in ["VIBEUTILS_PROVIDER", "VIBEUTILS_FAST_MODEL", "FAST_API_KEY"]:
+            os.environ.pop(name, None)
+
+    def test_builtin_providers(self):
+        """Test that OpenAI and Anthropic are registered by default"""
+        assert {"openai", "anthropic"} <= set(available_providers())
+        assert get_provider_spec("openai").api_key_env == "OPENAI_API_KEY"
+        assert get_provider_spec("anthropic").model_env == "VIBEUTILS_ANTHROPIC_MODEL"
+
+    def test_registered_provider_by_name(self):
+        """Test that a registered provider is selected by name and without an API key"""
+        register_provider("fast", FastProvider, default_model="fast-1")
+
+        assert vibelength("hello", provider="fast") == 5
+        with VibeSession(provider="fast") as session:
+            instance = session.get_provider()
+            assert session.vibelength("kiwi") == 4
+
+        assert instance.api_key is None
+        assert instance.model == "fast-1"
+
+    def test_environment_selection(self):
+        """Test that VIBEUTILS_PROVIDER, the API key variable and the model variable resolve against the registry"""
+        register_provider("fast", FastProvider, api_key_env="FAST_API_KEY", default_model="fast-1")
+        os.environ["VIBEUTILS_PROVIDER"] = "fast"
+
+        with pytest.raises(ValueError, match="FAST_API_KEY environment variable is not set"):
+            VibeSession()
+
+        os.environ["FAST_API_KEY"] = "fast-key"
+        os.environ["VIBEUTILS_FAST_MODEL"] = "fast-large"
+        with VibeSession() as session:
+            instance = session.get_provider()
+
+        assert isinstance(instance, FastProvider)
+        assert (instance.api_key, instance.model) == ("fast-key", "fast-large")
+
+    def test_lazy_reference(self):
+        """Test that providers can be registered by reference and are imported when used"""
+        register_provider("fast", "tests.test_vibeutils_registry:FastProvider")
+
+        assert get_provider_spec("fast").load() is FastProvider
+
+    def test_duplicate_and_invalid_registrations(self):
+        """Test that names cannot be taken twice and implementations must be AIProviders"""
+        register_provider("fast", FastProvider)
+
+        with pytest.raises(ValueError, match="Provider already registered: fast"):
+            register_provider("fast", FastProvider)
+        assert register_provider("fast", FastProvider, default_model="fast-3", replace=True).default_model == "fast-3"
+        with pytest.raises(ValueError, match="must be an AIProvider subclass"):
+            register_provider("fast-plugin", object)
+        with pytest.raises(ValueError, match="Provider name must be a non-empty string"):
+            register_provider("", FastProvider)
+
+    def test_unknown_provider(self):
+        """Test that unknown names list the available providers"""
+        with pytest.raises(ValueError, match="Unsupported provider: missing. Available providers: anthropic, openai"):
+            VibeSession(provider="missing")
+
+    def test_session_options_passed(self):
+        """Test that registered providers receive the session's provider options"""
+        register_provider("fast", FastProvider)
+
+        with VibeSession(provider="fast", constrained_output=True) as session:
+            assert session.get_provider().options == {"constrained_output": True}
+
+    def test_plain_provider_skips_session_options(self):
+        """Test that providers taking only (api_key, model) work in sessions configured with options"""
+        register_provider("fast", PlainProvider, default_model="fast-1")
+
+        with VibeSession(provider="fast", constrained_output=True, streaming=True) as session:
+            assert session.vibelength("kiwi") == 4
+            assert session.get_provider().options == {}
+
+
+class TestProviderEntryPoints:
+    """Test cases for providers installed through entry points"""
+
+    def teardown_method(self):
+        """Remove providers registered by the test"""
+        for name in ["fast-plugin", "fast-spec", "broken"]:
+            try:
+                unregister_provider(name)
+            except ValueError:
+                pass
+        os.environ.pop("FAST_API_KEY", None)
+
+    def test_class_entry_point(self):
+        """Test that an entry point naming a provider class is loaded on first use"""
+        entry_points = [_entry_point("fast-plugin", "tests.test_vibeutils_registry:FastProvider")]
+        os.environ["FAST_API_KEY"] = "fast-key"
+
+        with patch("vibeutils.registry._entry_points", return_value=entry_points):
+            assert "fast-plugin" in available_providers()
+            assert vibelength("hello", provider="fast-plugin") == 5
+            spec = get_provider_spec("fast-plugin")
+
+        assert spec == ProviderSpec("fast-plugin", FastProvider, "FAST_API_KEY", "fast-1")
+
+    def test_spec_entry_point(self):
+        """Test that an entry point naming a ProviderSpec is registered under the entry point name"""
+        entry_points = [_entry_point("fast-spec", "tests.test_vibeutils_registry:FAST_SPEC")]
+
+        with patch("vibeutils.registry._entry_points", return_value=entry_points):
+            with VibeSession(provider="fast-spec") as session:
+                assert session.get_provider().model == "fast-2"
+
+    def test_invalid_entry_point(self):
+        """Test that entry points must resolve to AIProvider subclasses"""
+        entry_points = [_entry_point("broken", "os:path")]
+
+        with patch("vibeutils.registry._entry_points", return_value=entry_points):
+            with pytest.raises(ValueError, match="Provider broken must be an AIProvider subclass"):
+                get_provider_spec("broken")
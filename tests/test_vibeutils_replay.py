@@ -0,0 +1,139 @@
+"""
+Tests for the record-and-replay provider
+"""
+
+import json
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+from vibeutils import vibecount, vibecompare, ReplayProvider
+
+
+class TestReplayProviderRecording:
+    """Test cases for recording cassettes"""
+    
+    def test_record_requires_provider(self, tmp_path):
+        """Test that record mode needs a provider to forward requests to"""
+        with pytest.raises(ValueError, match="A provider is required to record a cassette"):
+            ReplayProvider(str(tmp_path / "cassette.jsonl"), mode="record")
+    
+    def test_invalid_mode(self, tmp_path):
+        """Test that unknown modes are rejected"""
+        with pytest.raises(ValueError, match="Unsupported replay mode: live"):
+            ReplayProvider(str(tmp_path / "cassette.jsonl"), mode="live")
+    
+    def test_invalid_speed(self, tmp_path):
+        """Test that non-positive speed factors are rejected"""
+        with pytest.raises(ValueError, match="speed must be a positive number"):
+            ReplayProvider(str(tmp_path / "cassette.jsonl"), mode="record", provider=MagicMock(), speed=0)
+    
+    def test_record_writes_compact_cassette(self, tmp_path):
+        """Test that recorded interactions store hashed requests, responses and latency"""
+        path = str(tmp_path / "cassette.jsonl")
+        inner = MagicMock()
+        inner.create_completion.side_effect = ["SAFE", "3", "VALID"]
+        
+        with ReplayProvider(path, mode="record", provider=inner) as recorder:
+            assert vibecount("strawberry", "r", provider=recorder) == 3
+        
+        with open(path) as cassette:
+            lines = [json.loads(line) for line in cassette]
+        
+        assert lines[0] == {"version": 1}
+        assert [line["response"] for line in lines[1:]] == ["SAFE", "3", "VALID"]
+        assert all(len(line["key"]) == 64 and line["latency"] >= 0 for line in lines[1:])
+        assert "strawberry" not in open(path).read()
+    
+    def test_record_errors(self, tmp_path):
+        """Test that provider errors are recorded and re-raised"""
+        path = str(tmp_path / "cassette.jsonl")
+        inner = MagicMock()
+        inner.create_completion.side_effect = Exception("API Error")
+        
+        with ReplayProvider(path, mode="record", provider=inner) as recorder:
+            with pytest.raises(Exception, match="API Error"):
+                recorder.create_completion([{"role": "user", "content": "hi"}])
+        
+        with ReplayProvider(path) as player:
+            with pytest.raises(Exception, match="API Error"):
+                player.create_completion([{"role": "user", "content": "hi"}])
+
+
+class TestReplayProviderReplaying:
+    """Test cases for replaying cassettes"""
+    
+    def record(self, path, responses, call):
+        """Record a cassette for a single vibe call"""
+        inner = MagicMock()
+        inner.create_completion.side_effect = responses
+        with ReplayProvider(path, mode="record", provider=inner) as recorder:
+            return call(recorder)
+    
+    def test_replay_full_pipeline_offline(self, tmp_path):
+        """Test that a recorded pipeline replays without API keys"""
+        path = str(tmp_path / "cassette.jsonl.gz")
+        self.record(path, ["-1", "VALID"], lambda p: vibecompare(5, 10, provider=p))
+        
+        for key in ["OPENAI_API_KEY", "ANTHROPIC_API_KEY"]:
+            os.environ.pop(key, None)
+        
+        with ReplayProvider(path) as player:
+            assert vibecompare(5, 10, provider=player) == -1
+    
+    def test_replay_identical_requests_in_order(self, tmp_path):
+        """Test that repeated identical requests replay in recorded order"""
+        path = str(tmp_path / "cassette.jsonl")
+        messages = [{"role": "user", "content": "same"}]
+        inner = MagicMock()
+        inner.create_completion.side_effect = ["first", "second"]
+        with ReplayProvider(path, mode="record", provider=inner) as recorder:
+            recorder.create_completion(messages)
+            recorder.create_completion(messages)
+        
+        player = ReplayProvider(path)
+        assert player.create_completion(messages) == "first"
+        assert player.create_completion(messages) == "second"
+        assert player.create_completion(messages) == "second"
+    
+    def test_replay_unknown_request(self, tmp_path):
+        """Test that requests missing from the cassette raise"""
+        path = str(tmp_path / "cassette.jsonl")
+        self.record(path, ["SAFE", "3", "VALID"], lambda p: vibecount("test", "t", provider=p))
+        
+        player = ReplayProvider(path)
+        with pytest.raises(Exception, match="No recorded response for request"):
+            vibecount("other", "t", provider=player)
+    
+    def test_replay_speed_scales_latency(self, tmp_path):
+        """Test that replay sleeps for the recorded latency divided by speed"""
+        path = str(tmp_path / "cassette.jsonl")
+        with open(path, "w") as cassette:
+            cassette.write(json.dumps({"version": 1}) + "\n")
+        player = ReplayProvider(path)
+        player._interactions["k"].append({"key": "k", "latency": 0.5, "response": "ok"})
+        player.speed = 2.0
+        
+        with patch('vibeutils.replay._request_key', return_value="k"), \
+             patch('vibeutils.replay.time.sleep') as mock_sleep:
+            assert player.create_completion([]) == "ok"
+        
+        mock_sleep.assert_called_once_with(0.25)
+    
+    def test_replay_without_speed_does_not_sleep(self, tmp_path):
+        """Test that replay returns immediately when no speed is given"""
+        path = str(tmp_path / "cassette.jsonl")
+        self.record(path, ["SAFE", "3", "VALID"], lambda p: vibecount("test", "t", provider=p))
+        
+        with patch('vibeutils.replay.time.sleep') as mock_sleep:
+            assert vibecount("test", "t", provider=ReplayProvider(path)) == 3
+        
+        mock_sleep.assert_not_called()
+    
+    def test_unsupported_cassette_version(self, tmp_path):
+        """Test that cassettes from other format versions are rejected"""
+        path = str(tmp_path / "cassette.jsonl")
+        with open(path, "w") as cassette:
+            cassette.write(json.dumps({"version": 99}) + "\n")
+        
+        with pytest.raises(ValueError, match="Unsupported cassette version: 99"):
+            ReplayProvider(path)
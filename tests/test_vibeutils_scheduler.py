@@ -0,0 +1,176 @@
+"""
+Tests for priority scheduling of provider requests
+"""
+
+import threading
+import time
+import pytest
+from vibeutils import AIProvider, VibeSession, VibeTimeoutError
+from vibeutils.limiter import AdaptiveLimiter, _LimitedProvider
+from vibeutils.scheduler import PriorityScheduler, _ScheduledProvider
+
+
+class GatedProvider(AIProvider):
+    """Provider whose requests block until released, recording the order they started in"""
+
+    def __init__(self):
+        self.started = []
+        self.gate = threading.Event()
+        self._lock = threading.Lock()
+
+    def create_completion(self, messages, max_tokens=10, temperature=0):
+        content = messages[0]["content"]
+        with self._lock:
+            self.started.append(content)
+        self.gate.wait(5)
+        if content.startswith("You are a security analyzer"):
+            return "SAFE"
+        if content.startswith("You are a response validator"):
+            return "VALID"
+        return "5"
+
+
+def _wait_for(condition):
+    """Poll until a condition holds"""
+    started = time.monotonic()
+    while not condition() and time.monotonic() - started < 5:
+        time.sleep(0.001)
+    assert condition()
+
+
+class TestPriorityScheduler:
+    """Test cases for admission by priority class"""
+
+    def test_invalid_configuration(self):
+        """Test that out-of-range capacities and reservations are rejected"""
+        with pytest.raises(ValueError, match="capacity must be a positive integer"):
+            PriorityScheduler(capacity=0)
+        with pytest.raises(ValueError, match="Unknown priority"):
+            PriorityScheduler(reserved={"urgent": 1})
+        with pytest.raises(ValueError, match="only be reserved for interactive and default"):
+            PriorityScheduler(reserved={"bulk": 1})
+        with pytest.raises(ValueError, match="Reserved slots must be non-negative integers"):
+            PriorityScheduler(reserved={"interactive": -1})
+        with pytest.raises(ValueError, match="at least one slot for bulk"):
+            PriorityScheduler(capacity=4, reserved={"interactive": 2, "default": 2})
+
+    def test_unknown_priority(self):
+        """Test that acquiring with an unknown priority class fails"""
+        with pytest.raises(ValueError, match="Unknown priority"):
+            PriorityScheduler().acquire("urgent")
+
+    def test_reserved_capacity(self):
+        """Test that bulk requests leave reserved slots free for interactive requests"""
+        scheduler = PriorityScheduler(capacity=3, reserved={"interactive": 1})
+        scheduler.acquire("bulk")
+        scheduler.acquire("bulk")
+
+        with pytest.raises(TimeoutError):
+            scheduler.acquire("bulk", timeout=0.02)
+        scheduler.acquire("interactive", timeout=0.02)
+
+        assert scheduler.stats()["in_flight"] == 3
+        assert scheduler.stats()["admitted"] == {"interactive": 1, "default": 0, "bulk": 2}
+
+    def test_reservations_nest(self):
+        """Test that default requests may use slots reserved for default but not for interactive"""
+        scheduler = PriorityScheduler(capacity=4, reserved={"interactive": 1, "default": 1})
+        scheduler.acquire("bulk")
+        scheduler.acquire("bulk")
+
+        with pytest.raises(TimeoutError):
+            scheduler.acquire("bulk", timeout=0.02)
+        scheduler.acquire("default", timeout=0.02)
+        with pytest.raises(TimeoutError):
+            scheduler.acquire("default", timeout=0.02)
+        scheduler.acquire("interactive", timeout=0.02)
+
+    def test_interactive_preempts_queued_bulk(self):
+        """Test that a freed slot goes to a waiting interactive request before earlier bulk requests"""
+        scheduler = PriorityScheduler(capacity=1)
+        scheduler.acquire("bulk")
+        order = []
+
+        def request(priority):
+            scheduler.acquire(priority)
+            order.append(priority)
+            scheduler.release()
+
+        threads = [threading.Thread(target=request, args=("bulk",)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        _wait_for(lambda: scheduler.stats()["waiting"]["bulk"] == 3)
+        interactive = threading.Thread(target=request, args=("interactive",))
+        interactive.start()
+        _wait_for(lambda: scheduler.stats()["waiting"]["interactive"] == 1)
+
+        scheduler.release()
+        for thread in threads + [interactive]:
+            thread.join()
+
+        assert order == ["interactive", "bulk", "bulk", "bulk"]
+        assert scheduler.stats()["in_flight"] == 0
+
+    def test_timed_out_waiter_leaves_queue(self):
+        """Test that a request giving up does not block the requests queued behind it"""
+        scheduler = PriorityScheduler(capacity=1)
+        scheduler.acquire("bulk")
+
+        with pytest.raises(TimeoutError, match="Timed out waiting for a request slot"):
+            scheduler.acquire("interactive", timeout=0.02)
+        scheduler.release()
+
+        scheduler.acquire("bulk", timeout=0.02)
+        assert scheduler.stats()["waiting"] == {"interactive": 0, "default": 0, "bulk": 0}
+
+
+class TestSessionScheduler:
+    """Test cases for scheduling session requests"""
+
+    def test_sessions_share_scheduler(self):
+        """Test that an interactive session's requests run ahead of a bulk session's backlog"""
+        provider = GatedProvider()
+        scheduler = PriorityScheduler(capacity=2, reserved={"interactive": 1})
+
+        with VibeSession(provider=provider, max_workers=4, scheduler=scheduler, priority="bulk") as bulk, \
+                VibeSession(provider=provider, scheduler=scheduler, priority="interactive") as interactive:
+            backlog = [bulk.executor.submit(bulk.vibelength, text) for text in ("a", "b", "c")]
+            _wait_for(lambda: scheduler.stats()["waiting"]["bulk"] == 2)
+
+            interactive_call = interactive.executor.submit(interactive.vibelength, "hello")
+            _wait_for(lambda: len(provider.started) == 2)
+            assert scheduler.stats()["admitted"]["interactive"] == 1
+
+            provider.gate.set()
+            assert interactive_call.result() == 5
+            assert [future.result() for future in backlog] == [5, 5, 5]
+
+        assert scheduler.stats()["admitted"] == {"interactive": 3, "default": 0, "bulk": 9}
+
+    def test_provider_wrapped_outside_limiter(self):
+        """Test that requests are scheduled before waiting for a limiter slot"""
+        session = VibeSession(provider=GatedProvider(), limiter=AdaptiveLimiter(),
+                              scheduler=PriorityScheduler(), priority="interactive")
+        instance = session.get_provider()
+
+        assert isinstance(instance, _ScheduledProvider)
+        assert isinstance(instance.provider, _LimitedProvider)
+        assert instance.priority == "interactive"
+        assert instance.model == "GatedProvider"
+
+    def test_invalid_session_priority(self):
+        """Test that sessions reject unknown priority classes"""
+        with pytest.raises(ValueError, match="Unknown priority"):
+            VibeSession(provider=GatedProvider(), priority="urgent")
+
+    def test_deadline_bounds_wait(self):
+        """Test that a request waiting for admission gives up at its deadline"""
+        scheduler = PriorityScheduler(capacity=1)
+        scheduler.acquire("interactive")
+        provider = GatedProvider()
+        provider.gate.set()
+
+        with VibeSession(provider=provider, scheduler=scheduler) as session:
+            with pytest.raises(VibeTimeoutError):
+                session.vibelength("hello", timeout=0.05)
+        scheduler.release()
@@ -0,0 +1,175 @@
+"""
+Tests for VibeSession configuration resolution and shared state
+"""
+
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+from vibeutils import vibecount, vibelength, AIProvider, VibeSession
+from vibeutils.session import get_default_session, set_default_session
+
+
+class TestVibeSessionConfiguration:
+    """Test cases for resolving configuration once per session"""
+    
+    def setup_method(self):
+        """Set up test environment"""
+        os.environ["OPENAI_API_KEY"] = "test-openai-key"
+        os.environ["ANTHROPIC_API_KEY"] = "test-anthropic-key"
+        for key in ["VIBEUTILS_PROVIDER", "VIBEUTILS_OPENAI_MODEL", "VIBEUTILS_ANTHROPIC_MODEL"]:
+            os.environ.pop(key, None)
+    
+    def test_missing_api_key_raises_at_construction(self):
+        """Test that configuration errors surface when the session is created"""
+        del os.environ["OPENAI_API_KEY"]
+        
+        with pytest.raises(ValueError, match="OPENAI_API_KEY environment variable is not set"):
+            VibeSession(provider="openai")
+    
+    def test_invalid_provider(self):
+        """Test that unsupported providers are rejected"""
+        with pytest.raises(ValueError, match="Unsupported provider: invalid"):
+            VibeSession(provider="invalid")
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_configuration_resolved_once(self, mock_openai_provider):
+        """Test that environment changes after construction do not affect the session"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["SAFE", "3", "VALID"] * 2
+        
+        session = VibeSession(model="gpt-4")
+        os.environ["VIBEUTILS_OPENAI_MODEL"] = "gpt-3.5-turbo"
+        del os.environ["OPENAI_API_KEY"]
+        
+        assert session.vibecount("test", "t") == 3
+        assert vibecount("test", "t", session=session) == 3
+        mock_openai_provider.assert_called_once_with("test-openai-key", "gpt-4")
+    
+    @patch('vibeutils.core.AnthropicProvider')
+    def test_model_override_keeps_session_provider(self, mock_anthropic_provider):
+        """Test that a per-call model override uses the session's provider"""
+        mock_instance = MagicMock()
+        mock_anthropic_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["SAFE", "4", "VALID"]
+        
+        session = VibeSession(provider="anthropic")
+        
+        assert session.vibelength("test", model="claude-3-haiku-20240307") == 4
+        mock_anthropic_provider.assert_called_once_with("test-anthropic-key", "claude-3-haiku-20240307")
+    
+    def test_provider_instance(self):
+        """Test that a session can wrap an existing provider instance"""
+        class StubProvider(AIProvider):
+            def create_completion(self, messages, max_tokens=10, temperature=0):
+                return "VALID" if "validator" in messages[0]["content"] else "SAFE" if "security" in messages[0]["content"] else "4"
+        
+        provider_instance = StubProvider()
+        with VibeSession(provider=provider_instance) as session:
+            assert session.get_provider() is provider_instance
+            assert session.vibelength("test") == 4
+
+
+class TestVibeSessionSharedState:
+    """Test cases for the client pool, executor and shutdown"""
+    
+    def setup_method(self):
+        """Set up test environment"""
+        os.environ["OPENAI_API_KEY"] = "test-openai-key"
+        os.environ.pop("VIBEUTILS_OPENAI_MODEL", None)
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_clients_are_pooled(self, mock_openai_provider):
+        """Test that repeated calls reuse one provider client"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["SAFE", "4", "VALID"] * 3
+        
+        with VibeSession(provider="openai") as session:
+            for _ in range(3):
+                assert session.vibelength("test") == 4
+        
+        assert mock_openai_provider.call_count == 1
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_map_runs_on_executor(self, mock_openai_provider):
+        """Test that map returns results in input order"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = lambda messages, **kwargs: (
+            "VALID" if "validator" in messages[0]["content"] else
+            "SAFE" if "security analyzer" in messages[0]["content"] else "5"
+        )
+        
+        with VibeSession(max_workers=4) as session:
+            assert session.map(session.vibelength, ["hello", "world"]) == [5, 5]
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_close_releases_resources(self, mock_openai_provider):
+        """Test that closing a session closes pooled clients and rejects new calls"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        
+        session = VibeSession()
+        session.get_provider()
+        executor = session.executor
+        session.close()
+        session.close()
+        
+        mock_instance.close.assert_called_once()
+        assert executor._shutdown
+        with pytest.raises(RuntimeError, match="VibeSession is closed"):
+            session.vibelength("test")
+
+
+class TestDefaultSession:
+    """Test cases for the session used by module-level functions"""
+    
+    def setup_method(self):
+        """Set up test environment"""
+        os.environ["OPENAI_API_KEY"] = "test-openai-key"
+        os.environ.pop("VIBEUTILS_OPENAI_MODEL", None)
+    
+    def teardown_method(self):
+        """Restore the environment-driven default session"""
+        set_default_session(None)
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_default_session_pools_clients(self, mock_openai_provider):
+        """Test that module-level calls reuse the pooled client for the same configuration"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["SAFE", "4", "VALID"] * 2
+        
+        assert vibelength("test") == 4
+        assert vibelength("test") == 4
+        
+        assert mock_openai_provider.call_count == 1
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_default_session_tracks_environment(self, mock_openai_provider):
+        """Test that the default session picks up environment changes"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["SAFE", "4", "VALID"] * 2
+        
+        vibelength("test")
+        os.environ["VIBEUTILS_OPENAI_MODEL"] = "gpt-4"
+        vibelength("test")
+        
+        mock_openai_provider.assert_called_with("test-openai-key", "gpt-4")
+        assert mock_openai_provider.call_count == 2
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_set_default_session(self, mock_openai_provider):
+        """Test that module-level functions delegate to an installed default session"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["SAFE", "4", "VALID"]
+        
+        session = VibeSession(model="gpt-4")
+        set_default_session(session)
+        
+        assert get_default_session() is session
+        assert vibelength("test") == 4
+        mock_openai_provider.assert_called_once_with("test-openai-key", "gpt-4")
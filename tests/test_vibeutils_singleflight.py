@@ -0,0 +1,150 @@
+"""
+Tests for coalescing identical concurrent calls
+"""
+
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from vibeutils import AIProvider, VibeSession
+from vibeutils.singleflight import SingleFlight
+
+
+def _wait_for_waiters(flight: SingleFlight, count: int) -> None:
+    """Wait until the given number of callers have joined an in-flight call"""
+    deadline = time.monotonic() + 5
+    while flight.coalesced < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+class GatedProvider(AIProvider):
+    """Provider whose main completions block until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.main_calls = 0
+        self._lock = threading.Lock()
+
+    def create_completion(self, messages, max_tokens=10, temperature=0):
+        content = messages[0]["content"]
+        if content.startswith("You are a security analyzer"):
+            return "SAFE"
+        if content.startswith("You are a response validator"):
+            return "VALID"
+        with self._lock:
+            self.main_calls += 1
+        self.release.wait(5)
+        if content.startswith("Compare"):
+            return "-1"
+        return "5"
+
+
+def _wait_for_main_call(provider: GatedProvider) -> None:
+    """Wait until the provider has received a main completion"""
+    deadline = time.monotonic() + 5
+    while provider.main_calls < 1 and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+class TestSingleFlight:
+    """Test cases for the in-flight registry"""
+
+    def test_concurrent_callers_share_result(self):
+        """Test that callers with the same key wait on one execution"""
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return 42
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(flight.do, "key", work) for _ in range(4)]
+            _wait_for_waiters(flight, 3)
+            release.set()
+            results = [future.result() for future in futures]
+
+        assert results == [42] * 4
+        assert len(calls) == 1
+        assert flight.coalesced == 3
+        assert len(flight) == 0
+
+    def test_exception_shared(self):
+        """Test that waiting callers receive the execution's exception"""
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def work():
+            release.wait(5)
+            raise Exception("AI API call failed: boom")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(flight.do, "key", work) for _ in range(2)]
+            _wait_for_waiters(flight, 1)
+            release.set()
+            for future in futures:
+                with pytest.raises(Exception, match="AI API call failed: boom"):
+                    future.result()
+
+        assert len(flight) == 0
+
+    def test_sequential_calls_run_again(self):
+        """Test that finished executions are not reused"""
+        flight = SingleFlight()
+        results = iter([1, 2])
+
+        assert flight.do("key", lambda: next(results)) == 1
+        assert flight.do("key", lambda: next(results)) == 2
+        assert flight.coalesced == 0
+
+    def test_different_keys_not_coalesced(self):
+        """Test that different keys run independently"""
+        flight = SingleFlight()
+
+        assert flight.do("a", lambda: 1) == 1
+        assert flight.do("b", lambda: 2) == 2
+
+
+class TestSessionCoalescing:
+    """Test cases for coalescing vibe calls in a session"""
+
+    def test_identical_calls_share_pipeline(self):
+        """Test that concurrent identical vibelength calls run the pipeline once"""
+        provider = GatedProvider()
+
+        with VibeSession(provider=provider, max_workers=4) as session:
+            futures = [session.executor.submit(session.vibelength, "hello") for _ in range(4)]
+            _wait_for_waiters(session.inflight, 3)
+            provider.release.set()
+            results = [future.result() for future in futures]
+
+        assert results == [5] * 4
+        assert provider.main_calls == 1
+
+    def test_equivalent_comparisons_share_pipeline(self):
+        """Test that swapped vibecompare calls coalesce and get their own orientation"""
+        provider = GatedProvider()
+
+        with VibeSession(provider=provider, max_workers=2) as session:
+            first = session.executor.submit(session.vibecompare, 1, 2)
+            _wait_for_main_call(provider)
+            second = session.executor.submit(session.vibecompare, 2, 1)
+            _wait_for_waiters(session.inflight, 1)
+            provider.release.set()
+
+            assert first.result() == -1
+            assert second.result() == 1
+        assert provider.main_calls == 1
+
+    def test_coalescing_disabled(self):
+        """Test that sessions without an in-flight registry run every call"""
+        provider = GatedProvider()
+        provider.release.set()
+
+        with VibeSession(provider=provider, max_workers=4) as session:
+            session.inflight = None
+            assert session.map(session.vibelength, ["hello"] * 3) == [5] * 3
+
+        assert provider.main_calls == 3
@@ -0,0 +1,115 @@
+"""
+Tests for comparison-minimizing vibesort
+"""
+
+import os
+import random
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+from vibeutils import vibesort, AIProvider, VibeSession
+from vibeutils.sorting import _jacobsthal_order
+
+# Worst-case comparisons of merge-insertion sort for n = 0..12
+FORD_JOHNSON_COMPARISONS = [0, 0, 1, 3, 5, 7, 10, 13, 16, 19, 22, 26, 30]
+
+
+class _UnusedProvider(AIProvider):
+    """Provider for sessions whose comparisons are patched out"""
+    
+    def create_completion(self, messages, max_tokens=10, temperature=0):
+        raise AssertionError("no completions expected")
+
+
+class _CountingCompare:
+    """Fake vibecompare recording calls and the threads they ran on"""
+    
+    def __init__(self):
+        self.calls = []
+        self.threads = set()
+        self.lock = threading.Lock()
+    
+    def __call__(self, num1, num2, provider=None, model=None, session=None):
+        with self.lock:
+            self.calls.append((num1, num2))
+            self.threads.add(threading.get_ident())
+        return (num1 > num2) - (num1 < num2)
+
+
+class TestVibesort:
+    """Test cases for vibesort"""
+    
+    def setup_method(self):
+        """Set up a session with a patched comparison function"""
+        self.session = VibeSession(provider=_UnusedProvider(), max_workers=4)
+        self.compare = _CountingCompare()
+        self.patcher = patch('vibeutils.sorting.vibecompare', self.compare)
+        self.patcher.start()
+    
+    def teardown_method(self):
+        """Clean up the session and patch"""
+        self.patcher.stop()
+        self.session.close()
+    
+    def test_jacobsthal_insertion_order(self):
+        """Test that pending elements are inserted in Jacobsthal groups"""
+        assert _jacobsthal_order(1) == []
+        assert _jacobsthal_order(6) == [3, 2, 5, 4, 6]
+        assert _jacobsthal_order(12) == [3, 2, 5, 4, 11, 10, 9, 8, 7, 6, 12]
+    
+    @pytest.mark.parametrize("n", range(13))
+    def test_sorts_with_ford_johnson_comparisons(self, n):
+        """Test that sorting needs no more comparisons than merge-insertion's worst case"""
+        rng = random.Random(n)
+        for _ in range(30):
+            items = rng.sample(range(100), n)
+            self.compare.calls.clear()
+            
+            assert vibesort(items, session=self.session) == sorted(items)
+            assert len(self.compare.calls) <= FORD_JOHNSON_COMPARISONS[n]
+    
+    def test_duplicates_use_cache(self):
+        """Test that each unordered pair of values is asked at most once"""
+        items = [3, 1, 3, 1, 2, 3, 2, 1]
+        
+        assert vibesort(items, session=self.session) == sorted(items)
+        pairs = [frozenset(call) for call in self.compare.calls]
+        assert len(pairs) == len(set(pairs))
+    
+    def test_key_and_reverse(self):
+        """Test sorting by key in descending order"""
+        items = [{"score": 2.5}, {"score": 9}, {"score": -1}]
+        
+        result = vibesort(items, key=lambda item: item["score"], reverse=True, session=self.session)
+        
+        assert result == [{"score": 9}, {"score": 2.5}, {"score": -1}]
+    
+    def test_pairing_round_is_concurrent(self):
+        """Test that the first round of comparisons runs on the session thread pool"""
+        vibesort(list(range(16, 0, -1)), session=self.session)
+        
+        assert self.compare.threads - {threading.get_ident()}
+    
+    def test_non_numeric_items(self):
+        """Test that non-numeric keys are rejected before any call"""
+        with pytest.raises(ValueError, match="All items \\(or their keys\\) must be numbers"):
+            vibesort([1, "2", 3], session=self.session)
+        assert self.compare.calls == []
+
+
+class TestVibesortPipeline:
+    """Test cases for vibesort through the full vibecompare pipeline"""
+    
+    def setup_method(self):
+        """Set up test environment"""
+        os.environ["OPENAI_API_KEY"] = "test-openai-key"
+    
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_sort_two_items(self, mock_openai_provider):
+        """Test that sorting two numbers makes one comparison"""
+        mock_instance = MagicMock()
+        mock_openai_provider.return_value = mock_instance
+        mock_instance.create_completion.side_effect = ["1", "VALID"]
+        
+        assert vibesort([10, 5]) == [5, 10]
+        assert mock_instance.create_completion.call_count == 2
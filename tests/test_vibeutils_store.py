@@ -0,0 +1,116 @@
+"""
+Tests for the memory-mapped result store
+"""
+
+import multiprocessing
+import pytest
+from unittest.mock import MagicMock
+from vibeutils import AIProvider, VibeSession
+from vibeutils.cache import ResultCache
+from vibeutils.store import MappedStore, build_store, compact_cache
+from vibeutils.tables import AnswerTable
+
+
+def _lookup_in_child(path, key, results):
+    """Open a store in another process and report a lookup"""
+    with MappedStore(path) as store:
+        results.put(store.get(key))
+
+
+class TestBuildStore:
+    """Test cases for writing and reading stores"""
+
+    def test_round_trip(self, tmp_path):
+        """Test that every written entry is found with its value and type"""
+        path = str(tmp_path / "results.store")
+        entries = [(("vibecompare", i, i + 1), -1) for i in range(500)]
+        entries += [(("vibeeval", "2 / 4"), 0.5), (("vibelength", "héllo"), 5)]
+
+        assert build_store(path, entries) == 502
+
+        with MappedStore(path) as store:
+            assert len(store) == 502
+            assert store.get(("vibecompare", 250, 251)) == -1
+            assert store.get(("vibeeval", "2 / 4")) == 0.5
+            assert store.get(("vibelength", "héllo")) == 5
+            assert isinstance(store.get(("vibelength", "héllo")), int)
+            assert store.get(("vibelength", "missing")) is None
+            assert ("vibecompare", 0, 1) in store
+            assert sorted(store.items()) == sorted(entries)
+            assert store.stats() == {"hits": 4, "misses": 1, "size": 502}
+
+    def test_empty_store(self, tmp_path):
+        """Test that an empty store answers nothing"""
+        path = str(tmp_path / "empty.store")
+        build_store(path, [])
+
+        with MappedStore(path) as store:
+            assert len(store) == 0
+            assert store.get(("vibelength", "a")) is None
+
+    def test_non_numeric_results_rejected(self, tmp_path):
+        """Test that only numbers can be stored"""
+        with pytest.raises(ValueError, match="Only int and float results can be stored"):
+            build_store(str(tmp_path / "results.store"), [(("vibecount_all", "a"), {"a": 1})])
+        assert not (tmp_path / "results.store").exists()
+
+    def test_not_a_store(self, tmp_path):
+        """Test that other files are rejected"""
+        path = tmp_path / "other.store"
+        path.write_bytes(b"not a result store file")
+
+        with pytest.raises(ValueError, match="Not a result store"):
+            MappedStore(str(path))
+
+    def test_shared_between_processes(self, tmp_path):
+        """Test that another process reads the same file"""
+        path = str(tmp_path / "results.store")
+        build_store(path, [(("vibelength", "apple"), 5)])
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+
+        process = context.Process(target=_lookup_in_child, args=(path, ("vibelength", "apple"), results))
+        process.start()
+        process.join(30)
+
+        assert results.get(timeout=5) == 5
+
+
+class TestCompactCache:
+    """Test cases for compacting caches into stores"""
+
+    def test_compact_result_cache(self, tmp_path):
+        """Test that one model's numeric results are kept without the model in the key"""
+        cache = ResultCache()
+        cache.set(("gpt-4o-mini", "vibelength", "apple"), 5)
+        cache.set(("gpt-4o-mini", "vibecount_all", "aa", ("a",), True), {"a": 2})
+        cache.set(("gpt-4o", "vibelength", "kiwi"), 4)
+        path = str(tmp_path / "results.store")
+
+        assert compact_cache(cache, path, model="gpt-4o-mini") == 1
+
+        with MappedStore(path) as store:
+            assert store.get(("vibelength", "apple")) == 5
+            assert store.get(("vibelength", "kiwi")) is None
+
+    def test_several_models_need_model(self, tmp_path):
+        """Test that a cache shared by several models needs an explicit model"""
+        cache = ResultCache()
+        cache.set(("gpt-4o-mini", "vibelength", "apple"), 5)
+        cache.set(("gpt-4o", "vibelength", "kiwi"), 4)
+
+        with pytest.raises(ValueError, match="several models"):
+            compact_cache(cache, str(tmp_path / "results.store"))
+
+    def test_store_from_answer_table(self, tmp_path):
+        """Test that an answer table converts to a store serving a session"""
+        table = AnswerTable({("vibecompare", 1, 2): -1, ("vibelength", "kiwi"): 4})
+        path = str(tmp_path / "answers.store")
+        build_store(path, table.items())
+        provider = MagicMock(spec=AIProvider)
+
+        with MappedStore(path) as store, VibeSession(provider=provider, answers=store) as session:
+            assert session.vibecompare(2, 1) == 1
+            assert session.vibelength("kiwi") == 4
+
+        provider.create_completion.assert_not_called()
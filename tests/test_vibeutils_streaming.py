@@ -0,0 +1,206 @@
+"""
+Tests for streaming completions that stop once the answer is decided
+"""
+
+import json
+import os
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from vibeutils import AIProvider, VibeSession
+from vibeutils.limiter import AdaptiveLimiter
+from vibeutils.scheduler import PriorityScheduler
+from vibeutils.core import (
+    ANTHROPIC_AVAILABLE, COMPARISON_OUTPUT, COUNT_OUTPUT, INJECTION_CHECK_OUTPUT, OpenAIProvider, AnthropicProvider,
+    _read_until_decided,
+)
+
+pytest.importorskip("openai")
+
+
+class StreamingHandler(BaseHTTPRequestHandler):
+    """Stream OpenAI chat completion chunks, holding the stream open after the scripted ones"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        try:
+            for text in self.server.chunks:
+                self._send_event({
+                    "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+                })
+            # A slow model still generating after the answer
+            self.server.release.wait(5)
+            self._send_event({
+                "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "delta": {"content": " because"}, "finish_reason": "length"}],
+            })
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.disconnected.set()
+
+    def _send_event(self, event):
+        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stream_server():
+    """Run a local OpenAI-compatible streaming server for the duration of a test"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StreamingHandler)
+    server.requests = []
+    server.chunks = []
+    server.release = threading.Event()
+    server.disconnected = threading.Event()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def _event(text):
+    """Build an Anthropic text delta event"""
+    return SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text=text))
+
+
+class TestReadUntilDecided:
+    """Test cases for deciding answers from partial text"""
+
+    def test_stops_at_answer(self):
+        """Test that reading stops as soon as the text spells out a choice"""
+        chunks = iter(["S", "A", "FE", " because", " it is"])
+
+        assert _read_until_decided(chunks, INJECTION_CHECK_OUTPUT.choices) == "SAFE"
+        assert list(chunks) == [" because", " it is"]
+
+    def test_case_and_whitespace_ignored(self):
+        """Test that answers are recognized regardless of case and surrounding whitespace"""
+        assert _read_until_decided(iter(["\n", " injection", "!"]), INJECTION_CHECK_OUTPUT.choices) == "injection"
+
+    def test_prefix_of_another_choice_waits(self):
+        """Test that an answer other answers extend is not decided early"""
+        chunks = iter(["1", "0", "0"])
+
+        assert _read_until_decided(chunks, ("1", "10", "100")) == "100"
+        assert _read_until_decided(iter(["1", " "]), ("1", "10")) == "1"
+
+    def test_undecided_text_read_to_end(self):
+        """Test that text which is not an answer is read completely"""
+        assert _read_until_decided(iter(["-", "1", "."]), ("-1", "0", "1")) == "-1"
+        assert _read_until_decided(iter(["I ", "think ", "SAFE"]), INJECTION_CHECK_OUTPUT.choices) == "I think SAFE"
+        assert _read_until_decided(iter([]), INJECTION_CHECK_OUTPUT.choices) == ""
+
+
+class TestOpenAIStreaming:
+    """Test cases for streaming OpenAI completions"""
+
+    def test_returns_before_stream_ends(self, stream_server):
+        """Test that the answer is returned and the stream closed while the model is still generating"""
+        stream_server.chunks = ["SA", "FE"]
+        provider = OpenAIProvider("test-key", "gpt-4o-mini", streaming=True,
+                                  base_url=f"http://127.0.0.1:{stream_server.server_address[1]}/v1")
+
+        started = time.monotonic()
+        result = provider.create_streaming_completion([{"role": "user", "content": "check"}], INJECTION_CHECK_OUTPUT)
+
+        assert result == "SAFE"
+        assert time.monotonic() - started < 4
+        assert stream_server.requests[0]["stream"] is True
+        stream_server.release.set()
+        assert stream_server.disconnected.wait(5)
+        provider.close()
+
+    def test_o1_models_not_streamed(self):
+        """Test that o1 models fall back to a regular completion"""
+        provider = OpenAIProvider("test-key", "o1-mini", streaming=True)
+        provider.client = MagicMock()
+        provider.client.chat.completions.create.return_value.choices = [MagicMock(message=MagicMock(content="SAFE"))]
+
+        assert provider.create_streaming_completion([], INJECTION_CHECK_OUTPUT) == "SAFE"
+        assert "stream" not in provider.client.chat.completions.create.call_args.kwargs
+
+@pytest.mark.skipif(not ANTHROPIC_AVAILABLE, reason="anthropic package is not installed")
+class TestAnthropicStreaming:
+    """Test cases for streaming Anthropic completions"""
+
+    def test_stops_reading_events(self):
+        """Test that text deltas are read until the answer is decided and the stream is closed"""
+        provider = AnthropicProvider("test-key", streaming=True)
+        provider.client = MagicMock()
+        stream = MagicMock()
+        events = iter([SimpleNamespace(type="message_start"), _event("-"), _event("1"), _event(" since")])
+        stream.__iter__.return_value = events
+        provider.client.messages.create.return_value = stream
+
+        assert provider.create_streaming_completion([], COMPARISON_OUTPUT) == "-1"
+        assert provider.client.messages.create.call_args.kwargs["stream"] is True
+        stream.close.assert_called_once()
+        assert list(events) == [_event(" since")]
+
+
+class RecordingProvider(AIProvider):
+    """Provider recording which completion method each stage used"""
+
+    streaming = True
+
+    def __init__(self):
+        self.model = "recording"
+        self.calls = []
+
+    def create_completion(self, messages, max_tokens=10, temperature=0):
+        self.calls.append("completion")
+        return "7"
+
+    def create_streaming_completion(self, messages, constraint, max_tokens=10, temperature=0):
+        self.calls.append("streaming")
+        return "SAFE" if constraint is INJECTION_CHECK_OUTPUT else "VALID"
+
+
+class TestStreamingSession:
+    """Test cases for using streaming completions in sessions"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        os.environ["OPENAI_API_KEY"] = "test-openai-key"
+        os.environ.pop("VIBEUTILS_PROVIDER", None)
+
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_session_option_passed(self, mock_openai_provider):
+        """Test that the session creates its providers in streaming mode"""
+        with VibeSession(streaming=True) as session:
+            session.get_provider()
+
+        mock_openai_provider.assert_called_once_with("test-openai-key", "gpt-4o-mini", streaming=True)
+
+    def test_only_classifier_stages_streamed(self):
+        """Test that stages with a fixed set of answers stream and open-ended answers do not"""
+        provider = RecordingProvider()
+
+        with VibeSession(provider=provider) as session:
+            assert session.vibelength("apple pie") == 7
+
+        assert provider.calls == ["streaming", "completion", "streaming"]
+        assert COUNT_OUTPUT.choices == ()
+
+    def test_wrappers_forward_streaming(self):
+        """Test that limited and scheduled providers keep streaming completions"""
+        provider = RecordingProvider()
+
+        with VibeSession(provider=provider, limiter=AdaptiveLimiter(), scheduler=PriorityScheduler(4)) as session:
+            assert session.get_provider().streaming is True
+            assert session.vibelength("apple pie") == 7
+
+        assert provider.calls == ["streaming", "completion", "streaming"]
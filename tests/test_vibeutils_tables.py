@@ -0,0 +1,150 @@
+"""
+Tests for precomputed answer tables
+"""
+
+import pytest
+from unittest.mock import MagicMock
+from vibeutils import AIProvider, VibeSession
+from vibeutils.tables import AnswerTable, AnswerTableBuilder
+
+
+class ArithmeticProvider(AIProvider):
+    """Provider answering vibecompare and vibelength prompts correctly"""
+
+    model = "test-model"
+
+    def __init__(self):
+        self.requests = 0
+
+    def create_completion(self, messages, max_tokens=10, temperature=0):
+        self.requests += 1
+        content = messages[0]["content"]
+        if content.startswith("You are a security analyzer"):
+            return "SAFE"
+        if content.startswith("You are a response validator"):
+            return "VALID"
+        if content.startswith("Compare"):
+            first, second = content.split(".\n")[0].split("numbers ")[1].split(" and ")
+            return str((float(first) > float(second)) - (float(first) < float(second)))
+        return str(len(content.split('Text: "')[1].rsplit('"', 1)[0]))
+
+
+class TestAnswerTableBuilder:
+    """Test cases for precomputing a declared domain"""
+
+    def test_equivalent_calls_declared_once(self):
+        """Test that swapped comparisons and repeated inputs are only computed once"""
+        builder = AnswerTableBuilder().add_vibecompare([1, 2, 3, 2.0]).add_vibelength(["a", "a"])
+
+        assert len(builder) == 7
+
+    def test_build_through_pipeline(self):
+        """Test that building runs each declared call through the normal pipeline"""
+        provider = ArithmeticProvider()
+
+        with VibeSession(provider=provider, max_workers=4) as session:
+            table = AnswerTableBuilder().add_vibecompare(range(3)).build(session)
+
+        assert len(table) == 6
+        assert table.model == "test-model"
+        assert provider.requests == 12
+
+    def test_failures_left_out(self):
+        """Test that failing calls are reported and not stored"""
+        provider = MagicMock(spec=AIProvider)
+        provider.model = "test-model"
+        provider.create_completion.side_effect = ["SAFE", "4", "INVALID"]
+
+        with VibeSession(provider=provider, max_workers=1) as session:
+            builder = AnswerTableBuilder().add_vibelength(["word"])
+            table = builder.build(session)
+
+        assert len(table) == 0
+        assert builder.failures[0][:2] == ("vibelength", ("word",))
+
+
+class TestAnswerTableLookup:
+    """Test cases for serving calls from a table"""
+
+    def setup_method(self):
+        """Build a table of small integer comparisons and word lengths"""
+        with VibeSession(provider=ArithmeticProvider(), max_workers=4) as session:
+            builder = AnswerTableBuilder().add_vibecompare(range(-3, 4)).add_vibelength(["apple", "kiwi"])
+            self.table = builder.build(session)
+
+    def test_served_without_requests(self):
+        """Test that calls in the table make no provider request, in either argument order"""
+        provider = MagicMock(spec=AIProvider)
+        provider.model = "test-model"
+
+        with VibeSession(provider=provider, answers=self.table) as session:
+            assert session.vibecompare(-3, 2) == -1
+            assert session.vibecompare(2, -3) == 1
+            assert session.vibecompare(1.0, 1) == 0
+            assert session.vibelength("kiwi") == 4
+
+        provider.create_completion.assert_not_called()
+        assert self.table.stats()["hits"] == 4
+
+    def test_miss_runs_pipeline(self):
+        """Test that calls outside the table are answered by the provider"""
+        provider = ArithmeticProvider()
+
+        with VibeSession(provider=provider, answers=self.table) as session:
+            assert session.vibecompare(10, 2) == 1
+
+        assert provider.requests == 2
+        assert self.table.stats()["misses"] == 1
+
+    def test_sort_uses_table(self):
+        """Test that sorting small integers needs no provider request"""
+        provider = MagicMock(spec=AIProvider)
+        provider.model = "test-model"
+
+        with VibeSession(provider=provider, answers=self.table) as session:
+            assert session.vibesort([3, -1, 2, 0, -3]) == [-3, -1, 0, 2, 3]
+
+        provider.create_completion.assert_not_called()
+
+    def test_other_model_not_served(self):
+        """Test that a table only answers calls made with the model that built it"""
+        provider = ArithmeticProvider()
+        provider.model = "other-model"
+
+        with VibeSession(provider=provider, answers=self.table) as session:
+            assert session.vibelength("kiwi") == 4
+
+        assert provider.requests == 3
+        assert self.table.stats()["hits"] == 0
+
+    def test_table_without_model_served_for_any(self):
+        """Test that a table without a model answers for every model"""
+        provider = MagicMock(spec=AIProvider)
+        provider.model = "other-model"
+        table = AnswerTable(dict(self.table.items()))
+
+        with VibeSession(provider=provider, answers=table) as session:
+            assert session.vibelength("kiwi") == 4
+
+        provider.create_completion.assert_not_called()
+
+    @pytest.mark.parametrize("filename", ["answers.jsonl", "answers.jsonl.gz"])
+    def test_save_and_load(self, tmp_path, filename):
+        """Test that a saved table loads with the same answers"""
+        path = str(tmp_path / filename)
+        self.table.save(path)
+
+        loaded = AnswerTable.load(path)
+
+        assert len(loaded) == len(self.table)
+        assert loaded.model == "test-model"
+        assert loaded.get(("vibecompare", -1, 2)) == -1
+        assert loaded.get(("vibelength", "apple")) == 5
+
+    def test_load_rejects_other_files(self, tmp_path):
+        """Test that files that are not answer tables are rejected"""
+        path = tmp_path / "other.jsonl"
+        path.write_text('{"format": "vibeutils-cassette"}\n')
+
+        with pytest.raises(ValueError, match="Not an answer table"):
+            AnswerTable.load(str(path))
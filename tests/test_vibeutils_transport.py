@@ -0,0 +1,110 @@
+"""
+Tests for the shared HTTP transport
+"""
+
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+from vibeutils import VibeSession
+from vibeutils.core import ANTHROPIC_AVAILABLE, OpenAIProvider, AnthropicProvider
+from vibeutils.transport import SharedTransport, _httpx_module
+
+openai = pytest.importorskip("openai")
+httpx = _httpx_module(openai)
+
+
+def _chat_completion(request):
+    """Answer an OpenAI chat completion request with "SAFE" """
+    body = {
+        "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "SAFE"}}],
+    }
+    return httpx.Response(200, json=body)
+
+
+class TestSharedTransport:
+    """Test cases for the shared connection pool"""
+
+    def test_invalid_limits(self):
+        """Test that non-positive pool limits are rejected"""
+        with pytest.raises(ValueError, match="Connection limits must be positive integers"):
+            SharedTransport(max_connections=0)
+
+    def test_pool_configuration(self):
+        """Test that the pool is built once with the configured limits"""
+        with patch.object(httpx, "HTTPTransport") as mock_transport:
+            transport = SharedTransport(max_connections=50, max_keepalive_connections=10, keepalive_expiry=60.0)
+            transport.http_client(openai)
+            transport.http_client(openai)
+
+        mock_transport.assert_called_once()
+        limits = mock_transport.call_args.kwargs["limits"]
+        assert limits.max_connections == 50
+        assert limits.max_keepalive_connections == 10
+        assert limits.keepalive_expiry == 60.0
+        assert mock_transport.call_args.kwargs["http2"] is False
+
+    def test_timeouts(self):
+        """Test that configured timeouts are applied to the SDK client"""
+        transport = SharedTransport(timeout=20.0, connect_timeout=2.0)
+        client = transport.http_client(openai)
+
+        assert client.timeout.read == 20.0
+        assert client.timeout.connect == 2.0
+        transport.close()
+
+    def test_providers_share_pool(self):
+        """Test that requests from several providers go through one pool that outlives them"""
+        pool = MagicMock(wraps=httpx.MockTransport(_chat_completion))
+        with patch.object(httpx, "HTTPTransport", return_value=pool):
+            transport = SharedTransport()
+            first = OpenAIProvider("fake-key", "gpt-4o-mini", transport=transport)
+            second = OpenAIProvider("fake-key", "gpt-4o", transport=transport)
+
+        assert first.create_completion([{"role": "user", "content": "hi"}]) == "SAFE"
+        first.close()
+        assert second.create_completion([{"role": "user", "content": "hi"}]) == "SAFE"
+
+        assert pool.handle_request.call_count == 2
+        pool.close.assert_not_called()
+        transport.close()
+        pool.close.assert_called_once()
+
+    def test_closed_transport(self):
+        """Test that a closed transport cannot build new clients"""
+        transport = SharedTransport()
+        transport.close()
+
+        with pytest.raises(RuntimeError, match="SharedTransport is closed"):
+            transport.http_client(openai)
+
+    @pytest.mark.skipif(not ANTHROPIC_AVAILABLE, reason="anthropic is not installed")
+    def test_anthropic_client_uses_pool(self):
+        """Test that Anthropic clients are built on the shared pool"""
+        with SharedTransport(timeout=15.0) as transport:
+            provider = AnthropicProvider("fake-key", transport=transport)
+
+            assert provider.client._client.timeout.read == 15.0
+
+
+class TestSessionTransport:
+    """Test cases for sessions passing their transport to providers"""
+
+    def setup_method(self):
+        """Set up test environment"""
+        os.environ["OPENAI_API_KEY"] = "test-openai-key"
+
+    def teardown_method(self):
+        """Clean up test environment"""
+        if "OPENAI_API_KEY" in os.environ:
+            del os.environ["OPENAI_API_KEY"]
+
+    @patch('vibeutils.core.OpenAIProvider')
+    def test_session_passes_transport(self, mock_openai_provider):
+        """Test that providers created by a session use its transport"""
+        transport = SharedTransport()
+
+        with VibeSession(model="gpt-4o-mini", transport=transport) as session:
+            session.get_provider()
+
+        mock_openai_provider.assert_called_once_with("test-openai-key", "gpt-4o-mini", transport=transport)
@@ -2,8 +2,13 @@
 vibeutils - A Python library that provides various utilities using OpenAI and Anthropic APIs
 """
 
-from .core import vibecount, vibecompare, vibeeval, vibelength, Provider
+from .core import vibecount, vibecount_all, vibecompare, vibeeval, vibelength, Provider, AIProvider, VibeTimeoutError
+from .arrays import vibecompare_array
+from .ordering import ComparisonKnowledge
+from .replay import ReplayProvider
+from .sorting import vibesort
+from .session import VibeSession
 
 __version__ = "0.7.0"
 __author__ = "chuyang-deng"
-__all__ = ["vibecount", "vibecompare", "vibeeval", "vibelength", "Provider"]
+__all__ = ["vibecount", "vibecount_all", "vibecompare", "vibeeval", "vibelength", "vibecompare_array", "vibesort", "ComparisonKnowledge", "Provider", "AIProvider", "VibeTimeoutError", "ReplayProvider", "VibeSession"]
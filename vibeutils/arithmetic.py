@@ -0,0 +1,160 @@
+"""
+Exact local evaluation of arithmetic expressions for the vibeeval fast path
+"""
+
+import ast
+import math
+from fractions import Fraction
+from typing import Optional
+
+from .canonical import _EXPRESSION_TOKEN
+
+# Largest absolute exponent evaluated locally
+MAX_EXPONENT = 1024
+
+# Largest estimated number of decimal digits of an intermediate result; floats
+# cannot represent anything bigger than ~1e308 anyway
+MAX_RESULT_DIGITS = 400
+
+_BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow)
+_UNARY_OPERATORS = (ast.UAdd, ast.USub)
+
+
+class _Refused(Exception):
+    """Raised internally when an expression is outside the locally supported grammar or limits"""
+
+
+def _is_grammar_text(expression: str) -> bool:
+    """
+    Check that an expression's raw text is made only of grammar tokens, on one line.
+
+    Parsing alone is not enough: the parser drops comments, so "1 # ..."
+    parses as 1 while the comment still reaches the prompt word for word,
+    and it accepts Python-only literals such as 0x10 and 1_0.
+    """
+    stripped = expression.strip()
+    if not stripped or any(character in stripped for character in "\r\n\f\v"):
+        return False
+    position = 0
+    while position < len(stripped):
+        match = _EXPRESSION_TOKEN.match(stripped, position)
+        if match is None:
+            return False
+        position = match.end()
+    return True
+
+
+def parse_expression(expression: str) -> Optional[ast.expr]:
+    """
+    Parse an expression and check it against the documented vibeeval grammar.
+
+    The grammar is numbers (integers and decimals), the operators +, -, *, /, **
+    and parentheses, on a single line.
+
+    Args:
+        expression (str): The expression to parse
+
+    Returns:
+        Optional[ast.expr]: The expression tree, or None if it does not match the grammar
+    """
+    if not isinstance(expression, str) or not _is_grammar_text(expression):
+        return None
+    try:
+        tree = ast.parse(expression.strip(), mode="eval").body
+    except (SyntaxError, ValueError):
+        return None
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.BinOp):
+            if not isinstance(node.op, _BINARY_OPERATORS):
+                return None
+        elif isinstance(node, ast.UnaryOp):
+            if not isinstance(node.op, _UNARY_OPERATORS):
+                return None
+        elif isinstance(node, ast.Constant):
+            if type(node.value) not in (int, float):
+                return None
+        elif not isinstance(node, (ast.operator, ast.unaryop)):
+            return None
+    return tree
+
+
+def _digits(value: Fraction) -> float:
+    """Estimate the number of decimal digits of a rational value"""
+    if value == 0:
+        return 0.0
+    return math.log10(abs(value.numerator) + 1) - math.log10(value.denominator) + 1
+
+
+def _power(base: Fraction, exponent: Fraction) -> Fraction:
+    """Raise base to exponent, exactly for integer exponents"""
+    if abs(exponent) > MAX_EXPONENT:
+        raise _Refused()
+    if exponent.denominator == 1:
+        # The result has about exponent * log10(|base|) digits (or leading zeros)
+        magnitude = math.log10(abs(base.numerator)) - math.log10(base.denominator) if base != 0 else 0.0
+        if abs(exponent * magnitude) > MAX_RESULT_DIGITS:
+            raise _Refused()
+        return base ** int(exponent)
+    if base < 0:
+        # Fractional powers of negative numbers are complex
+        raise _Refused()
+    try:
+        return Fraction(float(base) ** float(exponent))
+    except (OverflowError, ValueError):
+        raise _Refused()
+
+
+def _evaluate(node: ast.expr) -> Fraction:
+    """Evaluate a grammar-checked expression tree exactly"""
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, float) and not math.isfinite(node.value):
+            # Literals too big for a float, such as 1e999, parse as infinity
+            raise _Refused()
+        # Go through the decimal representation so 0.1 stays exactly 1/10
+        return Fraction(repr(node.value)) if isinstance(node.value, float) else Fraction(node.value)
+    if isinstance(node, ast.UnaryOp):
+        operand = _evaluate(node.operand)
+        return -operand if isinstance(node.op, ast.USub) else operand
+
+    left = _evaluate(node.left)
+    right = _evaluate(node.right)
+    if isinstance(node.op, ast.Add):
+        result = left + right
+    elif isinstance(node.op, ast.Sub):
+        result = left - right
+    elif isinstance(node.op, ast.Mult):
+        result = left * right
+    elif isinstance(node.op, ast.Div):
+        result = left / right
+    else:
+        result = _power(left, right)
+
+    if abs(_digits(result)) > MAX_RESULT_DIGITS:
+        raise _Refused()
+    return result
+
+
+def evaluate_expression(expression: str) -> Optional[float]:
+    """
+    Evaluate an arithmetic expression locally with exact rational arithmetic.
+
+    Args:
+        expression (str): Expression using numbers, +, -, *, /, ** and parentheses
+
+    Returns:
+        Optional[float]: The result, or None if the expression does not match the
+                         grammar or exceeds the exponent and size limits
+
+    Raises:
+        ValueError: If the expression divides by zero
+    """
+    tree = parse_expression(expression)
+    if tree is None:
+        return None
+    try:
+        return float(_evaluate(tree))
+    except ZeroDivisionError:
+        raise ValueError(f"Invalid mathematical expression: {expression}")
+    except (_Refused, OverflowError, RecursionError):
+        return None
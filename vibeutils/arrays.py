@@ -0,0 +1,220 @@
+"""
+Vectorized vibe functions over NumPy arrays
+"""
+
+from typing import Optional, Union, TYPE_CHECKING
+
+from .trust import DEFAULT_TRUST_POLICY, TrustPolicy
+from .core import (
+    AIProvider, Provider, MAX_TOKENS, TEMPERATURE, SECURITY_MAX_TOKENS, SECURITY_TEMPERATURE, VALIDATION_OUTPUT,
+    VibeTimeoutError, _admit_call, _check_prompt_injection, _complete, _deadline_scope, _metered_scope,
+    _resolve_session, _validate_timeout,
+)
+
+if TYPE_CHECKING:
+    import numpy
+    from .session import VibeSession
+
+# Number of unique pairs compared in a single completion
+COMPARE_BATCH_SIZE = 200
+
+# Output tokens budgeted per compared pair ("-1" plus a newline)
+TOKENS_PER_COMPARISON = 3
+
+# Stands in for every NaN in deduplication keys, since NaN never equals itself
+_NAN = float("nan")
+
+
+def _import_numpy():
+    """Import numpy, which is only needed for the vectorized functions"""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy package is not installed. Install it with: pip install numpy")
+    return numpy
+
+
+def _validate_vibecompare_batch_response(response: str, count: int, provider_instance: AIProvider) -> None:
+    """
+    Use AI provider to validate that a response is appropriate for a batch of number comparisons.
+
+    Args:
+        response (str): The response to validate
+        count (int): The number of comparisons the response should contain
+        provider_instance (AIProvider): AI provider instance
+
+    Raises:
+        Exception: If response validation fails
+    """
+    validation_prompt = f"""You are a response validator. Check if the following response is a valid answer for a task comparing {count} pairs of numbers.
+
+The response should be:
+- Exactly {count} lines
+- Each line exactly one of these values: -1, 0, or 1
+- Nothing else
+
+Respond with ONLY "VALID" if the response is appropriate, or "INVALID" if it's not.
+
+Response to validate: "{response}" """
+
+    try:
+        result = _complete(
+            provider_instance, VALIDATION_OUTPUT,
+            messages=[{"role": "user", "content": validation_prompt}],
+            max_tokens=SECURITY_MAX_TOKENS,
+            temperature=SECURITY_TEMPERATURE
+        ).upper()
+
+        if result == "INVALID":
+            raise Exception("Response validation failed - potentially compromised response detected")
+        elif result != "VALID":
+            raise Exception("Response validator returned unexpected result - response blocked as precaution")
+
+    except VibeTimeoutError:
+        # Deadline exhausted; not a provider failure
+        raise
+    except Exception as e:
+        if "Response validation failed" in str(e) or "Response validator returned unexpected" in str(e):
+            raise
+        raise Exception(f"Response validation check failed: {str(e)}")
+
+
+def _compare_batch(pairs: list, provider_instance: AIProvider, trust_policy: TrustPolicy = DEFAULT_TRUST_POLICY) -> list:
+    """
+    Compare a batch of number pairs with a single completion.
+
+    Args:
+        pairs (list): List of (num1, num2) tuples
+        provider_instance (AIProvider): AI provider instance
+        trust_policy (TrustPolicy): Policy deciding whether the numbers skip the injection check
+
+    Returns:
+        list: -1, 0 or 1 for each pair, in order
+    """
+    listing = "\n".join(f"{i}. {num1} and {num2}" for i, (num1, num2) in enumerate(pairs, 1))
+
+    # Security check: Use AI to detect prompt injection in the serialized pairs, unless all are trusted numbers
+    if not all(trust_policy.trusts_number(number) for pair in pairs for number in pair):
+        _check_prompt_injection(listing, provider_instance)
+
+    prompt = f"""Compare each of the following {len(pairs)} pairs of numbers.
+For each pair, in the same order, return on its own line:
+- -1 if the first number is smaller than the second number
+- 0 if the numbers are equal
+- 1 if the first number is larger than the second number
+
+Only return the {len(pairs)} values (-1, 0, or 1), one per line, nothing else.
+
+{listing}
+"""
+
+    try:
+        # Make API call for the whole batch
+        result = _complete(
+            provider_instance, None,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=TOKENS_PER_COMPARISON * len(pairs) + MAX_TOKENS,
+            temperature=TEMPERATURE
+        )
+
+        # Security check: Validate the response using AI
+        _validate_vibecompare_batch_response(result, len(pairs), provider_instance)
+
+        # Final validation and conversion
+        lines = [line.strip() for line in result.splitlines() if line.strip()]
+        if len(lines) != len(pairs) or any(line not in ("-1", "0", "1") for line in lines):
+            raise Exception(f"AI API returned invalid comparison results: {result}")
+        return [int(line) for line in lines]
+
+    except VibeTimeoutError:
+        # Deadline exhausted; not a provider failure
+        raise
+    except ValueError as e:
+        # Re-raise ValueError (includes our security blocks)
+        raise e
+    except Exception as e:
+        if "AI API returned" in str(e) or "Response validation failed" in str(e):
+            raise e
+        raise Exception(f"AI API call failed: {str(e)}")
+
+
+def vibecompare_array(a, b, provider: Optional[Union[Provider, AIProvider]] = None, model: Optional[str] = None,
+                      session: Optional["VibeSession"] = None, batch_size: int = COMPARE_BATCH_SIZE,
+                      timeout: Optional[float] = None) -> "numpy.ndarray":
+    """
+    Compare two arrays of numbers element-wise using AI API.
+
+    The inputs are broadcast against each other, each unique pair of values is
+    compared only once, and unique pairs are sent in batches of up to batch_size
+    comparisons per completion.
+
+    Args:
+        a (array_like): The first numbers to compare
+        b (array_like): The second numbers to compare, broadcastable with a
+        provider (Optional[Union[Provider, AIProvider]]): AI provider to use ("openai", "anthropic" or a registered name),
+                                      or an AIProvider instance to use directly. If None, uses
+                                      VIBEUTILS_PROVIDER environment variable, defaulting to "openai" if not set.
+        model (Optional[str]): The model to use for the provider. If None, uses environment
+                              variables VIBEUTILS_OPENAI_MODEL or VIBEUTILS_ANTHROPIC_MODEL,
+                              defaulting to built-in constants if not set.
+        session (Optional[VibeSession]): Session providing pooled clients and shared state.
+                                         If None, uses the default session.
+        batch_size (int): Maximum number of pairs compared per completion (default: 200)
+        timeout (Optional[float]): Seconds the whole comparison may take, split across the
+                                   requests of all batches. If None, only the SDK's own
+                                   request timeouts apply.
+
+    Returns:
+        numpy.ndarray: int8 array of the broadcast shape holding -1 where a < b,
+                       0 where a == b and 1 where a > b
+
+    Raises:
+        ValueError: If API key is not set, inputs are not real numeric arrays or cannot be
+                   broadcast together, or input contains prompt injection
+        ImportError: If numpy is not installed
+        VibeTimeoutError: If the comparison does not finish within timeout
+        Exception: If AI API call fails or response validation fails
+    """
+    np = _import_numpy()
+
+    # Validate inputs
+    a = np.asarray(a)
+    b = np.asarray(b)
+    for array in (a, b):
+        if not np.issubdtype(array.dtype, np.number) or np.iscomplexobj(array):
+            raise ValueError("Both arguments must be arrays of real numbers (int or float)")
+    if batch_size < 1:
+        raise ValueError("batch_size must be a positive integer")
+    _validate_timeout(timeout)
+
+    a, b = np.broadcast_arrays(a, b)
+    shape = a.shape
+    if a.size == 0:
+        return np.empty(shape, dtype=np.int8)
+
+    # Deduplicate value pairs so each distinct comparison is asked once. Pairs are
+    # keyed by their exact Python values, since casting both inputs to a common
+    # dtype could merge distinct numbers (int64 2**53 + 1 and float64 2**53)
+    index = {}
+    inverse = np.empty(a.size, dtype=np.intp)
+    for position, pair in enumerate(zip(a.ravel().tolist(), b.ravel().tolist())):
+        inverse[position] = index.setdefault(tuple(_NAN if number != number else number for number in pair), len(index))
+    unique_pairs = list(index)
+
+    # Get AI provider instance
+    session = _resolve_session(session)
+    provider_instance = session.get_provider(provider, model)
+    trust_policy = session.trust_policy
+
+    # Each batch makes a security check unless its numbers are trusted, the comparison and its validation
+    results = np.empty(len(unique_pairs), dtype=np.int8)
+    batches = -(-len(unique_pairs) // batch_size)
+    trusted = all(trust_policy.trusts_number(number) for pair in unique_pairs for number in pair)
+    with _deadline_scope(timeout, requests=(2 if trusted else 3) * batches), _metered_scope(session, "vibecompare_array"):
+        _admit_call()
+        for start in range(0, len(unique_pairs), batch_size):
+            batch = unique_pairs[start:start + batch_size]
+            results[start:start + len(batch)] = _compare_batch(batch, provider_instance, trust_policy)
+
+    # Scatter unique results back to every element
+    return results[inverse].reshape(shape)
@@ -0,0 +1,699 @@
+"""
+Result caching for vibe calls
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict, defaultdict
+from typing import Hashable, Optional, Union
+
+# Default number of results kept by a ResultCache
+DEFAULT_CACHE_SIZE = 4096
+
+# Default number of entries kept by an SQLiteCache
+DEFAULT_SHARED_CACHE_SIZE = 1_000_000
+
+# Seconds an SQLiteCache connection waits for another process' write
+DEFAULT_BUSY_TIMEOUT = 5.0
+
+# Writes between evictions of an SQLiteCache, at most
+EVICTION_INTERVAL = 64
+
+# Seconds before a hit refreshes an SQLiteCache entry's recency
+TOUCH_INTERVAL = 60
+
+# Bytes of the digest kept in place of a hashed key's arguments
+KEY_DIGEST_SIZE = 16
+
+# Counters of a TinyLFU frequency sketch saturate at this value
+SKETCH_MAX_COUNT = 15
+
+# Rows of a TinyLFU frequency sketch
+SKETCH_DEPTH = 4
+
+# Constants of the splitmix64 hash finalizer
+_MASK_64 = (1 << 64) - 1
+_GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+# Per-function counters reported by function_stats()
+_FUNCTION_COUNTERS = ("hits", "misses", "entries", "bytes", "evictions")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+"""
+
+
+def _encode_key(key: Hashable) -> str:
+    """Encode a cache key as JSON text, identically in every process"""
+    return json.dumps(key, separators=(",", ":"), ensure_ascii=False, default=repr)
+
+
+def _decode_key(encoded_key: str) -> Hashable:
+    """Decode a cache key, turning JSON arrays back into tuples"""
+    def to_tuple(value):
+        return tuple(to_tuple(item) for item in value) if isinstance(value, list) else value
+    return to_tuple(json.loads(encoded_key))
+
+
+def _encode_value(value: object) -> str:
+    """Encode a cached result as JSON text"""
+    return json.dumps(value, separators=(",", ":"), default=repr)
+
+
+def _decode_value(encoded_value: str) -> object:
+    """Decode a cached result; JSON objects are vibecount_all counters"""
+    value = json.loads(encoded_value)
+    return Counter(value) if isinstance(value, dict) else value
+
+
+def _hash_key(key: Hashable) -> Hashable:
+    """
+    Replace the arguments of a call key by a fixed-size digest.
+
+    The model and function name are kept, so entries can still be reported
+    per function; the arguments, which may be long texts, become a digest.
+    """
+    if not isinstance(key, tuple) or len(key) < 3:
+        return key
+    digest = hashlib.blake2b(_encode_key(key[2:]).encode("utf-8"), digest_size=KEY_DIGEST_SIZE).hexdigest()
+    return key[:2] + (digest,)
+
+
+def _function_name(key: Hashable) -> str:
+    """Get the vibe function (or pipeline stage) a cache key belongs to"""
+    if isinstance(key, tuple) and len(key) > 1 and isinstance(key[1], str):
+        return key[1]
+    return "other"
+
+
+def _entry_size(key: Hashable, value: object) -> int:
+    """Size of an entry in bytes: its encoded key plus its encoded result"""
+    return len(_encode_key(key).encode("utf-8")) + len(_encode_value(value).encode("utf-8"))
+
+
+def _mix64(value: int) -> int:
+    """Scramble a 64-bit integer (splitmix64 finalizer) so its bits are well distributed"""
+    value &= _MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return value ^ (value >> 31)
+
+
+def _function_report(counters: dict) -> dict:
+    """Add the hit ratio to a function's counters"""
+    lookups = counters["hits"] + counters["misses"]
+    return dict(counters, hit_ratio=counters["hits"] / lookups if lookups else 0.0)
+
+
+class EvictionPolicy(ABC):
+    """
+    Decides which entries a ResultCache evicts when it is full.
+
+    The cache reports every entry inserted, accessed and removed, and every
+    lookup; the policy picks the victim to evict and may refuse to admit a
+    new entry in place of it. Policies are called under the cache's lock.
+    """
+
+    @abstractmethod
+    def insert(self, key: Hashable) -> None:
+        """Track a newly cached entry"""
+        pass
+
+    @abstractmethod
+    def access(self, key: Hashable) -> None:
+        """Track a hit on, or an update of, a cached entry"""
+        pass
+
+    @abstractmethod
+    def remove(self, key: Hashable) -> None:
+        """Stop tracking an entry that left the cache"""
+        pass
+
+    @abstractmethod
+    def victim(self) -> Hashable:
+        """Get the entry to evict next"""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Stop tracking all entries"""
+        pass
+
+    def record(self, key: Hashable) -> None:
+        """Note a lookup of a key, cached or not"""
+
+    def admit(self, candidate: Hashable, victim: Hashable) -> bool:
+        """Decide whether a new entry may replace the victim"""
+        return True
+
+
+class LRUPolicy(EvictionPolicy):
+    """Evicts the least recently used entry"""
+
+    def __init__(self):
+        self._order = OrderedDict()
+
+    def insert(self, key: Hashable) -> None:
+        self._order[key] = None
+
+    def access(self, key: Hashable) -> None:
+        self._order.move_to_end(key)
+
+    def remove(self, key: Hashable) -> None:
+        del self._order[key]
+
+    def victim(self) -> Hashable:
+        return next(iter(self._order))
+
+    def clear(self) -> None:
+        self._order.clear()
+
+
+class LFUPolicy(EvictionPolicy):
+    """Evicts the least frequently used entry, the least recently used one among ties"""
+
+    def __init__(self):
+        self._frequencies = {}
+        self._buckets = defaultdict(OrderedDict)
+
+    def insert(self, key: Hashable) -> None:
+        self._frequencies[key] = 1
+        self._buckets[1][key] = None
+
+    def access(self, key: Hashable) -> None:
+        frequency = self._frequencies[key]
+        self._unlink(key, frequency)
+        self._frequencies[key] = frequency + 1
+        self._buckets[frequency + 1][key] = None
+
+    def _unlink(self, key: Hashable, frequency: int) -> None:
+        """Take a key out of its frequency bucket"""
+        bucket = self._buckets[frequency]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[frequency]
+
+    def remove(self, key: Hashable) -> None:
+        self._unlink(key, self._frequencies.pop(key))
+
+    def victim(self) -> Hashable:
+        return next(iter(self._buckets[min(self._buckets)]))
+
+    def clear(self) -> None:
+        self._frequencies.clear()
+        self._buckets.clear()
+
+
+class TinyLFUPolicy(LRUPolicy):
+    """
+    LRU eviction behind a TinyLFU admission filter.
+
+    A count-min sketch estimates how often every key was looked up recently,
+    whether it was cached or not. When the cache is full, a new entry is only
+    admitted if it was looked up more often than the entry it would evict, so
+    one-off results of a scan cannot flush frequently used ones. The sketch
+    is halved every sample_size lookups to age old popularity.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CACHE_SIZE, sample_size: Optional[int] = None):
+        """
+        Args:
+            capacity (int): Expected number of cached entries, which sizes the sketch (default: 4096)
+            sample_size (Optional[int]): Lookups between agings of the sketch. If None, uses
+                                         ten times the capacity.
+        """
+        super().__init__()
+        width = 16
+        while width < capacity:
+            width *= 2
+        self._mask = width - 1
+        self._rows = [[0] * width for _ in range(SKETCH_DEPTH)]
+        self.sample_size = sample_size or 10 * capacity
+        self._samples = 0
+
+    def _slots(self, key: Hashable):
+        """Get the sketch counter index of a key in each row, from independently mixed hashes"""
+        key_hash = hash(key) & _MASK_64
+        return [_mix64(key_hash + row * _GOLDEN_GAMMA) & self._mask for row in range(SKETCH_DEPTH)]
+
+    def frequency(self, key: Hashable) -> int:
+        """Estimate how often a key was looked up recently"""
+        return min(row[slot] for row, slot in zip(self._rows, self._slots(key)))
+
+    def record(self, key: Hashable) -> None:
+        for row, slot in zip(self._rows, self._slots(key)):
+            if row[slot] < SKETCH_MAX_COUNT:
+                row[slot] += 1
+        self._samples += 1
+        if self._samples >= self.sample_size:
+            self._samples = 0
+            for row in self._rows:
+                row[:] = [count // 2 for count in row]
+
+    def admit(self, candidate: Hashable, victim: Hashable) -> bool:
+        return self.frequency(candidate) > self.frequency(victim)
+
+
+# Eviction policies selectable by name
+POLICIES = {"lru": LRUPolicy, "lfu": LFUPolicy, "tinylfu": TinyLFUPolicy}
+
+
+class ResultCache:
+    """
+    Thread-safe in-memory cache of vibe call results.
+
+    Keys are built from the model and the canonical form of a call (see
+    vibeutils.canonical), so equivalent calls share one entry. Only successful
+    results are cached.
+
+    The cache is bounded by a number of entries and optionally by bytes, the
+    encoded size of keys and results. With hash_keys, the arguments of each
+    key (the texts of vibelength or vibecount calls, say) are stored as a
+    fixed-size digest, so long inputs cost a constant number of bytes; a
+    digest collision is as unlikely as for the hashes used by the store and
+    cassette formats. Which entry is evicted when full is decided by the
+    eviction policy: "lru", "lfu" or "tinylfu", or an EvictionPolicy instance.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, verdicts: bool = False,
+                 policy: Union[str, EvictionPolicy] = "lru", maxbytes: Optional[int] = None,
+                 hash_keys: bool = False):
+        """
+        Args:
+            maxsize (int): Maximum number of results to keep (default: 4096)
+            verdicts (bool): Also keep prompt injection check verdicts, so inputs seen by
+                             earlier calls are not checked again (default: False)
+            policy (Union[str, EvictionPolicy]): Eviction policy, "lru", "lfu" or "tinylfu"
+                                                 (default: "lru"), or a policy instance
+            maxbytes (Optional[int]): Maximum total size of keys and results in bytes.
+                                      If None, only maxsize applies.
+            hash_keys (bool): Store the arguments of keys as a digest instead of in full
+                              (default: False)
+
+        Raises:
+            ValueError: If maxsize or maxbytes is not positive, or the policy is unknown
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be a positive integer")
+        if maxbytes is not None and maxbytes < 1:
+            raise ValueError("maxbytes must be a positive integer")
+        if isinstance(policy, str):
+            if policy not in POLICIES:
+                raise ValueError(f"Unknown eviction policy: {policy}. Use one of {', '.join(POLICIES)}")
+            policy = TinyLFUPolicy(maxsize) if policy == "tinylfu" else POLICIES[policy]()
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.verdicts = verdicts
+        self.hash_keys = hash_keys
+        self.policy = policy
+        self._entries = {}
+        self._bytes = 0
+        self._functions = defaultdict(lambda: dict.fromkeys(_FUNCTION_COUNTERS, 0))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    def _stored_key(self, key: Hashable) -> Hashable:
+        """Get the key an entry is stored under"""
+        return _hash_key(key) if self.hash_keys else key
+
+    def get(self, key: Hashable) -> Optional[object]:
+        """
+        Look up a cached result.
+
+        Args:
+            key (Hashable): The cache key
+
+        Returns:
+            Optional[object]: The cached result, or None on a miss
+        """
+        key = self._stored_key(key)
+        with self._lock:
+            self.policy.record(key)
+            counters = self._functions[_function_name(key)]
+            if key in self._entries:
+                self.policy.access(key)
+                self.hits += 1
+                counters["hits"] += 1
+                return self._entries[key][0]
+            self.misses += 1
+            counters["misses"] += 1
+            return None
+
+    def set(self, key: Hashable, value: object) -> None:
+        """
+        Store a result, evicting entries chosen by the eviction policy if full.
+
+        A new entry may be refused by the policy's admission filter, or when it
+        is larger than maxbytes on its own.
+
+        Args:
+            key (Hashable): The cache key
+            value (object): The result to store
+        """
+        key = self._stored_key(key)
+        size = _entry_size(key, value)
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._account(key, -existing[1], entries=0)
+                self._entries[key] = (value, size)
+                self._account(key, size, entries=0)
+                self.policy.access(key)
+                self._evict(key)
+                return
+            if self.maxbytes is not None and size > self.maxbytes:
+                self.rejections += 1
+                return
+            if self._full(size):
+                if not self.policy.admit(key, self.policy.victim()):
+                    self.rejections += 1
+                    return
+                while self._full(size):
+                    self._remove(self.policy.victim(), evicted=True)
+            self._entries[key] = (value, size)
+            self._account(key, size, entries=1)
+            self.policy.insert(key)
+
+    def _full(self, size: int) -> bool:
+        """Check whether a new entry of the given size needs room to be made"""
+        if len(self._entries) >= self.maxsize:
+            return True
+        return self.maxbytes is not None and self._bytes + size > self.maxbytes
+
+    def _evict(self, keep: Hashable) -> None:
+        """Evict entries other than keep until the cache is within maxbytes"""
+        while self.maxbytes is not None and self._bytes > self.maxbytes and len(self._entries) > 1:
+            victim = self.policy.victim()
+            if victim == keep:
+                break
+            self._remove(victim, evicted=True)
+
+    def _remove(self, key: Hashable, evicted: bool = False) -> None:
+        """Drop an entry and its accounting"""
+        _, size = self._entries.pop(key)
+        self.policy.remove(key)
+        self._account(key, -size, entries=-1)
+        if evicted:
+            self.evictions += 1
+            self._functions[_function_name(key)]["evictions"] += 1
+
+    def _account(self, key: Hashable, size: int, entries: int) -> None:
+        """Update the byte and entry counts of the cache and of the key's function"""
+        counters = self._functions[_function_name(key)]
+        counters["bytes"] += size
+        counters["entries"] += entries
+        self._bytes += size
+
+    @property
+    def bytes(self) -> int:
+        """Total size of the cached keys and results in bytes"""
+        with self._lock:
+            return self._bytes
+
+    def items(self) -> list:
+        """Get a snapshot of the cached (key, result) pairs"""
+        with self._lock:
+            return [(key, value) for key, (value, _) in self._entries.items()]
+
+    def clear(self) -> None:
+        """Remove all cached results"""
+        with self._lock:
+            self._entries.clear()
+            self.policy.clear()
+            self._bytes = 0
+            for counters in self._functions.values():
+                counters["entries"] = counters["bytes"] = 0
+
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+
+        Returns:
+            dict: "hits", "misses", current "size" and "maxsize"
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+    def function_stats(self) -> dict:
+        """
+        Get cache counters per vibe function.
+
+        Injection check verdicts are reported as "injection_check".
+
+        Returns:
+            dict: For each function, its "hits", "misses", "hit_ratio", current "entries"
+                  and "bytes", and "evictions"
+        """
+        with self._lock:
+            return {function: _function_report(counters) for function, counters in self._functions.items()}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    Cache of vibe call results shared by all processes on a host.
+
+    Results are kept in an SQLite database in WAL mode, so any number of
+    processes (forked web or task workers, say) read concurrently while one
+    writes, and a result learned by one worker is served to all of them.
+    Injection check verdicts are kept too (see ResultCache), unless disabled.
+
+    The cache holds about maxsize entries: least recently used entries are
+    evicted every few writes, so it can briefly run slightly over. Recency
+    is refreshed at most once a minute per entry, which keeps reads from
+    turning into writes. With hash_keys, key arguments are stored as a
+    digest, as in ResultCache.
+
+    The cache never fails a call: if the database stays locked by another
+    process beyond busy_timeout, or cannot be read or written, a lookup is
+    a miss and a write or eviction is skipped, and both count as "errors".
+
+    Each thread uses its own connection; after a fork the child process
+    opens new connections instead of sharing its parent's. Use as a context
+    manager, or call close(), to release the current process' connections.
+    """
+
+    def __init__(self, path: str, maxsize: int = DEFAULT_SHARED_CACHE_SIZE, verdicts: bool = True,
+                 busy_timeout: float = DEFAULT_BUSY_TIMEOUT, hash_keys: bool = False):
+        """
+        Args:
+            path (str): Path of the database file, created if missing
+            maxsize (int): Approximate maximum number of entries to keep (default: 1000000)
+            verdicts (bool): Also keep prompt injection check verdicts (default: True)
+            busy_timeout (float): Seconds to wait for another process' write to finish (default: 5.0)
+            hash_keys (bool): Store the arguments of keys as a digest instead of in full
+                              (default: False)
+
+        Raises:
+            ValueError: If maxsize is not positive
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be a positive integer")
+        self.path = path
+        self.maxsize = maxsize
+        self.verdicts = verdicts
+        self.busy_timeout = busy_timeout
+        self.hash_keys = hash_keys
+        self._functions = defaultdict(lambda: dict.fromkeys(("hits", "misses", "evictions"), 0))
+        self._eviction_interval = max(1, min(EVICTION_INTERVAL, maxsize // 16))
+        self._lock = threading.Lock()
+        self._reset_connections()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self._connection().executescript(_SCHEMA)
+
+    def _reset_connections(self) -> None:
+        """Forget the connections of another process"""
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._connections = []
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the current thread's connection, opening it on first use in this process"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset_connections()
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def get(self, key: Hashable) -> Optional[object]:
+        """
+        Look up a cached result.
+
+        Args:
+            key (Hashable): The cache key
+
+        Returns:
+            Optional[object]: The cached result, or None on a miss
+        """
+        if self.hash_keys:
+            key = _hash_key(key)
+        encoded_key = _encode_key(key)
+        try:
+            connection = self._connection()
+            row = connection.execute("SELECT value, used FROM entries WHERE key = ?", (encoded_key,)).fetchone()
+        except sqlite3.Error:
+            self._record_error()
+            row = None
+        with self._lock:
+            counters = self._functions[_function_name(key)]
+            if row is None:
+                self.misses += 1
+                counters["misses"] += 1
+                return None
+            self.hits += 1
+            counters["hits"] += 1
+        now = time.time()
+        if row[1] < now - TOUCH_INTERVAL:
+            try:
+                connection.execute("UPDATE entries SET used = ? WHERE key = ?", (now, encoded_key))
+            except sqlite3.Error:
+                # Recency is refreshed on a later hit
+                self._record_error()
+        return _decode_value(row[0])
+
+    def set(self, key: Hashable, value: object) -> None:
+        """
+        Store a result, evicting least recently used ones every few writes once full.
+
+        Args:
+            key (Hashable): The cache key
+            value (object): The result to store
+        """
+        if self.hash_keys:
+            key = _hash_key(key)
+        try:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, used) VALUES (?, ?, ?)",
+                (_encode_key(key), _encode_value(value), time.time()),
+            )
+        except sqlite3.Error:
+            # The result is still returned to the caller, just not shared
+            self._record_error()
+            return
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % self._eviction_interval == 0
+        if evict:
+            self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Delete the least recently used entries beyond maxsize"""
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = connection.execute(
+                    "SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?", (self.maxsize,)
+                ).fetchall()
+                connection.executemany("DELETE FROM entries WHERE key = ?", rows)
+                connection.execute("COMMIT")
+            except BaseException:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            # Eviction is retried every few writes
+            self._record_error()
+            return
+        with self._lock:
+            for (encoded_key,) in rows:
+                self.evictions += 1
+                self._functions[_function_name(_decode_key(encoded_key))]["evictions"] += 1
+
+    def _record_error(self) -> None:
+        """Count a lookup, write or eviction that failed on a database error"""
+        with self._lock:
+            self.errors += 1
+
+    def items(self) -> list:
+        """Get a snapshot of the cached (key, result) pairs"""
+        rows = self._connection().execute("SELECT key, value FROM entries").fetchall()
+        return [(_decode_key(key), _decode_value(value)) for key, value in rows]
+
+    def clear(self) -> None:
+        """Remove all cached results, for every process"""
+        self._connection().execute("DELETE FROM entries")
+
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+
+        Returns:
+            dict: "hits", "misses" and database "errors" in this process, current "size" and "maxsize"
+        """
+        size = len(self)
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "errors": self.errors, "size": size,
+                    "maxsize": self.maxsize}
+
+    def function_stats(self) -> dict:
+        """
+        Get cache counters per vibe function.
+
+        Entries and bytes cover the whole database; hits, misses and evictions
+        are counted by this process.
+
+        Returns:
+            dict: For each function, its "hits", "misses", "hit_ratio", current "entries"
+                  and "bytes", and "evictions"
+        """
+        rows = self._connection().execute(
+            "SELECT json_extract(key, '$[1]'), count(*), sum(length(CAST(key AS BLOB)) + length(CAST(value AS BLOB))) "
+            "FROM entries GROUP BY 1"
+        ).fetchall()
+        with self._lock:
+            functions = {function: dict.fromkeys(_FUNCTION_COUNTERS, 0) for function in self._functions}
+            for function, counters in self._functions.items():
+                functions[function].update(counters)
+        for function, entries, size in rows:
+            function = function if isinstance(function, str) else "other"
+            counters = functions.setdefault(function, dict.fromkeys(_FUNCTION_COUNTERS, 0))
+            counters["entries"] += entries
+            counters["bytes"] += size
+        return {function: _function_report(counters) for function, counters in functions.items()}
+
+    def close(self) -> None:
+        """Close the connections opened by this process"""
+        with self._lock:
+            connections = self._connections if self._pid == os.getpid() else []
+            self._local = threading.local()
+            self._connections = []
+        for connection in connections:
+            connection.close()
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT count(*) FROM entries").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,108 @@
+"""
+Argument canonicalization so equivalent vibe calls share cache entries
+"""
+
+import re
+from typing import NamedTuple, Optional, Sequence, Union
+
+# Tokens of the vibeeval grammar: numbers, operators and parentheses
+_EXPRESSION_TOKEN = re.compile(r"\s*(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?|\*\*|[-+*/()])")
+
+
+class CanonicalCall(NamedTuple):
+    """
+    Canonical form of a vibe call.
+
+    Attributes:
+        key (tuple): Hashable key identifying the question; equivalent calls have equal keys
+        flip (bool): Whether the call's result is the negation of the canonical result,
+                     as for vibecompare with swapped arguments
+    """
+    key: tuple
+    flip: bool = False
+
+    def to_canonical(self, result):
+        """Convert a result of this call to the result of the canonical call"""
+        return -result if self.flip else result
+
+    def from_canonical(self, result):
+        """Convert a result of the canonical call to the result of this call"""
+        return -result if self.flip else result
+
+
+def canonical_number(value: Union[int, float]) -> Union[int, float]:
+    """
+    Normalize a number so equal values have one representation.
+
+    Integral floats become ints (2.0 -> 2, -0.0 -> 0); other values are unchanged.
+    """
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def canonical_expression(expression: str) -> str:
+    """
+    Normalize whitespace in an arithmetic expression.
+
+    Expressions made of grammar tokens are re-joined with single spaces, so
+    "(2+3)*4" and " ( 2 + 3 ) * 4" are the same. Other expressions only have
+    runs of whitespace collapsed, since their meaning may depend on spacing.
+    """
+    tokens = []
+    position = 0
+    stripped = expression.strip()
+    while position < len(stripped):
+        match = _EXPRESSION_TOKEN.match(stripped, position)
+        if match is None:
+            return " ".join(stripped.split())
+        tokens.append(match.group(1))
+        position = match.end()
+    return " ".join(tokens)
+
+
+def canonical_vibecount(text: str, target_letter: str, case_sensitive: bool) -> CanonicalCall:
+    """Canonical form of a vibecount call; case-insensitive calls are case-folded"""
+    if case_sensitive:
+        return CanonicalCall(("vibecount", text, target_letter, True))
+    return CanonicalCall(("vibecount", text.lower(), target_letter.lower(), False))
+
+
+def canonical_vibecount_all(text: str, characters: Optional[Sequence[str]], case_sensitive: bool) -> CanonicalCall:
+    """
+    Canonical form of a vibecount_all call.
+
+    The requested characters are deduplicated and sorted, since the counts do
+    not depend on their order; case-insensitive calls are case-folded.
+    """
+    if not case_sensitive:
+        text = text.lower()
+        characters = [char.lower() for char in characters] if characters is not None else None
+    characters = tuple(sorted(set(characters))) if characters is not None else None
+    return CanonicalCall(("vibecount_all", text, characters, case_sensitive))
+
+
+def canonical_vibecompare(num1: Union[int, float], num2: Union[int, float]) -> CanonicalCall:
+    """
+    Canonical form of a vibecompare call.
+
+    Numbers are normalized and put in a fixed argument order (by their text
+    form); calls with swapped arguments share one entry and flip its sign.
+    """
+    num1 = canonical_number(num1)
+    num2 = canonical_number(num2)
+    if repr(num1) <= repr(num2):
+        return CanonicalCall(("vibecompare", num1, num2))
+    return CanonicalCall(("vibecompare", num2, num1), flip=True)
+
+
+def canonical_vibeeval(expression: str) -> CanonicalCall:
+    """Canonical form of a vibeeval call; whitespace between tokens is normalized"""
+    return CanonicalCall(("vibeeval", canonical_expression(expression)))
+
+
+def canonical_vibelength(text: str) -> CanonicalCall:
+    """Canonical form of a vibelength call"""
+    return CanonicalCall(("vibelength", text))
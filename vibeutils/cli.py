@@ -0,0 +1,467 @@
+"""
+Command-line tool running vibe functions over batches of inputs
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Iterator, Optional, TextIO
+
+from .cache import SQLiteCache
+from .ledger import CostLedger, load_prices
+from .session import VibeSession
+
+# Parameters of each function, in positional order
+FUNCTIONS = {
+    "vibecount": ("text", "target_letter", "case_sensitive"),
+    "vibecount_all": ("text", "characters", "case_sensitive"),
+    "vibecompare": ("num1", "num2"),
+    "vibeeval": ("expression",),
+    "vibelength": ("text",),
+}
+
+# Input formats by file extension
+INPUT_FORMATS = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv"}
+
+# Default number of concurrent calls
+DEFAULT_WORKERS = 16
+
+# Latencies kept for the progress line's percentiles
+LATENCY_WINDOW = 10000
+
+# Seconds between progress line updates
+PROGRESS_INTERVAL = 0.5
+
+
+def _parse_number(value: str):
+    """Parse an int or float argument given as text"""
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            raise ValueError(f"Not a number: {value!r}")
+
+
+def _parse_bool(value: str) -> bool:
+    """Parse a boolean argument given as text"""
+    lowered = value.strip().lower()
+    if lowered in ("1", "true", "yes", "y"):
+        return True
+    if lowered in ("0", "false", "no", "n"):
+        return False
+    raise ValueError(f"Not a boolean: {value!r}")
+
+
+# Conversions of arguments given as text (CSV fields, lines and --arg values)
+_CONVERTERS = {
+    "num1": _parse_number,
+    "num2": _parse_number,
+    "case_sensitive": _parse_bool,
+    "characters": list,
+}
+
+
+def build_arguments(function: str, record: object, fixed: Optional[dict] = None) -> dict:
+    """
+    Convert an input record to keyword arguments of a vibe function.
+
+    A record is a dict of arguments by parameter name (a JSON object or CSV
+    row), a list of positional arguments (a JSON array) or a single value,
+    which becomes the first argument (a JSON scalar or an input line).
+    Text values of numeric and boolean parameters are parsed.
+
+    Args:
+        function (str): Name of the vibe function
+        record (object): Input record
+        fixed (Optional[dict]): Arguments applied to every record, overridden by the record's own
+
+    Returns:
+        dict: Keyword arguments
+
+    Raises:
+        ValueError: If the record has too many or unknown arguments, or a value cannot be parsed
+    """
+    parameters = FUNCTIONS[function]
+    if isinstance(record, dict):
+        given = record
+    elif isinstance(record, list):
+        if len(record) > len(parameters):
+            raise ValueError(f"{function} takes at most {len(parameters)} arguments, got {len(record)}")
+        given = dict(zip(parameters, record))
+    else:
+        given = {parameters[0]: record}
+
+    arguments = dict(fixed or {})
+    for name, value in given.items():
+        if name not in parameters:
+            raise ValueError(f"Unknown argument for {function}: {name}")
+        if isinstance(value, str) and name in _CONVERTERS:
+            value = _CONVERTERS[name](value)
+        arguments[name] = value
+    return arguments
+
+
+def read_records(stream: TextIO, input_format: str) -> Iterator[object]:
+    """
+    Read input records from a text stream.
+
+    Args:
+        stream (TextIO): Input stream
+        input_format (str): "jsonl", "csv" or "lines"
+
+    Returns:
+        Iterator[object]: Parsed records; JSON lines that fail to parse are yielded as the exception
+    """
+    if input_format == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.rstrip("\r\n")
+        if input_format == "lines":
+            yield line
+        elif line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield ValueError(f"Invalid JSON: {e}")
+
+
+def _input_format(paths: list, requested: str) -> str:
+    """Resolve the input format, detected from the first file's extension when "auto" """
+    if requested != "auto":
+        return requested
+    for path in paths:
+        if path != "-":
+            return INPUT_FORMATS.get(os.path.splitext(path)[1].lower(), "lines")
+    return "lines"
+
+
+def _open_inputs(paths: list, input_format: str) -> list:
+    """
+    Open every input path, "-" being stdin, so unreadable inputs are reported before any call is made.
+
+    Raises:
+        OSError: If an input cannot be opened; inputs already opened are closed
+    """
+    streams = []
+    try:
+        for path in paths or ["-"]:
+            streams.append(sys.stdin if path == "-" else
+                           open(path, newline="" if input_format == "csv" else None, encoding="utf-8"))
+    except OSError:
+        _close_inputs(streams)
+        raise
+    return streams
+
+
+def _close_inputs(streams: list) -> None:
+    """Close the opened input files, leaving stdin open"""
+    for stream in streams:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _read_inputs(streams: list, input_format: str) -> Iterator[object]:
+    """Read the records of every input stream in turn"""
+    for stream in streams:
+        yield from read_records(stream, input_format)
+
+
+def _to_json(value: object) -> object:
+    """Convert results and inputs to JSON-serializable values"""
+    if isinstance(value, dict):
+        return {str(key): _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    return value
+
+
+class _Writer:
+    """Writes outcomes in the requested output format"""
+
+    def __init__(self, stream: TextIO, output_format: str):
+        self.stream = stream
+        self.output_format = output_format
+        self._csv = None
+        if output_format == "csv":
+            self._csv = csv.writer(stream)
+            self._csv.writerow(["index", "result", "error"])
+
+    def write(self, index: int, arguments: Optional[dict], result: object, error: Optional[str]) -> None:
+        """Write the outcome of one input record"""
+        if self.output_format == "jsonl":
+            line = {"index": index, "input": _to_json(arguments)}
+            if error is not None:
+                line["error"] = error
+            else:
+                line["result"] = _to_json(result)
+            self.stream.write(json.dumps(line, ensure_ascii=False) + "\n")
+            return
+        text = "" if error is not None else (
+            json.dumps(_to_json(result), ensure_ascii=False) if isinstance(result, dict) else str(result))
+        if self._csv is not None:
+            self._csv.writerow([index, text, error or ""])
+        else:
+            self.stream.write((f"ERROR: {error}" if error is not None else text) + "\n")
+
+
+class _RatePacer:
+    """Spaces out call starts to at most a given number per second"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next = time.monotonic()
+
+    def wait(self) -> None:
+        """Block until the next call may start"""
+        now = time.monotonic()
+        if self._next > now:
+            time.sleep(self._next - now)
+            now = self._next
+        # Do not bank unused time: an idle pacer allows one call immediately, not a burst
+        self._next = max(self._next, now) + self.interval
+
+
+class Progress:
+    """
+    Live counters of a batch run, rendered as a single status line.
+
+    Latency percentiles are computed over the most recent LATENCY_WINDOW
+    calls, so they follow the current behaviour of long runs.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, interval: float = PROGRESS_INTERVAL):
+        self.stream = stream
+        self.interval = interval
+        self.done = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def record(self, latency: float, ok: bool) -> None:
+        """Count a finished call"""
+        with self._lock:
+            self.done += 1
+            if not ok:
+                self.errors += 1
+            self._latencies.append(latency)
+
+    def snapshot(self) -> dict:
+        """
+        Get the current counters.
+
+        Returns:
+            dict: "done", "errors", "items_per_second" and "p50"/"p99" latency in seconds
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            done, errors = self.done, self.errors
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] if latencies else 0.0
+
+        return {"done": done, "errors": errors, "items_per_second": done / elapsed,
+                "p50": percentile(0.50), "p99": percentile(0.99)}
+
+    def render(self) -> str:
+        """Format the counters as a status line"""
+        snapshot = self.snapshot()
+        return (f"{snapshot['done']} items  {snapshot['items_per_second']:.1f} items/s  "
+                f"p50 {snapshot['p50'] * 1000:.0f}ms  p99 {snapshot['p99'] * 1000:.0f}ms  "
+                f"{snapshot['errors']} errors")
+
+    def _refresh(self) -> None:
+        """Redraw the status line until stopped"""
+        while not self._stopped.wait(self.interval):
+            self.stream.write("\r" + self.render())
+            self.stream.flush()
+
+    def start(self) -> None:
+        """Start redrawing the status line, if there is a stream to draw it on"""
+        if self.stream is not None:
+            self._thread = threading.Thread(target=self._refresh, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop redrawing and write the final status line"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.stream is not None:
+            self.stream.write("\r" + self.render() + "\n")
+            self.stream.flush()
+
+
+def _call(method, function: str, record: object, fixed: dict, timeout: Optional[float]) -> tuple:
+    """Run one vibe call, returning (arguments, result, error message, latency)"""
+    started = time.monotonic()
+    arguments = None
+    try:
+        if isinstance(record, Exception):
+            raise record
+        arguments = build_arguments(function, record, fixed)
+        return arguments, method(**arguments, timeout=timeout), None, time.monotonic() - started
+    except Exception as e:
+        return arguments, None, str(e) or type(e).__name__, time.monotonic() - started
+
+
+def run_batch(session: VibeSession, function: str, records, writer: _Writer, progress: Progress,
+              fixed: Optional[dict] = None, workers: int = DEFAULT_WORKERS, rate: Optional[float] = None,
+              timeout: Optional[float] = None) -> None:
+    """
+    Run a vibe function over records concurrently, writing outcomes in input order.
+
+    At most a few calls per worker are queued ahead, so inputs of any size
+    are streamed rather than read up front.
+
+    Args:
+        session (VibeSession): Session running the calls on its thread pool
+        function (str): Name of the vibe function
+        records: Iterable of input records (see build_arguments)
+        writer (_Writer): Output writer
+        progress (Progress): Counters updated as calls finish
+        fixed (Optional[dict]): Arguments applied to every record
+        workers (int): Number of concurrent calls
+        rate (Optional[float]): Maximum calls started per second
+        timeout (Optional[float]): Timeout of each call in seconds
+    """
+    method = getattr(session, function)
+    pacer = _RatePacer(rate) if rate else None
+    pending = deque()
+
+    def finish():
+        index, future = pending.popleft()
+        arguments, result, error, latency = future.result()
+        progress.record(latency, error is None)
+        writer.write(index, arguments, result, error)
+
+    for index, record in enumerate(records):
+        if pacer is not None:
+            pacer.wait()
+        pending.append((index, session.executor.submit(_call, method, function, record, fixed or {}, timeout)))
+        while len(pending) >= 2 * workers:
+            finish()
+    while pending:
+        finish()
+
+
+def _parse_fixed(function: str, values: list) -> dict:
+    """Parse --arg NAME=VALUE options"""
+    fixed = {}
+    for value in values:
+        name, separator, text = value.partition("=")
+        if not separator:
+            raise ValueError(f"--arg must be NAME=VALUE, got {value!r}")
+        fixed.update(build_arguments(function, {name: text}))
+    return fixed
+
+
+def _positive(kind):
+    """Build an argparse type accepting positive numbers of a kind"""
+    def parse(value):
+        number = kind(value)
+        if number <= 0:
+            raise argparse.ArgumentTypeError(f"must be positive, got {value}")
+        return number
+    return parse
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command-line argument parser"""
+    parser = argparse.ArgumentParser(
+        prog="vibeutils",
+        description="Run a vibe function over every record of the inputs and write one result per record.",
+    )
+    parser.add_argument("function", choices=sorted(FUNCTIONS), help="vibe function to run")
+    parser.add_argument("inputs", nargs="*", metavar="INPUT", help='input files; "-" or none reads stdin')
+    parser.add_argument("-f", "--format", dest="input_format", default="auto",
+                        choices=["auto", "jsonl", "csv", "lines"],
+                        help="input format (default: from the file extension, lines for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("-O", "--output-format", default="jsonl", choices=["jsonl", "csv", "lines"],
+                        help="output format (default: jsonl)")
+    parser.add_argument("-a", "--arg", action="append", default=[], metavar="NAME=VALUE",
+                        help="argument applied to every record, e.g. target_letter=r (repeatable)")
+    parser.add_argument("-w", "--workers", type=_positive(int), default=DEFAULT_WORKERS,
+                        help=f"number of concurrent calls (default: {DEFAULT_WORKERS})")
+    parser.add_argument("-r", "--rate", type=_positive(float), help="maximum calls started per second")
+    parser.add_argument("-c", "--cache", metavar="PATH", help="SQLite result cache shared across runs")
+    parser.add_argument("-t", "--timeout", type=_positive(float), help="timeout of each call in seconds")
+    parser.add_argument("--provider", help="AI provider (default: VIBEUTILS_PROVIDER or openai)")
+    parser.add_argument("--model", help="model (default: the provider's model variable or default)")
+    parser.add_argument("--budget", type=_positive(float), metavar="USD",
+                        help="hard budget: calls are refused once it has been spent")
+    parser.add_argument("--soft-budget", type=_positive(float), metavar="USD",
+                        help="soft budget: calls are throttled once it has been spent")
+    parser.add_argument("--prices", metavar="PATH",
+                        help='JSON price table, {"model": [input, output]} in USD per million tokens')
+    progress = parser.add_mutually_exclusive_group()
+    progress.add_argument("--progress", dest="progress", action="store_true", default=None,
+                          help="show the progress line (default: when stderr is a terminal)")
+    progress.add_argument("--no-progress", dest="progress", action="store_false", help="hide the progress line")
+    return parser
+
+
+def main(argv: Optional[list] = None) -> int:
+    """
+    Run the vibeutils command.
+
+    Args:
+        argv (Optional[list]): Command-line arguments (default: sys.argv[1:])
+
+    Returns:
+        int: Exit status: 0 if every record succeeded, 1 if any failed, 2 for usage errors
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    input_format = _input_format(args.inputs, args.input_format)
+    streams = []
+    try:
+        fixed = _parse_fixed(args.function, args.arg)
+        streams = _open_inputs(args.inputs, input_format)
+        ledger = None
+        if args.budget is not None or args.soft_budget is not None or args.prices is not None:
+            ledger = CostLedger(prices=load_prices(args.prices) if args.prices else None,
+                                soft_budget=args.soft_budget, hard_budget=args.budget)
+        session = VibeSession(provider=args.provider, model=args.model, max_workers=args.workers,
+                              cache=SQLiteCache(args.cache) if args.cache else None, ledger=ledger)
+    except (ValueError, OSError) as e:
+        _close_inputs(streams)
+        parser.error(str(e))
+
+    show_progress = sys.stderr.isatty() if args.progress is None else args.progress
+    progress = Progress(sys.stderr if show_progress else None)
+    output = None
+    try:
+        with session:
+            try:
+                output = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+            except OSError as e:
+                parser.error(str(e))
+            progress.start()
+            run_batch(session, args.function, _read_inputs(streams, input_format),
+                      _Writer(output, args.output_format), progress,
+                      fixed=fixed, workers=args.workers, rate=args.rate, timeout=args.timeout)
+    finally:
+        progress.stop()
+        if output is sys.stdout:
+            output.flush()
+        elif output is not None:
+            output.close()
+        _close_inputs(streams)
+        if session.cache is not None:
+            session.cache.close()
+        if ledger is not None:
+            print(ledger.report(), file=sys.stderr)
+    return 1 if progress.errors else 0
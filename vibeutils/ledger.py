@@ -0,0 +1,307 @@
+"""
+Token cost accounting and spending budgets for provider requests
+"""
+
+import json
+import threading
+import time
+from typing import NamedTuple, Optional
+
+# Calls per second admitted once a soft budget has been spent
+DEFAULT_THROTTLE_RATE = 1.0
+
+# Per-function and per-stage counters reported by function_stats()
+_COUNTERS = ("completions", "input_tokens", "output_tokens", "estimated", "cost")
+
+
+class ModelPrice(NamedTuple):
+    """
+    Price of a model's tokens.
+
+    Attributes:
+        input (float): Price of one million input (prompt) tokens, in USD
+        output (float): Price of one million output (completion) tokens, in USD
+    """
+    input: float
+    output: float
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        """Price a completion's tokens, in USD"""
+        return (input_tokens * self.input + output_tokens * self.output) / 1_000_000
+
+
+# List prices in USD per million tokens, matched by the longest model name prefix.
+# Pass prices= to CostLedger (or load_prices()) for the rates you actually pay.
+DEFAULT_PRICES = {
+    "gpt-4o-mini": ModelPrice(0.15, 0.60),
+    "gpt-4o": ModelPrice(2.50, 10.00),
+    "chatgpt-4o-latest": ModelPrice(5.00, 15.00),
+    "gpt-4-turbo": ModelPrice(10.00, 30.00),
+    "gpt-4": ModelPrice(30.00, 60.00),
+    "gpt-3.5-turbo": ModelPrice(0.50, 1.50),
+    "o1-mini": ModelPrice(1.10, 4.40),
+    "o1-preview": ModelPrice(15.00, 60.00),
+    "claude-opus-4": ModelPrice(15.00, 75.00),
+    "claude-sonnet-4": ModelPrice(3.00, 15.00),
+    "claude-3-7-sonnet": ModelPrice(3.00, 15.00),
+    "claude-3-5-sonnet": ModelPrice(3.00, 15.00),
+    "claude-3-5-haiku": ModelPrice(0.80, 4.00),
+    "claude-3-opus": ModelPrice(15.00, 75.00),
+    "claude-3-haiku": ModelPrice(0.25, 1.25),
+}
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised when a vibe call is refused because a hard budget has been spent"""
+
+
+def _model_price(model: str, value: object) -> ModelPrice:
+    """Convert a price table value ([input, output] or {"input": ..., "output": ...}) to a ModelPrice"""
+    if isinstance(value, dict) and set(value) == {"input", "output"}:
+        value = (value["input"], value["output"])
+    if isinstance(value, (list, tuple)) and len(value) == 2 and all(
+            isinstance(price, (int, float)) and not isinstance(price, bool) and price >= 0 for price in value):
+        return ModelPrice(float(value[0]), float(value[1]))
+    raise ValueError(f"Invalid price for model {model}: expected [input, output] prices per million tokens")
+
+
+def load_prices(path: str) -> dict:
+    """
+    Load a price table from a JSON file.
+
+    The file maps model names (or name prefixes) to their prices in USD per
+    million tokens, as [input, output] or {"input": ..., "output": ...}.
+
+    Args:
+        path (str): Path of the JSON file
+
+    Returns:
+        dict: {model: ModelPrice}, to pass as CostLedger(prices=...)
+
+    Raises:
+        ValueError: If the file is not a JSON object of valid prices
+    """
+    with open(path, encoding="utf-8") as file:
+        try:
+            table = json.load(file)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid price table {path}: {e}") from e
+    if not isinstance(table, dict):
+        raise ValueError(f"Invalid price table {path}: expected a JSON object")
+    return {model: _model_price(model, value) for model, value in table.items()}
+
+
+def _check_budget(name: str, budget: Optional[float]) -> None:
+    """Check that a budget argument is None or a non-negative number"""
+    if budget is not None and (isinstance(budget, bool) or not isinstance(budget, (int, float)) or budget < 0):
+        raise ValueError(f"{name} must be a non-negative amount in USD")
+
+
+class CostLedger:
+    """
+    Record of the tokens and cost of provider requests, with spending budgets.
+
+    Every completion of a metered vibe call is recorded with its model, the
+    vibe function called and the pipeline stage ("injection_check", "answer"
+    or "validation"). Token counts come from the provider's usage data; when
+    a provider reports none (e.g. a stream closed early), they are estimated
+    from the text and counted as "estimated".
+
+    Budgets apply to new vibe calls that reach the provider (answer table and
+    cache hits are free): once soft_budget has been spent, calls are started
+    at most throttle_rate per second; once hard_budget has been spent, they
+    are refused with BudgetExceededError. Calls already running finish, so
+    spending can end slightly above a budget.
+
+    Instances are thread-safe. Share one ledger between the sessions of a job
+    to give them one budget; give job ledgers a common parent ledger to also
+    enforce a process-wide budget, since every completion is recorded in the
+    parents too.
+    """
+
+    def __init__(self, prices: Optional[dict] = None, soft_budget: Optional[float] = None,
+                 hard_budget: Optional[float] = None, throttle_rate: float = DEFAULT_THROTTLE_RATE,
+                 parent: Optional["CostLedger"] = None):
+        """
+        Args:
+            prices (Optional[dict]): Prices in USD per million tokens by model name prefix, as
+                                     ModelPrice or [input, output], overriding DEFAULT_PRICES.
+                                     Models without a price are recorded at no cost.
+            soft_budget (Optional[float]): Spending in USD above which new calls are throttled
+            hard_budget (Optional[float]): Spending in USD above which new calls are refused
+            throttle_rate (float): Calls per second started once the soft budget is spent (default: 1.0)
+            parent (Optional[CostLedger]): Ledger that also records this ledger's completions and
+                                           whose budgets also apply to its calls
+
+        Raises:
+            ValueError: If a price, budget or the throttle rate is invalid
+        """
+        _check_budget("soft_budget", soft_budget)
+        _check_budget("hard_budget", hard_budget)
+        if isinstance(throttle_rate, bool) or not isinstance(throttle_rate, (int, float)) or not throttle_rate > 0:
+            raise ValueError("throttle_rate must be a positive number of calls per second")
+        self.prices = dict(DEFAULT_PRICES)
+        for model, value in (prices or {}).items():
+            self.prices[model] = _model_price(model, value)
+        self.soft_budget = soft_budget
+        self.hard_budget = hard_budget
+        self.throttle_rate = throttle_rate
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._next_admission = 0.0
+        self._spent = 0.0
+        self._stages = {}
+        self._calls = {}
+        self._unpriced = set()
+        self.throttled = 0
+        self.refused = 0
+
+    def price(self, model: str) -> Optional[ModelPrice]:
+        """
+        Get the price of a model's tokens.
+
+        Returns:
+            Optional[ModelPrice]: The price of the longest matching name prefix, or None if unpriced
+        """
+        matches = [prefix for prefix in self.prices if model.startswith(prefix)]
+        return self.prices[max(matches, key=len)] if matches else None
+
+    @property
+    def spent(self) -> float:
+        """Total cost recorded, in USD"""
+        with self._lock:
+            return self._spent
+
+    def _chain(self) -> list:
+        """This ledger and its parents"""
+        ledgers = []
+        ledger = self
+        while ledger is not None:
+            ledgers.append(ledger)
+            ledger = ledger.parent
+        return ledgers
+
+    def admit(self, function: str, timeout: Optional[float] = None) -> None:
+        """
+        Admit a new vibe call under the budgets of this ledger and its parents.
+
+        Args:
+            function (str): Name of the vibe function called
+            timeout (Optional[float]): Seconds the call may wait while throttled, or None
+                                       to wait as long as needed
+
+        Raises:
+            BudgetExceededError: If a hard budget has been spent
+            TimeoutError: If throttling would delay the call beyond timeout
+        """
+        ledgers = self._chain()
+        for ledger in ledgers:
+            with ledger._lock:
+                if ledger.hard_budget is not None and ledger._spent >= ledger.hard_budget:
+                    ledger.refused += 1
+                    raise BudgetExceededError(
+                        f"Hard budget of ${ledger.hard_budget:g} spent (${ledger._spent:.4f}); {function} call refused"
+                    )
+
+        now = time.monotonic()
+        start = now
+        for ledger in ledgers:
+            with ledger._lock:
+                ledger._calls[function] = ledger._calls.get(function, 0) + 1
+                if ledger.soft_budget is not None and ledger._spent >= ledger.soft_budget:
+                    ledger.throttled += 1
+                    slot = max(now, ledger._next_admission)
+                    ledger._next_admission = slot + 1 / ledger.throttle_rate
+                    start = max(start, slot)
+
+        delay = start - now
+        if delay > 0:
+            if timeout is not None and delay > timeout:
+                raise TimeoutError("Timed out waiting for a throttled call to start")
+            time.sleep(delay)
+
+    def record(self, model: str, function: str, stage: str, input_tokens: int, output_tokens: int,
+               estimated: bool = False) -> float:
+        """
+        Record the tokens of one completion, in this ledger and its parents.
+
+        Args:
+            model (str): Model that answered
+            function (str): Vibe function the completion belongs to
+            stage (str): Pipeline stage of the completion
+            input_tokens (int): Prompt tokens
+            output_tokens (int): Completion tokens
+            estimated (bool): Whether the token counts are estimates (default: False)
+
+        Returns:
+            float: Cost of the completion in USD, as priced by this ledger
+        """
+        price = self.price(model)
+        cost = price.cost(input_tokens, output_tokens) if price is not None else 0.0
+        with self._lock:
+            counters = self._stages.setdefault((function, stage), dict.fromkeys(_COUNTERS, 0))
+            counters["completions"] += 1
+            counters["input_tokens"] += input_tokens
+            counters["output_tokens"] += output_tokens
+            counters["estimated"] += int(estimated)
+            counters["cost"] += cost
+            self._spent += cost
+            if price is None:
+                self._unpriced.add(model)
+        if self.parent is not None:
+            self.parent.record(model, function, stage, input_tokens, output_tokens, estimated)
+        return cost
+
+    def stats(self) -> dict:
+        """
+        Get the ledger totals.
+
+        Returns:
+            dict: "spent" in USD, admitted "calls", "completions", "input_tokens",
+                  "output_tokens", "estimated" completions, calls "throttled" and
+                  "refused", and the "unpriced" models recorded at no cost
+        """
+        with self._lock:
+            totals = {name: sum(counters[name] for counters in self._stages.values())
+                      for name in _COUNTERS if name != "cost"}
+            return dict(spent=self._spent, calls=sum(self._calls.values()), **totals,
+                        throttled=self.throttled, refused=self.refused, unpriced=sorted(self._unpriced))
+
+    def function_stats(self) -> dict:
+        """
+        Get spending per vibe function and pipeline stage.
+
+        Returns:
+            dict: For each function, its admitted "calls", its "completions", "input_tokens",
+                  "output_tokens", "estimated" completions and "cost", and the same
+                  counters per pipeline stage under "stages"
+        """
+        with self._lock:
+            functions = {function: dict(dict.fromkeys(_COUNTERS, 0), calls=calls, stages={})
+                         for function, calls in self._calls.items()}
+            for (function, stage), counters in sorted(self._stages.items()):
+                report = functions.setdefault(function, dict(dict.fromkeys(_COUNTERS, 0), calls=0, stages={}))
+                report["stages"][stage] = dict(counters)
+                for name in _COUNTERS:
+                    report[name] += counters[name]
+            return functions
+
+    def report(self) -> str:
+        """
+        Summarize spending as text, one line per function and stage.
+
+        Returns:
+            str: The summary, ending with the totals
+        """
+        lines = []
+        for function, report in sorted(self.function_stats().items()):
+            lines.append(f"{function}: {report['calls']} calls  {report['input_tokens']} in  "
+                         f"{report['output_tokens']} out  ${report['cost']:.4f}")
+            for stage, counters in report["stages"].items():
+                lines.append(f"  {stage}: {counters['completions']} completions  {counters['input_tokens']} in  "
+                             f"{counters['output_tokens']} out  ${counters['cost']:.4f}")
+        stats = self.stats()
+        lines.append(f"total: ${stats['spent']:.4f}  {stats['throttled']} throttled  {stats['refused']} refused")
+        if stats["unpriced"]:
+            lines.append(f"unpriced models: {', '.join(stats['unpriced'])}")
+        return "\n".join(lines)
@@ -0,0 +1,337 @@
+"""
+Adaptive concurrency limiting of provider requests
+"""
+
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from .core import AIProvider, MAX_TOKENS, TEMPERATURE, OutputConstraint, _current_request_timeout, _limiter_headers
+
+# Default bounds and starting point of the concurrency limit
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 64
+
+# Multiplicative decrease applied on rate limiting and timeouts
+DEFAULT_BACKOFF = 0.5
+
+# Latency above this multiple of the best observed latency is congestion
+DEFAULT_LATENCY_TOLERANCE = 2.0
+
+# HTTP status of rate-limited requests
+RATE_LIMIT_STATUS = 429
+
+# Retries of rate-limited requests, and the first delay between them when the
+# provider sends no Retry-After (doubled on each retry)
+DEFAULT_MAX_RETRIES = 2
+RETRY_DELAY = 0.5
+
+# Headers of successful responses giving the remaining quota and when it
+# resets, for OpenAI and Anthropic
+QUOTA_HEADERS = (
+    ("x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
+    ("x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens"),
+    ("anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-requests-reset"),
+    ("anthropic-ratelimit-tokens-remaining", "anthropic-ratelimit-tokens-reset"),
+)
+
+# Parts of a quota reset duration such as "6m0s" or "20ms"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _response_headers(error: BaseException) -> dict:
+    """Get the HTTP response headers attached to a provider SDK error, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    return headers if headers is not None else {}
+
+
+def _retry_after(headers) -> Optional[float]:
+    """Read the server-requested delay in seconds from rate-limit response headers"""
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def _reset_delay(value: str) -> Optional[float]:
+    """Read a quota reset as seconds from now: a number of seconds, a duration ("6m0s") or an RFC 3339 time"""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(number + unit for number, unit in parts) == value:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+    try:
+        reset = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if reset.tzinfo is None:
+        return None
+    return (reset - datetime.now(timezone.utc)).total_seconds()
+
+
+def _quota_delay(headers, in_flight: int) -> Optional[float]:
+    """
+    Read how long to hold back new requests from the quota headers of a successful response.
+
+    A request quota is spent once the requests in flight would use up what
+    remains; a token quota once none remain.
+
+    Returns:
+        Optional[float]: Seconds until the latest spent quota resets, or None if none is spent
+    """
+    delays = []
+    for remaining_header, reset_header in QUOTA_HEADERS:
+        try:
+            remaining = float(headers.get(remaining_header))
+        except (TypeError, ValueError):
+            continue
+        if remaining > (in_flight if "requests" in remaining_header else 0):
+            continue
+        reset = headers.get(reset_header)
+        delay = _reset_delay(reset) if isinstance(reset, str) else None
+        if delay is not None:
+            delays.append(delay)
+    return max(delays) if delays else None
+
+
+def _is_rate_limited(error: BaseException) -> bool:
+    """Check whether a provider SDK error is a rate-limit response"""
+    return getattr(error, "status_code", None) == RATE_LIMIT_STATUS
+
+
+def _is_timeout(error: BaseException) -> bool:
+    """Check whether a provider SDK error is a request timeout"""
+    return isinstance(error, TimeoutError) or type(error).__name__ in ("APITimeoutError", "TimeoutException")
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limiter on the number of provider requests in flight.
+
+    The limit grows additively (by about one request per limit's worth of
+    successes) while requests succeed with healthy latency, and is cut
+    multiplicatively when a request is rate limited (HTTP 429) or times out.
+    A concurrent burst of failures only cuts the limit once: failures of
+    requests started before the last cut are ignored. When a rate-limit
+    response carries a Retry-After header, new requests are held back until
+    it has passed. The quota headers of successful responses
+    (x-ratelimit-remaining-* and x-ratelimit-reset-*, or Anthropic's
+    anthropic-ratelimit-*) hold back new requests the same way once a quota
+    is spent, before the provider starts refusing them.
+
+    Requests sent through the limiter are not retried by the provider SDK, so
+    the limiter sees every rate-limit response; it retries rate-limited
+    requests itself, up to max_retries times, once it has backed off.
+
+    Latency is healthy when it stays within latency_tolerance times the best
+    latency observed so far. Slow requests do not shrink the limit but stop it
+    from growing.
+
+    Instances are thread-safe and can be shared by several sessions, so all
+    of them stay within one quota.
+    """
+
+    def __init__(self, initial_limit: int = DEFAULT_INITIAL_LIMIT, min_limit: int = DEFAULT_MIN_LIMIT,
+                 max_limit: int = DEFAULT_MAX_LIMIT, backoff: float = DEFAULT_BACKOFF,
+                 latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE, max_retries: int = DEFAULT_MAX_RETRIES):
+        """
+        Args:
+            initial_limit (int): Number of requests allowed in flight at the start (default: 4)
+            min_limit (int): Lowest limit the backoff can reach (default: 1)
+            max_limit (int): Highest limit additive increase can reach (default: 64)
+            backoff (float): Factor applied to the limit on rate limiting or timeouts (default: 0.5)
+            latency_tolerance (float): Multiple of the best observed latency above which the
+                                       limit stops growing (default: 2.0)
+            max_retries (int): Retries of a rate-limited request (default: 2)
+
+        Raises:
+            ValueError: If the limits or factors are out of range
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Limits must satisfy 1 <= min_limit <= initial_limit <= max_limit")
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1")
+        if latency_tolerance < 1:
+            raise ValueError("latency_tolerance must be at least 1")
+        if isinstance(max_retries, bool) or not isinstance(max_retries, int) or max_retries < 0:
+            raise ValueError("max_retries must be a non-negative integer")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.max_retries = max_retries
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._best_latency = None
+        self._last_decrease = float("-inf")
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight"""
+        with self._condition:
+            return int(self._limit)
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Wait for a free request slot.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait, or None to wait as long as needed
+
+        Returns:
+            float: Start time of the request, to pass to release()
+
+        Raises:
+            TimeoutError: If no slot frees up within timeout
+        """
+        give_up = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                delay = self._paused_until - now
+                if delay <= 0 and self._in_flight < int(self._limit):
+                    break
+                wait = delay if delay > 0 else None
+                if give_up is not None:
+                    if now >= give_up:
+                        raise TimeoutError("Timed out waiting for a request slot")
+                    wait = min(wait, give_up - now) if wait is not None else give_up - now
+                self._condition.wait(wait)
+            self._in_flight += 1
+            self.requests += 1
+            return time.monotonic()
+
+    def release(self, start: float, error: Optional[BaseException] = None, headers=None) -> None:
+        """
+        Free a request slot and adjust the limit from the request's outcome.
+
+        Args:
+            start (float): Start time returned by acquire()
+            error (Optional[BaseException]): The error the request raised, if any
+            headers: Response headers of a successful request, if known
+        """
+        now = time.monotonic()
+        with self._condition:
+            self._in_flight -= 1
+            if error is None:
+                self._record_success(now - start)
+                delay = _quota_delay(headers, self._in_flight) if headers is not None else None
+                if delay is not None and delay > 0:
+                    self._paused_until = max(self._paused_until, now + delay)
+            elif _is_rate_limited(error) or _is_timeout(error):
+                self._record_congestion(start, now, error)
+            self._condition.notify_all()
+
+    def _record_success(self, latency: float) -> None:
+        """Grow the limit additively after a request with healthy latency"""
+        if self._best_latency is None or latency < self._best_latency:
+            self._best_latency = latency
+        if latency <= self._best_latency * self.latency_tolerance:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+    def _record_congestion(self, start: float, now: float, error: BaseException) -> None:
+        """Cut the limit multiplicatively, once per burst, and honor Retry-After"""
+        self.throttled += 1
+        if start > self._last_decrease:
+            self._limit = max(self.min_limit, self._limit * self.backoff)
+            self._last_decrease = now
+        retry_after = _retry_after(_response_headers(error))
+        if retry_after is not None and retry_after > 0:
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+    def stats(self) -> dict:
+        """
+        Get metrics describing the limiter.
+
+        Returns:
+            dict: Current "limit", requests "in_flight", total "requests",
+                  requests "throttled" by rate limiting or timeouts, and "retries"
+                  of rate-limited requests
+        """
+        with self._condition:
+            return {
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "retries": self.retries,
+            }
+
+
+class _LimitedProvider(AIProvider):
+    """Provider sending its requests through an AdaptiveLimiter"""
+
+    def __init__(self, provider: AIProvider, limiter: AdaptiveLimiter):
+        self.provider = provider
+        self.limiter = limiter
+        self.model = getattr(provider, "model", None) or type(provider).__name__
+        self.constrained_output = getattr(provider, "constrained_output", False) is True
+        self.streaming = getattr(provider, "streaming", False) is True
+
+    def _limited(self, function, *args, **kwargs) -> str:
+        """
+        Run a provider request within a limiter slot, waiting no longer than the request's timeout.
+
+        Rate-limited requests are retried after a backoff, unless it would
+        outlast the request's timeout.
+        """
+        limiter = self.limiter
+        for attempt in range(limiter.max_retries + 1):
+            start = limiter.acquire(_current_request_timeout())
+            headers = []
+            token = _limiter_headers.set(headers)
+            try:
+                result = function(*args, **kwargs)
+            except BaseException as error:
+                limiter.release(start, error)
+                if not _is_rate_limited(error) or attempt == limiter.max_retries:
+                    raise
+                # Retry-After is waited out in acquire()
+                delay = 0.0 if _retry_after(_response_headers(error)) else RETRY_DELAY * 2 ** attempt
+                timeout = _current_request_timeout()
+                if timeout is not None and delay >= timeout:
+                    raise
+                with limiter._condition:
+                    limiter.retries += 1
+                time.sleep(delay)
+                continue
+            finally:
+                _limiter_headers.reset(token)
+            limiter.release(start, headers=headers[-1] if headers else None)
+            return result
+
+    def create_completion(self, messages: list, max_tokens: int = MAX_TOKENS, temperature: float = TEMPERATURE) -> str:
+        """Create a completion once the limiter admits the request"""
+        return self._limited(self.provider.create_completion, messages, max_tokens=max_tokens, temperature=temperature)
+
+    def create_constrained_completion(self, messages: list, constraint: OutputConstraint,
+                                      max_tokens: int = MAX_TOKENS, temperature: float = TEMPERATURE) -> str:
+        """Create a constrained completion once the limiter admits the request"""
+        return self._limited(self.provider.create_constrained_completion, messages, constraint,
+                             max_tokens=max_tokens, temperature=temperature)
+
+    def create_streaming_completion(self, messages: list, constraint: OutputConstraint,
+                                    max_tokens: int = MAX_TOKENS, temperature: float = TEMPERATURE) -> str:
+        """Create a streaming completion once the limiter admits the request"""
+        return self._limited(self.provider.create_streaming_completion, messages, constraint,
+                             max_tokens=max_tokens, temperature=temperature)
+
+    def close(self) -> None:
+        """Close the wrapped provider"""
+        self.provider.close()
@@ -0,0 +1,132 @@
+"""
+Ordering knowledge for inferring vibecompare results without API calls
+"""
+
+import threading
+from typing import Optional, Union
+
+Number = Union[int, float]
+
+
+class ComparisonKnowledge:
+    """
+    Store of answered comparisons that infers new results by transitivity.
+
+    Answered pairs are kept in an ordering graph: numbers answered equal are
+    merged into one equality class (union-find), and "smaller than" answers add
+    an edge from the smaller class to the larger one. A comparison can be
+    inferred whenever one class reaches the other through those edges, e.g.
+    a < b and b < c gives a < c, and a == b with b < c gives a < c.
+
+    Instances are thread-safe and can be shared by a VibeSession.
+    """
+
+    def __init__(self):
+        self._parent = {}
+        self._larger = {}
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.calls_avoided = 0
+
+    def _find(self, value: Number) -> Number:
+        """Get the representative of the equality class of a value, adding it if unseen"""
+        root = self._parent.setdefault(value, value)
+        while self._parent[root] != root:
+            root = self._parent[root]
+        # Path compression
+        while value != root:
+            parent = self._parent[value]
+            self._parent[value] = root
+            value = parent
+        return root
+
+    def _reaches(self, start: Number, target: Number) -> bool:
+        """Check whether class target is known to be larger than class start"""
+        visited = {start}
+        stack = [start]
+        while stack:
+            for larger in self._larger.get(stack.pop(), ()):
+                larger = self._find(larger)
+                if larger == target:
+                    return True
+                if larger not in visited:
+                    visited.add(larger)
+                    stack.append(larger)
+        return False
+
+    @staticmethod
+    def _comparable(value: Number) -> bool:
+        """NaN is not equal to itself and cannot be placed in the graph"""
+        return value == value
+
+    def record(self, num1: Number, num2: Number, result: int) -> None:
+        """
+        Record the answer to a comparison.
+
+        Args:
+            num1 (Union[int, float]): The first number compared
+            num2 (Union[int, float]): The second number compared
+            result (int): -1 if num1 < num2, 0 if num1 == num2, 1 if num1 > num2
+        """
+        if not (self._comparable(num1) and self._comparable(num2)):
+            return
+        with self._lock:
+            self.recorded += 1
+            root1 = self._find(num1)
+            root2 = self._find(num2)
+            if root1 == root2:
+                return
+            if result == 0:
+                # Merge the equality classes and their ordering edges
+                self._parent[root2] = root1
+                self._larger.setdefault(root1, set()).update(self._larger.pop(root2, ()))
+            elif result < 0:
+                self._larger.setdefault(root1, set()).add(root2)
+            else:
+                self._larger.setdefault(root2, set()).add(root1)
+
+    def infer(self, num1: Number, num2: Number) -> Optional[int]:
+        """
+        Infer the result of a comparison from recorded answers.
+
+        Args:
+            num1 (Union[int, float]): The first number to compare
+            num2 (Union[int, float]): The second number to compare
+
+        Returns:
+            Optional[int]: -1, 0 or 1 as vibecompare would return, or None if
+                           the result cannot be inferred
+        """
+        if not (self._comparable(num1) and self._comparable(num2)):
+            return None
+        with self._lock:
+            if num1 not in self._parent or num2 not in self._parent:
+                return None
+            root1 = self._find(num1)
+            root2 = self._find(num2)
+            if root1 == root2:
+                result = 0
+            elif self._reaches(root1, root2):
+                result = -1
+            elif self._reaches(root2, root1):
+                result = 1
+            else:
+                return None
+            self.calls_avoided += 1
+            return result
+
+    def stats(self) -> dict:
+        """
+        Get counters describing the store.
+
+        Returns:
+            dict: "recorded" answers, "calls_avoided" by inference, and the number of
+                  distinct "values" and equality "classes" in the graph
+        """
+        with self._lock:
+            return {
+                "recorded": self.recorded,
+                "calls_avoided": self.calls_avoided,
+                "values": len(self._parent),
+                "classes": sum(1 for value in self._parent if self._find(value) == value),
+            }
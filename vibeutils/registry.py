@@ -0,0 +1,188 @@
+"""
+Registry of AI provider implementations by name
+"""
+
+import importlib
+import threading
+from typing import NamedTuple, Optional, Union
+
+# Package entry point group scanned for providers that are not registered in code
+ENTRY_POINT_GROUP = "vibeutils.providers"
+
+
+class ProviderSpec(NamedTuple):
+    """
+    Registered AI provider.
+
+    The implementation is an AIProvider subclass, or a "module:attribute"
+    reference to one that is imported when the provider is first used. It is
+    constructed as provider_class(api_key, model); the options a session is
+    configured with (constrained_output, streaming, transport, base_url, ...)
+    are passed as keyword arguments only if __init__ names them or takes **kwargs.
+
+    Attributes:
+        name (str): Name the provider is selected by, e.g. in VIBEUTILS_PROVIDER
+        provider (Union[type, str]): AIProvider subclass or "module:attribute" reference
+        api_key_env (Optional[str]): Environment variable holding the API key; if None,
+                                     the provider is constructed with api_key=None
+        default_model (Optional[str]): Model used when neither the call nor
+                                       VIBEUTILS_<NAME>_MODEL selects one
+    """
+
+    name: str
+    provider: Union[type, str]
+    api_key_env: Optional[str] = None
+    default_model: Optional[str] = None
+
+    @property
+    def model_env(self) -> str:
+        """Environment variable selecting the provider's model"""
+        return f"VIBEUTILS_{self.name.upper().replace('-', '_')}_MODEL"
+
+    def load(self) -> type:
+        """
+        Get the AIProvider implementation, importing it if needed.
+
+        References are resolved on every call, so replacing the referenced
+        attribute (e.g. patching it in tests) takes effect.
+
+        Returns:
+            type: The AIProvider implementation
+        """
+        provider_class = self.provider
+        if isinstance(provider_class, str):
+            module_name, _, attribute = provider_class.partition(":")
+            provider_class = importlib.import_module(module_name)
+            for part in attribute.split(".") if attribute else []:
+                provider_class = getattr(provider_class, part)
+        return provider_class
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _check_provider_class(name: str, provider_class: object) -> None:
+    """Raise if a registered implementation is not an AIProvider subclass"""
+    from .core import AIProvider
+    if not isinstance(provider_class, type) or not issubclass(provider_class, AIProvider):
+        raise ValueError(f"Provider {name} must be an AIProvider subclass, got {provider_class!r}")
+
+
+def register_provider(name: str, provider: Union[type, str], api_key_env: Optional[str] = None,
+                      default_model: Optional[str] = None, replace: bool = False) -> ProviderSpec:
+    """
+    Register an AI provider implementation under a name.
+
+    Registered providers can be selected like the built-in ones, e.g.
+    vibecount(..., provider=name), VibeSession(provider=name) or
+    VIBEUTILS_PROVIDER=name.
+
+    Args:
+        name (str): Name to select the provider by
+        provider (Union[type, str]): AIProvider subclass, or a "module:attribute" reference
+                                     to one, imported on first use
+        api_key_env (Optional[str]): Environment variable holding the API key. If None, no key
+                                     is required and None is passed as the key.
+        default_model (Optional[str]): Model used when neither the call nor VIBEUTILS_<NAME>_MODEL
+                                       selects one
+        replace (bool): Replace a provider already registered under the name (default: False)
+
+    Returns:
+        ProviderSpec: The registered provider
+
+    Raises:
+        ValueError: If the name is empty or taken, or provider is not an AIProvider subclass
+    """
+    if not isinstance(name, str) or not name:
+        raise ValueError("Provider name must be a non-empty string")
+    if not isinstance(provider, str):
+        _check_provider_class(name, provider)
+    spec = ProviderSpec(name, provider, api_key_env, default_model)
+    with _registry_lock:
+        if name in _registry and not replace:
+            raise ValueError(f"Provider already registered: {name}")
+        _registry[name] = spec
+    return spec
+
+
+def unregister_provider(name: str) -> None:
+    """
+    Remove a registered provider.
+
+    Args:
+        name (str): Name of the provider
+
+    Raises:
+        ValueError: If no provider is registered under the name
+    """
+    with _registry_lock:
+        if _registry.pop(name, None) is None:
+            raise ValueError(f"Provider not registered: {name}")
+
+
+def _entry_points() -> list:
+    """Get the provider entry points of the installed packages"""
+    # Imported here: importlib.metadata is a large part of the import time of vibeutils
+    import importlib.metadata
+    entry_points = importlib.metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        return list(entry_points.select(group=ENTRY_POINT_GROUP))
+    # Python < 3.10 returns a dict of groups
+    return list(entry_points.get(ENTRY_POINT_GROUP, []))
+
+
+def _load_entry_point(name: str) -> Optional[ProviderSpec]:
+    """Register the provider an installed package declares under a name, if any"""
+    for entry_point in _entry_points():
+        if entry_point.name != name:
+            continue
+        loaded = entry_point.load()
+        if isinstance(loaded, ProviderSpec):
+            spec = loaded._replace(name=name)
+        else:
+            # Provider classes may declare their key variable and default model as attributes
+            spec = ProviderSpec(name, loaded, getattr(loaded, "API_KEY_ENV", None),
+                                getattr(loaded, "DEFAULT_MODEL", None))
+        _check_provider_class(name, spec.load())
+        with _registry_lock:
+            return _registry.setdefault(name, spec)
+    return None
+
+
+def get_provider_spec(name: str) -> ProviderSpec:
+    """
+    Look up a provider by name.
+
+    Providers registered in code are found first; otherwise the installed
+    packages' "vibeutils.providers" entry points are searched and the match
+    is loaded and registered.
+
+    Args:
+        name (str): Name of the provider
+
+    Returns:
+        ProviderSpec: The registered provider
+
+    Raises:
+        ValueError: If no provider is registered or installed under the name
+    """
+    spec = _registry.get(name)
+    if spec is None and isinstance(name, str):
+        spec = _load_entry_point(name)
+    if spec is None:
+        raise ValueError(f"Unsupported provider: {name}. Available providers: {', '.join(available_providers())}.")
+    return spec
+
+
+def available_providers() -> list:
+    """
+    Get the names of the registered and installed providers.
+
+    Returns:
+        list: Sorted provider names; entry points are listed without being loaded
+    """
+    with _registry_lock:
+        names = set(_registry)
+    names.update(entry_point.name for entry_point in _entry_points())
+    return sorted(names)
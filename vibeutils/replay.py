@@ -0,0 +1,159 @@
+"""
+Record-and-replay provider for deterministic offline runs
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+
+from .core import AIProvider, MAX_TOKENS, TEMPERATURE
+
+# Cassette format version written to the header line
+CASSETTE_VERSION = 1
+
+# Supported provider modes
+RECORD = "record"
+REPLAY = "replay"
+
+
+def _request_key(messages: list, max_tokens: int, temperature: float) -> str:
+    """Build a stable hash identifying a completion request"""
+    payload = json.dumps(
+        {"messages": messages, "max_tokens": max_tokens, "temperature": temperature},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _open_cassette(path: str, mode: str):
+    """Open a cassette file, transparently gzip-compressed when it ends with .gz"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class ReplayProvider(AIProvider):
+    """
+    AI provider that records completions to a cassette file or replays them.
+
+    In record mode every request is forwarded to the wrapped provider and the
+    response, or the error it raised, is appended to the cassette together with
+    the observed latency. In replay mode responses are served from the cassette
+    without any network access; identical requests are answered in the order
+    they were recorded, repeating the last answer once exhausted.
+
+    The cassette is a JSON Lines file (gzip-compressed if the path ends with
+    ".gz") holding a header line followed by one interaction per line. Requests
+    are stored as a SHA-256 digest of the messages and sampling parameters,
+    which keeps cassettes small and free of the prompt text.
+    """
+
+    def __init__(self, cassette_path: str, mode: str = REPLAY, provider: Optional[AIProvider] = None,
+                 speed: Optional[float] = None):
+        """
+        Args:
+            cassette_path (str): Path of the cassette file to record to or replay from
+            mode (str): "record" to call the wrapped provider and record its responses,
+                        or "replay" to serve responses from the cassette (default: "replay")
+            provider (Optional[AIProvider]): Provider to forward requests to in record mode
+            speed (Optional[float]): In replay mode, reproduce recorded latencies divided by
+                                     this factor (1.0 for original timing, 2.0 for twice as
+                                     fast). If None, responses are returned immediately.
+
+        Raises:
+            ValueError: If the mode or speed is invalid, or record mode has no provider
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unsupported replay mode: {mode}. Use '{RECORD}' or '{REPLAY}'.")
+        if mode == RECORD and provider is None:
+            raise ValueError("A provider is required to record a cassette")
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be a positive number")
+
+        self.cassette_path = cassette_path
+        self.mode = mode
+        self.provider = provider
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._interactions = defaultdict(list)
+        self._positions = defaultdict(int)
+        self._file = None
+
+        if mode == REPLAY:
+            self._load()
+        else:
+            self._file = _open_cassette(cassette_path, "w")
+            self._write({"version": CASSETTE_VERSION})
+
+    def _load(self) -> None:
+        """Read all interactions from the cassette file"""
+        with _open_cassette(self.cassette_path, "r") as cassette:
+            header = json.loads(cassette.readline() or "{}")
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version: {header.get('version')}")
+            for line in cassette:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self._interactions[interaction["key"]].append(interaction)
+
+    def _write(self, record: dict) -> None:
+        """Append one JSON record to the cassette"""
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def create_completion(self, messages: list, max_tokens: int = MAX_TOKENS, temperature: float = TEMPERATURE) -> str:
+        """Create a completion by recording the wrapped provider or replaying the cassette"""
+        key = _request_key(messages, max_tokens, temperature)
+        if self.mode == RECORD:
+            return self._record(key, messages, max_tokens, temperature)
+        return self._replay(key)
+
+    def _record(self, key: str, messages: list, max_tokens: int, temperature: float) -> str:
+        """Forward a request to the wrapped provider and record the outcome"""
+        start = time.perf_counter()
+        try:
+            response = self.provider.create_completion(messages, max_tokens=max_tokens, temperature=temperature)
+        except Exception as e:
+            record = {"key": key, "latency": round(time.perf_counter() - start, 6), "error": str(e)}
+            with self._lock:
+                self._write(record)
+            raise
+        record = {"key": key, "latency": round(time.perf_counter() - start, 6), "response": response}
+        with self._lock:
+            self._write(record)
+        return response
+
+    def _replay(self, key: str) -> str:
+        """Serve a recorded outcome for the request"""
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                raise Exception(f"No recorded response for request {key[:12]} in cassette {self.cassette_path}")
+            position = self._positions[key]
+            interaction = recorded[min(position, len(recorded) - 1)]
+            self._positions[key] = position + 1
+
+        if self.speed is not None:
+            time.sleep(interaction["latency"] / self.speed)
+
+        if "error" in interaction:
+            raise Exception(interaction["error"])
+        return interaction["response"]
+
+    def close(self) -> None:
+        """Flush and close the cassette file when recording"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
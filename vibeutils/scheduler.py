@@ -0,0 +1,183 @@
+"""
+Priority scheduling of provider requests sharing one quota
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, Literal, Optional
+
+from .core import AIProvider, MAX_TOKENS, TEMPERATURE, OutputConstraint, _current_request_timeout
+
+# Priority classes, most urgent first
+INTERACTIVE = "interactive"
+DEFAULT = "default"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, DEFAULT, BULK)
+
+Priority = Literal["interactive", "default", "bulk"]
+
+# Default number of requests in flight across all priorities
+DEFAULT_CAPACITY = 16
+
+
+def _rank(priority: str) -> int:
+    """Get the rank of a priority class, 0 being the most urgent"""
+    try:
+        return PRIORITIES.index(priority)
+    except ValueError:
+        raise ValueError(f"Unknown priority: {priority!r}. Expected one of {', '.join(PRIORITIES)}")
+
+
+class PriorityScheduler:
+    """
+    Admission of provider requests by priority class.
+
+    At most capacity requests are in flight at once. Waiting requests are
+    admitted strictly by priority (interactive, then default, then bulk) and
+    in arrival order within a class, so a latency-sensitive request jumps
+    ahead of any queued bulk work. Requests already in flight are never
+    interrupted.
+
+    Capacity can be reserved for a class: a request may only start while
+    enough slots stay free for the reservations of more urgent classes. With
+    capacity=16 and reserved={"interactive": 4}, default and bulk requests
+    together use at most 12 slots, so interactive requests find a free slot
+    immediately even while a backfill saturates the rest.
+
+    Instances are thread-safe and can be shared by several sessions, e.g. an
+    interactive session and a bulk session drawing on the same quota.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, reserved: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            capacity (int): Number of requests allowed in flight across all priorities (default: 16)
+            reserved (Optional[Dict[str, int]]): Slots only usable by a priority class and the
+                                                 classes more urgent than it, e.g. {"interactive": 4}
+
+        Raises:
+            ValueError: If capacity or the reservations are out of range
+        """
+        if isinstance(capacity, bool) or not isinstance(capacity, int) or capacity < 1:
+            raise ValueError("capacity must be a positive integer")
+        reserved = dict(reserved or {})
+        for priority, slots in reserved.items():
+            if _rank(priority) == PRIORITIES.index(BULK):
+                raise ValueError("Capacity can only be reserved for interactive and default requests")
+            if isinstance(slots, bool) or not isinstance(slots, int) or slots < 0:
+                raise ValueError("Reserved slots must be non-negative integers")
+        if sum(reserved.values()) >= capacity:
+            raise ValueError("Reservations must leave at least one slot for bulk requests")
+        self.capacity = capacity
+        self.reserved = reserved
+        self._limits = tuple(
+            capacity - sum(reserved.get(other, 0) for other in PRIORITIES[:rank])
+            for rank in range(len(PRIORITIES))
+        )
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self.admitted = dict.fromkeys(PRIORITIES, 0)
+
+    def acquire(self, priority: Priority = DEFAULT, timeout: Optional[float] = None) -> None:
+        """
+        Wait for a request slot available to a priority class.
+
+        Args:
+            priority (Priority): Priority class of the request (default: "default")
+            timeout (Optional[float]): Seconds to wait, or None to wait as long as needed
+
+        Raises:
+            ValueError: If the priority class is unknown
+            TimeoutError: If no slot frees up within timeout
+        """
+        rank = _rank(priority)
+        give_up = time.monotonic() + timeout if timeout is not None else None
+        entry = (rank, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while self._waiting[0] != entry or self._in_flight >= self._limits[rank]:
+                    wait = None
+                    if give_up is not None:
+                        wait = give_up - time.monotonic()
+                        if wait <= 0:
+                            raise TimeoutError("Timed out waiting for a request slot")
+                    self._condition.wait(wait)
+            except BaseException:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+                raise
+            heapq.heappop(self._waiting)
+            self._in_flight += 1
+            self.admitted[priority] += 1
+            self._condition.notify_all()
+
+    def release(self) -> None:
+        """Free a request slot"""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        """
+        Get metrics describing the scheduler.
+
+        Returns:
+            dict: Requests "in_flight", and per priority class the requests "waiting"
+                  and the requests "admitted" so far
+        """
+        with self._condition:
+            waiting = dict.fromkeys(PRIORITIES, 0)
+            for rank, _ in self._waiting:
+                waiting[PRIORITIES[rank]] += 1
+            return {
+                "in_flight": self._in_flight,
+                "waiting": waiting,
+                "admitted": dict(self.admitted),
+            }
+
+
+class _ScheduledProvider(AIProvider):
+    """Provider sending its requests through a PriorityScheduler in one priority class"""
+
+    def __init__(self, provider: AIProvider, scheduler: PriorityScheduler, priority: Priority):
+        self.provider = provider
+        self.scheduler = scheduler
+        self.priority = priority
+        self.model = getattr(provider, "model", None) or type(provider).__name__
+        self.constrained_output = getattr(provider, "constrained_output", False) is True
+        self.streaming = getattr(provider, "streaming", False) is True
+
+    def _scheduled(self, function, *args, **kwargs) -> str:
+        """Run a provider request once admitted, waiting no longer than the request's timeout"""
+        self.scheduler.acquire(self.priority, _current_request_timeout())
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.scheduler.release()
+
+    def create_completion(self, messages: list, max_tokens: int = MAX_TOKENS, temperature: float = TEMPERATURE) -> str:
+        """Create a completion once the scheduler admits the request"""
+        return self._scheduled(self.provider.create_completion, messages, max_tokens=max_tokens,
+                               temperature=temperature)
+
+    def create_constrained_completion(self, messages: list, constraint: OutputConstraint,
+                                      max_tokens: int = MAX_TOKENS, temperature: float = TEMPERATURE) -> str:
+        """Create a constrained completion once the scheduler admits the request"""
+        return self._scheduled(self.provider.create_constrained_completion, messages, constraint,
+                               max_tokens=max_tokens, temperature=temperature)
+
+    def create_streaming_completion(self, messages: list, constraint: OutputConstraint,
+                                    max_tokens: int = MAX_TOKENS, temperature: float = TEMPERATURE) -> str:
+        """Create a streaming completion once the scheduler admits the request"""
+        return self._scheduled(self.provider.create_streaming_completion, messages, constraint,
+                               max_tokens=max_tokens, temperature=temperature)
+
+    def close(self) -> None:
+        """Close the wrapped provider"""
+        self.provider.close()
@@ -0,0 +1,380 @@
+"""
+Sessions that resolve configuration once and own shared state for vibe calls
+"""
+
+import atexit
+import inspect
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional, Union
+
+from . import arrays, core, sorting
+from .cache import ResultCache, SQLiteCache
+from .core import AIProvider, Provider, _provider_class, _resolve_provider_config
+from .ledger import CostLedger
+from .limiter import AdaptiveLimiter, _LimitedProvider
+from .ordering import ComparisonKnowledge
+from .scheduler import DEFAULT, Priority, PriorityScheduler, _rank, _ScheduledProvider
+from .singleflight import SingleFlight
+from .store import MappedStore
+from .tables import AnswerTable
+from .transport import SharedTransport
+from .trust import DEFAULT_TRUST_POLICY, TrustPolicy
+
+
+def _accepted_options(provider_class: type, options: dict) -> dict:
+    """
+    Keep the session options a provider class accepts.
+
+    Providers only need to take (api_key, model); options such as streaming
+    or transport are passed to those whose __init__ names them or takes **kwargs.
+    """
+    try:
+        parameters = inspect.signature(provider_class).parameters.values()
+    except (TypeError, ValueError):
+        return options
+    if any(parameter.kind is inspect.Parameter.VAR_KEYWORD for parameter in parameters):
+        return options
+    names = {parameter.name for parameter in parameters}
+    return {name: value for name, value in options.items() if name in names}
+
+class VibeSession:
+    """
+    Resolved configuration and shared state for vibe calls.
+
+    A session resolves the provider, API key and model once when it is created
+    and keeps a pool of provider clients so repeated calls reuse their HTTP
+    connections. It also owns the thread pool used for concurrent work and the
+    optional result cache and comparison knowledge shared by its calls. Use it
+    as a context manager, or call close(), to release connections and threads.
+
+    Identical concurrent calls (after canonicalization) share one pipeline
+    execution through the session's in-flight registry, session.inflight; set
+    it to None to disable coalescing.
+
+    The module-level functions (vibecount, vibecompare, ...) run in a default
+    session unless a session is passed explicitly.
+    """
+
+    def __init__(self, provider: Optional[Union[Provider, AIProvider]] = None, model: Optional[str] = None,
+                 max_workers: Optional[int] = None, knowledge: Optional[ComparisonKnowledge] = None,
+                 cache: Optional[Union[ResultCache, SQLiteCache]] = None, constrained_output: bool = False,
+                 transport: Optional[SharedTransport] = None, limiter: Optional[AdaptiveLimiter] = None,
+                 scheduler: Optional[PriorityScheduler] = None, priority: Priority = DEFAULT,
+                 answers: Optional[Union[AnswerTable, MappedStore]] = None,
+                 trust_policy: TrustPolicy = DEFAULT_TRUST_POLICY, base_url: Optional[str] = None,
+                 organization: Optional[str] = None, default_headers: Optional[dict] = None,
+                 streaming: bool = False, ledger: Optional[CostLedger] = None):
+        """
+        Args:
+            provider (Optional[Union[Provider, AIProvider]]): AI provider to use ("openai", "anthropic" or a registered name),
+                                                              or an AIProvider instance. If None, uses
+                                                              VIBEUTILS_PROVIDER environment variable,
+                                                              defaulting to "openai" if not set.
+            model (Optional[str]): The model to use for the provider. If None, uses environment
+                                   variables VIBEUTILS_OPENAI_MODEL or VIBEUTILS_ANTHROPIC_MODEL,
+                                   defaulting to built-in constants if not set.
+            max_workers (Optional[int]): Maximum number of threads for concurrent work.
+                                         If None, uses the ThreadPoolExecutor default.
+            knowledge (Optional[ComparisonKnowledge]): Store of answered comparisons shared by
+                                                       vibecompare calls in this session, used to
+                                                       infer results by transitivity.
+            cache (Optional[Union[ResultCache, SQLiteCache]]): Cache of call results shared by calls in
+                                                               this session. Equivalent calls (see
+                                                               vibeutils.canonical) share entries.
+            constrained_output (bool): Restrict each pipeline stage to its expected answers with
+                                       tight token budgets, e.g. the injection check can only
+                                       answer SAFE or INJECTION (default: False). Applies to the
+                                       providers created by the session.
+            transport (Optional[SharedTransport]): HTTP connection pool used by the providers created
+                                                   by the session. It is not closed with the session,
+                                                   so it can be shared by several sessions.
+            limiter (Optional[AdaptiveLimiter]): Adaptive limit on the provider requests in flight,
+                                                 applied to every request made in the session.
+                                                 It can be shared by sessions using one quota.
+            scheduler (Optional[PriorityScheduler]): Admits the session's provider requests by priority
+                                                     class. Share it between sessions of different
+                                                     priorities drawing on one quota.
+            priority (Priority): Priority class of the session's requests in the scheduler:
+                                 "interactive", "default" or "bulk" (default: "default")
+            answers (Optional[Union[AnswerTable, MappedStore]]): Precomputed results served without
+                                                                any provider request to calls found
+                                                                in the table or store.
+            trust_policy (TrustPolicy): Argument types and shapes sent without a prompt injection
+                                        check, e.g. finite numbers (default: DEFAULT_TRUST_POLICY).
+                                        Use STRICT_TRUST_POLICY to check every argument.
+            base_url (Optional[str]): API base URL of the session's provider, e.g. an
+                                      OpenAI-compatible server. If None, uses
+                                      VIBEUTILS_OPENAI_BASE_URL or VIBEUTILS_ANTHROPIC_BASE_URL.
+            organization (Optional[str]): OpenAI organization ID. If None, uses
+                                          VIBEUTILS_OPENAI_ORGANIZATION.
+            default_headers (Optional[dict]): Headers sent with every request of the session's
+                                              provider. If None, uses VIBEUTILS_OPENAI_DEFAULT_HEADERS
+                                              or VIBEUTILS_ANTHROPIC_DEFAULT_HEADERS.
+            streaming (bool): Stream the stages with a fixed set of answers (injection check,
+                              validation, comparison) and return as soon as the answer is
+                              decided, closing the stream (default: False). Applies to the
+                              providers created by the session.
+            ledger (Optional[CostLedger]): Records the tokens and cost of the session's calls by
+                                           function and stage, and enforces its budgets. Share it
+                                           between the sessions of a job to give them one budget.
+
+        Raises:
+            ValueError: If API key is not set, provider is invalid, priority is unknown or an
+                        organization is given for another provider than OpenAI
+        """
+        _rank(priority)
+        self._init_state(max_workers)
+        self.knowledge = knowledge
+        self.cache = cache
+        self.answers = answers
+        self.trust_policy = trust_policy
+        self.ledger = ledger
+        self._constrained_output = constrained_output
+        self._streaming = streaming
+        self._transport = transport
+        self.limiter = limiter
+        self.scheduler = scheduler
+        self.priority = priority
+        if isinstance(provider, AIProvider):
+            self._instance = self._gated(provider)
+        else:
+            self._config = _resolve_provider_config(provider, model)
+            self._client_options = {name: value for name, value in (
+                ("base_url", base_url), ("organization", organization), ("default_headers", default_headers),
+            ) if value is not None}
+            if organization is not None and self._config[0] != "openai":
+                raise ValueError("organization is only supported by the openai provider")
+
+    def _init_state(self, max_workers: Optional[int]) -> None:
+        """Initialize the shared state owned by the session"""
+        self._config = None
+        self._instance = None
+        self._providers = {}
+        self._max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._constrained_output = False
+        self._streaming = False
+        self._transport = None
+        self._client_options = {}
+        self.limiter = None
+        self.scheduler = None
+        self.priority = DEFAULT
+        self.knowledge = None
+        self.cache = None
+        self.answers = None
+        self.trust_policy = DEFAULT_TRUST_POLICY
+        self.ledger = None
+        self.inflight = SingleFlight()
+
+    def _default_config(self) -> tuple:
+        """Get the (provider, api_key, model) configuration used when a call does not override it"""
+        return self._config
+
+    def _provider_options(self, provider_name: str) -> dict:
+        """Get the keyword arguments for providers created by the session; only configured options are passed"""
+        options = {}
+        # Client options configure the session's own provider, not per-call overrides to another one
+        if self._config is not None and provider_name == self._config[0]:
+            options.update(self._client_options)
+        if self._constrained_output:
+            options["constrained_output"] = True
+        if self._streaming:
+            options["streaming"] = True
+        if self._transport is not None:
+            options["transport"] = self._transport
+        return options
+
+    def _gated(self, instance: AIProvider) -> AIProvider:
+        """Route a provider's requests through the session scheduler and limiter, if any"""
+        if self.limiter is not None:
+            instance = _LimitedProvider(instance, self.limiter)
+        if self.scheduler is not None:
+            instance = _ScheduledProvider(instance, self.scheduler, self.priority)
+        return instance
+
+    def _check_open(self) -> None:
+        """Raise if the session has been closed"""
+        if self._closed:
+            raise RuntimeError("VibeSession is closed")
+
+    def get_provider(self, provider: Optional[Union[Provider, AIProvider]] = None,
+                     model: Optional[str] = None) -> AIProvider:
+        """
+        Get a pooled AI provider instance for a call.
+
+        Args:
+            provider: Overrides the session provider for this call, or an AIProvider instance
+                      which is returned as-is
+            model: Overrides the session model for this call
+
+        Returns:
+            AIProvider instance
+
+        Raises:
+            ValueError: If API key is not set or provider is invalid
+            ImportError: If required package is not installed
+            RuntimeError: If the session is closed
+        """
+        if isinstance(provider, AIProvider):
+            return self._gated(provider)
+        self._check_open()
+
+        if provider is None and model is None:
+            if self._instance is not None:
+                return self._instance
+            config = self._default_config()
+        else:
+            if provider is None and self._config is not None:
+                provider = self._config[0]
+            config = _resolve_provider_config(provider, model)
+
+        provider_name, api_key, model = config
+        provider_class = _provider_class(provider_name)
+        key = (provider_class, provider_name, api_key, model)
+        with self._lock:
+            instance = self._providers.get(key)
+            if instance is None:
+                options = _accepted_options(provider_class, self._provider_options(provider_name))
+                instance = self._gated(provider_class(api_key, model, **options))
+                self._providers[key] = instance
+        return instance
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Thread pool for concurrent vibe calls, created on first use"""
+        with self._lock:
+            self._check_open()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="vibeutils")
+            return self._executor
+
+    def map(self, function: Callable, *iterables: Iterable) -> list:
+        """
+        Run a function over the given inputs concurrently on the session thread pool.
+
+        Args:
+            function (Callable): Function to call, e.g. session.vibelength
+            *iterables (Iterable): Argument iterables, as for the built-in map()
+
+        Returns:
+            list: Results in input order
+        """
+        return list(self.executor.map(function, *iterables))
+
+    def vibecount(self, text: str, target_letter: str, case_sensitive: bool = True,
+                  provider: Optional[Union[Provider, AIProvider]] = None, model: Optional[str] = None,
+                  timeout: Optional[float] = None) -> int:
+        """Count the frequency of a specific letter in a string; see vibeutils.vibecount"""
+        return core.vibecount(text, target_letter, case_sensitive, provider, model, session=self, timeout=timeout)
+
+    def vibecount_all(self, text: str, characters: Optional[Iterable[str]] = None, case_sensitive: bool = True,
+                      provider: Optional[Union[Provider, AIProvider]] = None, model: Optional[str] = None,
+                      timeout: Optional[float] = None) -> Counter:
+        """Count several characters with a single completion; see vibeutils.vibecount_all"""
+        return core.vibecount_all(text, characters, case_sensitive, provider, model, session=self, timeout=timeout)
+
+    def vibecompare(self, num1: Union[int, float], num2: Union[int, float],
+                    provider: Optional[Union[Provider, AIProvider]] = None, model: Optional[str] = None,
+                    timeout: Optional[float] = None) -> int:
+        """Compare two numbers; see vibeutils.vibecompare"""
+        return core.vibecompare(num1, num2, provider, model, session=self, timeout=timeout)
+
+    def vibecompare_array(self, a, b, provider: Optional[Union[Provider, AIProvider]] = None,
+                          model: Optional[str] = None, batch_size: int = arrays.COMPARE_BATCH_SIZE,
+                          timeout: Optional[float] = None):
+        """Compare two arrays of numbers element-wise; see vibeutils.vibecompare_array"""
+        return arrays.vibecompare_array(a, b, provider, model, session=self, batch_size=batch_size, timeout=timeout)
+
+    def vibesort(self, items: Iterable, key: Optional[Callable] = None, reverse: bool = False,
+                 provider: Optional[Union[Provider, AIProvider]] = None, model: Optional[str] = None,
+                 timeout: Optional[float] = None) -> list:
+        """Sort numbers with a minimal number of comparisons; see vibeutils.vibesort"""
+        return sorting.vibesort(items, key, reverse, provider, model, session=self, timeout=timeout)
+
+    def vibeeval(self, expression: str, provider: Optional[Union[Provider, AIProvider]] = None,
+                 model: Optional[str] = None, local: bool = False, timeout: Optional[float] = None) -> float:
+        """Evaluate a mathematical expression; see vibeutils.vibeeval"""
+        return core.vibeeval(expression, provider, model, session=self, local=local, timeout=timeout)
+
+    def vibelength(self, text: str, provider: Optional[Union[Provider, AIProvider]] = None,
+                   model: Optional[str] = None, timeout: Optional[float] = None) -> int:
+        """Get the length of a string; see vibeutils.vibelength"""
+        return core.vibelength(text, provider, model, session=self, timeout=timeout)
+
+    def close(self) -> None:
+        """Shut down the thread pool and close pooled provider connections"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            executor, self._executor = self._executor, None
+            providers, self._providers = list(self._providers.values()), {}
+
+        if executor is not None:
+            executor.shutdown(wait=True)
+        for instance in providers:
+            instance.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _DefaultSession(VibeSession):
+    """
+    Session used by the module-level functions.
+
+    The environment is read on each call so changes to VIBEUTILS_PROVIDER, API
+    keys and model variables keep taking effect, while provider clients are
+    still pooled per resolved configuration.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self._init_state(max_workers)
+
+    def _default_config(self) -> tuple:
+        return _resolve_provider_config()
+
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+def get_default_session() -> VibeSession:
+    """Get the session used by the module-level functions, creating it on first use"""
+    global _default_session
+    session = _default_session
+    if session is None:
+        with _default_session_lock:
+            if _default_session is None:
+                _default_session = _DefaultSession()
+            session = _default_session
+    return session
+
+
+def set_default_session(session: Optional[VibeSession]) -> None:
+    """
+    Replace the session used by the module-level functions.
+
+    Args:
+        session (Optional[VibeSession]): The new default session, or None to
+                                         go back to an environment-driven session
+    """
+    global _default_session
+    with _default_session_lock:
+        _default_session = session
+
+
+def _close_default_session() -> None:
+    """Close the default session at interpreter shutdown"""
+    if _default_session is not None:
+        _default_session.close()
+
+
+atexit.register(_close_default_session)
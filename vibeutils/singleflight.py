@@ -0,0 +1,78 @@
+"""
+Coalescing of identical concurrent vibe calls
+"""
+
+import threading
+from typing import Callable, Hashable, Optional
+
+
+class _Flight:
+    """A pipeline execution that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Thread-safe registry of in-flight calls, keyed by canonical call.
+
+    The first caller for a key runs the function; callers arriving with the
+    same key while it runs wait for it and receive its result, or its
+    exception. Once the execution finishes the key is released, so later
+    calls run again (or are served by a cache in front of the registry).
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: Hashable, function: Callable[[], object], timeout: Optional[float] = None) -> object:
+        """
+        Run a function once for all concurrent callers with the same key.
+
+        Args:
+            key (Hashable): Key identifying the call
+            function (Callable[[], object]): Runs the call and returns its result
+            timeout (Optional[float]): Seconds to wait for an execution started by another
+                                       caller, or None to wait until it finishes
+
+        Returns:
+            object: The result of the shared execution
+
+        Raises:
+            TimeoutError: If the wait for another caller's execution times out
+            Exception: Whatever the shared execution raised
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not flight.done.wait(timeout):
+                raise TimeoutError("Timed out waiting for an identical call in flight")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = function()
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._flights)
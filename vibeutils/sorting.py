@@ -0,0 +1,171 @@
+"""
+Comparison-minimizing sorting with vibecompare
+"""
+
+from typing import Callable, Iterable, Optional, Union, TYPE_CHECKING
+
+from .core import AIProvider, Provider, vibecompare, _Deadline, _resolve_session, _validate_timeout
+
+if TYPE_CHECKING:
+    from .session import VibeSession
+
+
+class _CachedComparator:
+    """
+    Compare values with vibecompare, caching every answered pair.
+
+    Pairs are cached in both orientations, so each unordered pair of values is
+    asked at most once per sort.
+    """
+
+    def __init__(self, session: "VibeSession", provider: Optional[Union[Provider, AIProvider]], model: Optional[str],
+                 deadline: Optional[_Deadline] = None):
+        self.session = session
+        self.provider = provider
+        self.model = model
+        self.deadline = deadline
+        self.cache = {}
+        self.calls = 0
+
+    def _ask(self, pair: tuple) -> int:
+        """Ask vibecompare for one pair, within the time left for the sort"""
+        if self.deadline is None:
+            return vibecompare(pair[0], pair[1], self.provider, self.model, session=self.session)
+        self.deadline.check()
+        return vibecompare(pair[0], pair[1], self.provider, self.model, session=self.session,
+                           timeout=self.deadline.remaining())
+
+    def _store(self, pair: tuple, result: int) -> None:
+        """Cache a result and its mirrored pair"""
+        self.cache[pair] = result
+        self.cache[(pair[1], pair[0])] = -result
+
+    def compare(self, value1, value2) -> int:
+        """Compare two values, asking vibecompare only for unseen pairs"""
+        pair = (value1, value2)
+        if pair not in self.cache:
+            self.calls += 1
+            self._store(pair, self._ask(pair))
+        return self.cache[pair]
+
+    def compare_many(self, pairs: list) -> list:
+        """Compare independent pairs, issuing all unseen ones concurrently"""
+        pending = []
+        for pair in pairs:
+            if pair not in self.cache and pair not in pending and (pair[1], pair[0]) not in pending:
+                pending.append(pair)
+
+        if len(pending) == 1:
+            self.compare(*pending[0])
+        elif pending:
+            self.calls += len(pending)
+            for pair, result in zip(pending, self.session.map(self._ask, pending)):
+                self._store(pair, result)
+        return [self.cache[pair] for pair in pairs]
+
+
+def _jacobsthal_order(count: int) -> list:
+    """
+    Order in which merge-insertion inserts pending elements.
+
+    Pending elements are numbered 1..count, with element 1 already placed. Groups
+    end at the Jacobsthal numbers 3, 5, 11, 21, ... and are inserted from the
+    highest index down, which keeps every binary search within 2^k - 1 elements.
+    """
+    order = []
+    previous, current = 1, 3
+    while previous < count:
+        order.extend(range(min(current, count), previous, -1))
+        previous, current = current, current + 2 * previous
+    return order
+
+
+def _merge_insertion(indices: list, keys: list, comparator: _CachedComparator) -> list:
+    """Sort item indices by their keys using the Ford-Johnson merge-insertion algorithm"""
+    if len(indices) <= 1:
+        return list(indices)
+
+    # Pair up elements and compare every pair in one concurrent round
+    pairs = [(indices[i], indices[i + 1]) for i in range(0, len(indices) - 1, 2)]
+    straggler = indices[-1] if len(indices) % 2 else None
+    results = comparator.compare_many([(keys[first], keys[second]) for first, second in pairs])
+
+    partner = {}
+    for (first, second), result in zip(pairs, results):
+        larger, smaller = (first, second) if result > 0 else (second, first)
+        partner[larger] = smaller
+
+    # Recursively sort the larger elements, then insert the smaller ones
+    chain = _merge_insertion(list(partner), keys, comparator)
+    pending = [partner[larger] for larger in chain]
+    bounds = list(chain)
+    if straggler is not None:
+        pending.append(straggler)
+        bounds.append(None)
+
+    chain.insert(0, pending[0])
+    for number in _jacobsthal_order(len(pending)):
+        element = pending[number - 1]
+        bound = bounds[number - 1]
+        low, high = 0, len(chain) if bound is None else chain.index(bound)
+        while low < high:
+            middle = (low + high) // 2
+            if comparator.compare(keys[element], keys[chain[middle]]) < 0:
+                high = middle
+            else:
+                low = middle + 1
+        chain.insert(low, element)
+    return chain
+
+
+def vibesort(items: Iterable, key: Optional[Callable] = None, reverse: bool = False,
+             provider: Optional[Union[Provider, AIProvider]] = None, model: Optional[str] = None,
+             session: Optional["VibeSession"] = None, timeout: Optional[float] = None) -> list:
+    """
+    Sort numbers using AI API comparisons.
+
+    Uses merge-insertion (Ford-Johnson) sorting, which needs close to the
+    information-theoretic minimum of log2(n!) comparisons. The independent
+    comparisons of each pairing round are issued concurrently on the session
+    thread pool, and every answered pair is cached so no pair is asked twice.
+    The sort is not stable.
+
+    Args:
+        items (Iterable): The items to sort
+        key (Optional[Callable]): Function extracting the number to compare from each item.
+                                  If None, items are compared directly.
+        reverse (bool): Sort in descending order (default: False)
+        provider (Optional[Union[Provider, AIProvider]]): AI provider to use ("openai", "anthropic" or a registered name),
+                                      or an AIProvider instance to use directly. If None, uses
+                                      VIBEUTILS_PROVIDER environment variable, defaulting to "openai" if not set.
+        model (Optional[str]): The model to use for the provider. If None, uses environment
+                              variables VIBEUTILS_OPENAI_MODEL or VIBEUTILS_ANTHROPIC_MODEL,
+                              defaulting to built-in constants if not set.
+        session (Optional[VibeSession]): Session providing pooled clients, the thread pool and
+                                         shared state. If None, uses the default session.
+        timeout (Optional[float]): Seconds the whole sort may take; each comparison gets the
+                                   time left. If None, only the SDK's own request timeouts apply.
+
+    Returns:
+        list: A new sorted list
+
+    Raises:
+        ValueError: If API key is not set, keys are not numbers,
+                   or input contains prompt injection
+        VibeTimeoutError: If the sort does not finish within timeout
+        Exception: If AI API call fails or response validation fails
+    """
+    items = list(items)
+    keys = [key(item) for item in items] if key is not None else items
+
+    # Validate inputs before making any API call
+    if not all(isinstance(value, (int, float)) for value in keys):
+        raise ValueError("All items (or their keys) must be numbers (int or float)")
+    _validate_timeout(timeout)
+
+    deadline = _Deadline(timeout, requests=0) if timeout is not None else None
+    comparator = _CachedComparator(_resolve_session(session), provider, model, deadline)
+    order = _merge_insertion(list(range(len(items))), keys, comparator)
+    if reverse:
+        order.reverse()
+    return [items[index] for index in order]
@@ -0,0 +1,259 @@
+"""
+Memory-mapped read-only result store shared across worker processes
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from typing import Hashable, Iterable, Iterator, Optional, Tuple
+
+# File signature and version of the store format
+STORE_MAGIC = b"VIBESTO1"
+
+# Header: signature and number of entries
+_HEADER = struct.Struct("<8sQ")
+
+# Index entry: key hash, record offset, key length and value type, sorted by hash
+_INDEX_ENTRY = struct.Struct("<QQIc3x")
+
+# Packed values by type tag
+_INT_VALUE = struct.Struct("<q")
+_FLOAT_VALUE = struct.Struct("<d")
+_INT_TAG = b"i"
+_FLOAT_TAG = b"d"
+
+
+def _encode_key(key: tuple) -> bytes:
+    """Encode a call key as compact JSON"""
+    return json.dumps(list(key), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _hash_key(encoded_key: bytes) -> int:
+    """Hash an encoded key to 64 bits, identically in every process"""
+    return int.from_bytes(hashlib.blake2b(encoded_key, digest_size=8).digest(), "little")
+
+
+def _pack_value(value: object) -> Optional[Tuple[bytes, bytes]]:
+    """Pack a numeric result as (type tag, bytes), or None if it cannot be stored"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        try:
+            return _INT_TAG, _INT_VALUE.pack(value)
+        except struct.error:
+            return None
+    if isinstance(value, float):
+        return _FLOAT_TAG, _FLOAT_VALUE.pack(value)
+    return None
+
+
+def build_store(path: str, entries: Iterable[Tuple[tuple, object]]) -> int:
+    """
+    Write a result store file.
+
+    The file is written next to its destination and moved into place, so
+    processes opening the path never see a partial store.
+
+    Args:
+        path (str): Destination path
+        entries (Iterable[Tuple[tuple, object]]): (key, result) pairs; results must be
+                                                  ints (64-bit) or floats
+
+    Returns:
+        int: Number of entries written
+
+    Raises:
+        ValueError: If a result is not a storable number
+    """
+    records = {}
+    for key, value in entries:
+        packed = _pack_value(value)
+        if packed is None:
+            raise ValueError(f"Only int and float results can be stored, got {type(value).__name__}")
+        encoded_key = _encode_key(key)
+        records[encoded_key] = packed
+
+    index = []
+    offset = _HEADER.size + _INDEX_ENTRY.size * len(records)
+    for encoded_key, (tag, packed_value) in records.items():
+        index.append((_hash_key(encoded_key), offset, encoded_key, tag, packed_value))
+        offset += len(encoded_key) + len(packed_value)
+    index.sort(key=lambda entry: entry[0])
+
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_path, "wb") as store_file:
+            store_file.write(_HEADER.pack(STORE_MAGIC, len(index)))
+            for key_hash, record_offset, encoded_key, tag, _ in index:
+                store_file.write(_INDEX_ENTRY.pack(key_hash, record_offset, len(encoded_key), tag))
+            for _, _, encoded_key, _, packed_value in sorted(index, key=lambda entry: entry[1]):
+                store_file.write(encoded_key)
+                store_file.write(packed_value)
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    return len(index)
+
+
+def compact_cache(source, path: str, model: Optional[str] = None) -> int:
+    """
+    Compact the results of a cache into a result store keyed by canonical call.
+
+    Cache keys start with the model that answered the call; only the given
+    model's entries are kept, and the model is dropped from the key so the
+    store can be used as a session's answers. Results that are not numbers
+    (e.g. vibecount_all counters) are skipped.
+
+    Args:
+        source: Cache to compact, e.g. a ResultCache; anything with an items() method
+                returning (key, result) pairs
+        path (str): Destination path of the store
+        model (Optional[str]): Model whose results to keep. If None, the cache must only
+                               hold results of one model.
+
+    Returns:
+        int: Number of entries written
+
+    Raises:
+        ValueError: If model is None and the cache holds results of several models,
+                    or the cache only stores digests of its keys
+    """
+    if getattr(source, "hash_keys", False):
+        raise ValueError("Caches storing key digests (hash_keys=True) cannot be compacted into a store")
+    items = list(source.items())
+    models = {key[0] for key, _ in items}
+    if model is None:
+        if len(models) > 1:
+            raise ValueError(f"Cache holds results of several models ({', '.join(sorted(map(str, models)))}); pass model")
+        model = next(iter(models), None)
+    return build_store(path, (
+        (key[1:], value) for key, value in items
+        if key[0] == model and _pack_value(value) is not None
+    ))
+
+
+class MappedStore:
+    """
+    Immutable result store read through a memory map.
+
+    The file holds a header, an index of (key hash, offset) entries sorted
+    by hash and the packed records. Opening a store only maps the file, so it
+    is near-instant whatever its size, and lookups binary-search the index
+    in place. Processes mapping the same file share its pages through the
+    operating system's page cache instead of each holding a copy.
+
+    A store built by compact_cache() or from an AnswerTable's items() can be
+    passed to a session as answers. Stores do not record a model, so a
+    session serves them whatever model it uses. Build a new file and reopen
+    it to update.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Path of a store written by build_store()
+
+        Raises:
+            ValueError: If the file is not a result store
+        """
+        self.path = path
+        with open(path, "rb") as store_file:
+            size = os.fstat(store_file.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"Not a result store: {path}")
+            self._map = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = _HEADER.unpack_from(self._map, 0)
+        if magic != STORE_MAGIC or size < _HEADER.size + self._count * _INDEX_ENTRY.size:
+            self._map.close()
+            raise ValueError(f"Not a result store: {path}")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, position: int) -> tuple:
+        """Read the index entry at a position"""
+        return _INDEX_ENTRY.unpack_from(self._map, _HEADER.size + position * _INDEX_ENTRY.size)
+
+    def _read_value(self, offset: int, key_length: int, tag: bytes) -> object:
+        """Unpack the value of the record at an offset"""
+        value_offset = offset + key_length
+        if tag == _INT_TAG:
+            return _INT_VALUE.unpack_from(self._map, value_offset)[0]
+        return _FLOAT_VALUE.unpack_from(self._map, value_offset)[0]
+
+    def _find(self, key: tuple) -> Optional[object]:
+        """Binary-search the index for a key and read its value"""
+        encoded_key = _encode_key(key)
+        key_hash = _hash_key(encoded_key)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < key_hash:
+                low = middle + 1
+            else:
+                high = middle
+        # Entries sharing a hash are adjacent; compare the stored keys
+        while low < self._count:
+            entry_hash, offset, key_length, tag = self._entry(low)
+            if entry_hash != key_hash:
+                break
+            if self._map[offset:offset + key_length] == encoded_key:
+                return self._read_value(offset, key_length, tag)
+            low += 1
+        return None
+
+    def get(self, key: Hashable) -> Optional[object]:
+        """
+        Look up a stored result.
+
+        Args:
+            key (Hashable): Canonical call key
+
+        Returns:
+            Optional[object]: The stored result, or None if the key is not in the store
+        """
+        result = self._find(key) if isinstance(key, tuple) else None
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def items(self) -> Iterator[Tuple[tuple, object]]:
+        """Iterate over the (key, result) pairs of the store"""
+        for position in range(self._count):
+            _, offset, key_length, tag = self._entry(position)
+            key = tuple(json.loads(self._map[offset:offset + key_length].decode("utf-8")))
+            yield key, self._read_value(offset, key_length, tag)
+
+    def stats(self) -> dict:
+        """
+        Get store counters.
+
+        Returns:
+            dict: "hits", "misses" and store "size"
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": self._count}
+
+    def close(self) -> None:
+        """Unmap the store file"""
+        self._map.close()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return isinstance(key, tuple) and self._find(key) is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
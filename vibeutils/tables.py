@@ -0,0 +1,255 @@
+"""
+Precomputed answer tables for high-frequency inputs
+"""
+
+import gzip
+import json
+import threading
+from typing import Hashable, Iterable, Optional, Union, TYPE_CHECKING
+
+from .canonical import CanonicalCall, canonical_vibecompare, canonical_vibecount, canonical_vibeeval, canonical_vibelength
+from .core import AIProvider, Provider, _provider_label, _resolve_session
+
+if TYPE_CHECKING:
+    from .session import VibeSession
+
+# Answer table format name and version written to the header line
+TABLE_FORMAT = "vibeutils-answers"
+TABLE_VERSION = 1
+
+
+def _open_table(path: str, mode: str):
+    """Open a table file, transparently gzip-compressed when it ends with .gz"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class AnswerTable:
+    """
+    Read-only table of precomputed vibe call results.
+
+    Entries are keyed by the canonical form of a call (see vibeutils.canonical),
+    so one entry answers every equivalent call, e.g. both argument orders of a
+    vibecompare. A session given a table serves matching calls from it before
+    its cache and without any provider request; calls outside the table run
+    the normal pipeline. A table records the model that produced it and only
+    answers calls made with that model; a table without a model answers for
+    every model.
+
+    Tables are built with AnswerTableBuilder and stored as a JSON Lines file
+    (gzip-compressed if the path ends with ".gz") holding a header line
+    followed by one [key, result] entry per line.
+    """
+
+    def __init__(self, entries: Optional[dict] = None, model: Optional[str] = None):
+        """
+        Args:
+            entries (Optional[dict]): Results by canonical call key
+            model (Optional[str]): Model that produced the answers and the only one they are
+                                   served for. If None, the answers are served for every model.
+        """
+        self.model = model
+        self._entries = dict(entries or {})
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[object]:
+        """
+        Look up a precomputed result.
+
+        Args:
+            key (Hashable): Canonical call key
+
+        Returns:
+            Optional[object]: The result of the canonical call, or None if it is not in the table
+        """
+        result = self._entries.get(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def items(self) -> list:
+        """Get the (key, result) pairs of the table"""
+        return list(self._entries.items())
+
+    def save(self, path: str) -> None:
+        """
+        Write the table to a file.
+
+        Args:
+            path (str): Destination path; gzip-compressed if it ends with ".gz"
+        """
+        with _open_table(path, "w") as table_file:
+            header = {"format": TABLE_FORMAT, "version": TABLE_VERSION, "model": self.model,
+                      "entries": len(self._entries)}
+            table_file.write(json.dumps(header) + "\n")
+            for key, result in sorted(self._entries.items(), key=lambda item: repr(item[0])):
+                table_file.write(json.dumps([list(key), result], separators=(",", ":")) + "\n")
+
+    @classmethod
+    def load(cls, path: str) -> "AnswerTable":
+        """
+        Read a table written by save().
+
+        Args:
+            path (str): Path of the table file
+
+        Returns:
+            AnswerTable: The loaded table
+
+        Raises:
+            ValueError: If the file is not an answer table or has an unsupported version
+        """
+        with _open_table(path, "r") as table_file:
+            try:
+                header = json.loads(table_file.readline())
+            except json.JSONDecodeError:
+                header = None
+            if not isinstance(header, dict) or header.get("format") != TABLE_FORMAT:
+                raise ValueError(f"Not an answer table: {path}")
+            if header.get("version") != TABLE_VERSION:
+                raise ValueError(f"Unsupported answer table version: {header.get('version')}")
+            entries = {}
+            for line in table_file:
+                if line.strip():
+                    key, result = json.loads(line)
+                    entries[tuple(key)] = result
+        return cls(entries, model=header.get("model"))
+
+    def stats(self) -> dict:
+        """
+        Get table counters.
+
+        Returns:
+            dict: "hits", "misses" and table "size"
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class AnswerTableBuilder:
+    """
+    Collects an input domain and precomputes its answers through the normal pipeline.
+
+    Calls are declared with the add_* methods; equivalent calls are only
+    computed once. build() runs every call concurrently in a session, with
+    the usual injection checks and response validation, and returns the
+    resulting AnswerTable. Calls that fail are left out of the table and
+    listed in failures.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.failures = []
+
+    def _add(self, call: CanonicalCall, function: str, args: tuple) -> None:
+        """Declare a call unless an equivalent one is already declared"""
+        self._calls.setdefault(call.key, (call, function, args))
+
+    def add_vibecompare(self, numbers: Iterable[Union[int, float]]) -> "AnswerTableBuilder":
+        """
+        Declare the comparisons of every pair of the given numbers.
+
+        Args:
+            numbers (Iterable[Union[int, float]]): Numbers to compare with each other
+
+        Returns:
+            AnswerTableBuilder: The builder, for chaining
+        """
+        numbers = list(numbers)
+        for index, num1 in enumerate(numbers):
+            for num2 in numbers[index:]:
+                self._add(canonical_vibecompare(num1, num2), "vibecompare", (num1, num2))
+        return self
+
+    def add_vibelength(self, texts: Iterable[str]) -> "AnswerTableBuilder":
+        """
+        Declare the lengths of the given strings.
+
+        Args:
+            texts (Iterable[str]): Strings to measure
+
+        Returns:
+            AnswerTableBuilder: The builder, for chaining
+        """
+        for text in texts:
+            self._add(canonical_vibelength(text), "vibelength", (text,))
+        return self
+
+    def add_vibecount(self, texts: Iterable[str], letters: Iterable[str],
+                      case_sensitive: bool = True) -> "AnswerTableBuilder":
+        """
+        Declare the count of every given letter in every given string.
+
+        Args:
+            texts (Iterable[str]): Strings to count in
+            letters (Iterable[str]): Letters to count
+            case_sensitive (bool): Whether the counts are case-sensitive (default: True)
+
+        Returns:
+            AnswerTableBuilder: The builder, for chaining
+        """
+        letters = list(letters)
+        for text in texts:
+            for letter in letters:
+                self._add(canonical_vibecount(text, letter, case_sensitive), "vibecount",
+                          (text, letter, case_sensitive))
+        return self
+
+    def add_vibeeval(self, expressions: Iterable[str]) -> "AnswerTableBuilder":
+        """
+        Declare the values of the given expressions.
+
+        Args:
+            expressions (Iterable[str]): Expressions to evaluate
+
+        Returns:
+            AnswerTableBuilder: The builder, for chaining
+        """
+        for expression in expressions:
+            self._add(canonical_vibeeval(expression), "vibeeval", (expression,))
+        return self
+
+    def build(self, session: Optional["VibeSession"] = None, provider: Optional[Union[Provider, AIProvider]] = None,
+              model: Optional[str] = None) -> AnswerTable:
+        """
+        Compute the answers of every declared call.
+
+        Args:
+            session (Optional[VibeSession]): Session to run the calls in, concurrently on its
+                                             thread pool. If None, uses the default session.
+            provider (Optional[Union[Provider, AIProvider]]): Overrides the session provider
+            model (Optional[str]): Overrides the session model
+
+        Returns:
+            AnswerTable: Table of the calls that succeeded
+        """
+        session = _resolve_session(session)
+        self.failures = []
+
+        def answer(declared):
+            call, function, args = declared
+            try:
+                return call.to_canonical(getattr(session, function)(*args, provider=provider, model=model))
+            except Exception as e:
+                self.failures.append((function, args, e))
+                return None
+
+        declared = list(self._calls.values())
+        results = session.map(answer, declared)
+        entries = {call.key: result for (call, _, _), result in zip(declared, results) if result is not None}
+        return AnswerTable(entries, model=_provider_label(session.get_provider(provider, model)))
+
+    def __len__(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,140 @@
+"""
+Shared HTTP transport for the provider SDK clients
+"""
+
+import sys
+import threading
+from types import ModuleType
+from typing import Optional
+
+# Connection pool and timeout defaults
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+
+
+def _httpx_module(sdk: ModuleType) -> ModuleType:
+    """Get the httpx package a provider SDK (openai or anthropic) is built on"""
+    client_class = next(cls for cls in sdk.DefaultHttpxClient.__mro__ if cls.__name__ == "Client")
+    return sys.modules[client_class.__module__.split(".")[0]]
+
+
+class _BorrowedTransport:
+    """
+    View of a shared transport handed to one SDK client.
+
+    SDK clients close their transport when they are closed or garbage
+    collected; the shared pool must outlive them, so closing is a no-op here.
+    """
+
+    def __init__(self, transport):
+        self._transport = transport
+
+    def handle_request(self, request):
+        return self._transport.handle_request(request)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None):
+        pass
+
+
+class SharedTransport:
+    """
+    HTTP connection pool shared by the SDK clients of all providers using it.
+
+    Each provider SDK normally builds its own HTTP client with default pool
+    limits. Passing one SharedTransport to providers (or to a VibeSession)
+    makes them share a single pool whose size, keep-alive expiry, HTTP/2
+    support and timeouts are configured here, so high-concurrency workloads
+    reuse connections instead of opening new sockets.
+
+    The pool is created on first use. Closing providers does not close it;
+    call close(), or use the transport as a context manager, when done.
+    """
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry: Optional[float] = DEFAULT_KEEPALIVE_EXPIRY, http2: bool = False,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT, connect_timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT):
+        """
+        Args:
+            max_connections (int): Maximum number of open connections (default: 100)
+            max_keepalive_connections (int): Maximum number of idle connections kept alive (default: 20)
+            keepalive_expiry (Optional[float]): Seconds an idle connection is kept alive,
+                                                or None to keep it indefinitely (default: 30)
+            http2 (bool): Multiplex requests over HTTP/2 connections when the server supports it.
+                          Requires the h2 package (default: False)
+            timeout (Optional[float]): Seconds to wait for reading, writing or a free pooled
+                                       connection, or None to wait indefinitely (default: 60)
+            connect_timeout (Optional[float]): Seconds to wait for a connection to be established,
+                                               or None to wait indefinitely (default: 5)
+
+        Raises:
+            ValueError: If a pool limit is not positive
+        """
+        if max_connections < 1 or max_keepalive_connections < 1:
+            raise ValueError("Connection limits must be positive integers")
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _pool(self, httpx: ModuleType):
+        """Get the connection pool for an httpx package, creating it on first use"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SharedTransport is closed")
+            pool = self._pools.get(httpx.__name__)
+            if pool is None:
+                limits = httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                )
+                pool = httpx.HTTPTransport(limits=limits, http2=self.http2)
+                self._pools[httpx.__name__] = pool
+            return pool
+
+    def http_client(self, sdk: ModuleType):
+        """
+        Build an HTTP client for a provider SDK that sends requests through the shared pool.
+
+        Args:
+            sdk (ModuleType): The provider SDK module (openai or anthropic)
+
+        Returns:
+            The SDK's default HTTP client class, configured with the shared pool and timeouts
+
+        Raises:
+            ImportError: If http2 is enabled and the h2 package is not installed
+            RuntimeError: If the transport is closed
+        """
+        httpx = _httpx_module(sdk)
+        timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        return sdk.DefaultHttpxClient(transport=_BorrowedTransport(self._pool(httpx)), timeout=timeout)
+
+    def close(self) -> None:
+        """Close all pooled connections"""
+        with self._lock:
+            self._closed = True
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,64 @@
+"""
+Policy on which vibe call arguments skip the prompt injection check
+"""
+
+import math
+import numbers
+import string
+
+from .arithmetic import parse_expression
+
+
+class TrustPolicy:
+    """
+    Declares which argument types and shapes cannot carry instructions.
+
+    Arguments the policy trusts are sent to the model without a prompt
+    injection check; everything else, in particular free text, still goes
+    through the provider check. The shapes that can be trusted are:
+
+    - numbers: finite ints and floats (not bools), as compared by vibecompare
+      and vibecompare_array
+    - letters: a single ASCII letter, as counted by vibecount (and each
+      character of vibecount_all)
+    - expressions: vibeeval expressions matching the documented arithmetic
+      grammar (numbers, + - * / ** and parentheses)
+
+    Sessions use DEFAULT_TRUST_POLICY, which trusts all three; pass
+    STRICT_TRUST_POLICY to check every argument.
+    """
+
+    def __init__(self, numbers: bool = True, letters: bool = True, expressions: bool = True):
+        """
+        Args:
+            numbers (bool): Trust finite numbers (default: True)
+            letters (bool): Trust single ASCII letters (default: True)
+            expressions (bool): Trust expressions matching the arithmetic grammar (default: True)
+        """
+        self.numbers = numbers
+        self.letters = letters
+        self.expressions = expressions
+
+    def trusts_number(self, value: object) -> bool:
+        """Check whether a number argument skips the injection check"""
+        return (self.numbers and isinstance(value, numbers.Real) and not isinstance(value, bool)
+                and math.isfinite(value))
+
+    def trusts_letter(self, value: object) -> bool:
+        """Check whether a letter argument skips the injection check"""
+        return self.letters and isinstance(value, str) and len(value) == 1 and value in string.ascii_letters
+
+    def trusts_expression(self, expression: str) -> bool:
+        """Check whether an expression argument skips the injection check"""
+        # parse_expression checks the raw text too, so comments and line breaks are not trusted
+        return self.expressions and parse_expression(expression) is not None
+
+    def __repr__(self) -> str:
+        return f"TrustPolicy(numbers={self.numbers}, letters={self.letters}, expressions={self.expressions})"
+
+
+# Policy trusting every inherently safe argument shape
+DEFAULT_TRUST_POLICY = TrustPolicy()
+
+# Policy sending every argument through the injection check
+STRICT_TRUST_POLICY = TrustPolicy(numbers=False, letters=False, expressions=False)